@@ -0,0 +1,138 @@
+"""
+Receive path benchmark for large Delve responses.
+
+Serves a ListGoroutines-like response of the requested size from a
+separate process and reads it back, once with the former chunked receive
+loop (4096 byte reads, a decoded string per chunk, then join) and once
+with JsonRpcTcpReceiveBuffer. The json.loads time is reported apart, it
+is the same for both. Every variant runs in its own process so the
+reported peak RSS belongs to that receive path only.
+
+    python3 bench/bench_receive.py --size 40 --repeat 3
+"""
+import argparse
+import json
+import os
+import resource
+import socket
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+VARIANTS = ['chunked', 'buffer']
+
+def make_payload(size):
+    goroutines = []
+    length = 0
+    idx = 1
+    while length < size:
+        loc = {"pc": 4198400 + idx, "file": "/go/src/service/worker/pool_%d.go" % (idx % 97), "line": idx % 500,
+               "function": {"name": "service/worker.(*Pool).run%d" % (idx % 13), "value": 4198000, "type": 0, "goType": 0}}
+        goroutine = {"id": idx, "currentLoc": loc, "userCurrentLoc": loc, "goStatementLoc": loc, "startLoc": loc, "threadID": 0}
+        goroutines.append(goroutine)
+        length += len(json.dumps(goroutine)) + 1
+        idx += 1
+    return goroutines
+
+def serve(size):
+    data = (json.dumps({"id": None, "result": {"Goroutines": make_payload(size), "Nextg": -1}, "error": None}) + "\n").encode('utf-8')
+    server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    server.bind(('127.0.0.1', 0))
+    server.listen(4)
+    sys.stdout.write("%d %d\n" % (server.getsockname()[1], len(data)))
+    sys.stdout.flush()
+    while True:
+        conn, addr = server.accept()
+        while True:
+            request = conn.recv(65536)
+            if not request:
+                break
+            req_id = json.loads(request.decode('utf-8'))['id']
+            # keep the id field length stable so the payload can be reused
+            conn.sendall(data.replace(b'"id": null', ('"id": "%s"' % req_id).encode('utf-8'), 1))
+        conn.close()
+
+def receive_chunked(sock):
+    responselist = []
+    while True:
+        data = sock.recv(4096)
+        if not data:
+            break
+        responselist.append(data.strip().decode('utf-8'))
+        if data.endswith(b'\n'):
+            break
+    return ''.join(responselist)
+
+def receive_buffer(sock, buf):
+    text = buf.read_frame()
+    while text is None:
+        if buf.recv_from(sock) == 0:
+            break
+        text = buf.read_frame()
+    return text
+
+def run_variant(variant, port, repeat):
+    from jsonrpctcp_client import JsonRpcTcpReceiveBuffer
+    from sdconst import DlvDefaults
+    const = DlvDefaults()
+    buf = JsonRpcTcpReceiveBuffer(const.BUFFER, const.MAX_BUFFER)
+    sock = socket.create_connection(('127.0.0.1', port))
+    received = 0
+    receive_time = 0.0
+    parse_time = 0.0
+    for i in range(repeat):
+        sock.sendall(json.dumps({"jsonrpc": "2.0", "method": "RPCServer.ListGoroutines", "params": [{}], "id": "%d" % i}).encode('utf-8'))
+        start = time.time()
+        if variant == 'chunked':
+            text = receive_chunked(sock)
+        else:
+            text = receive_buffer(sock, buf)
+        receive_time += time.time() - start
+        received += len(text)
+        start = time.time()
+        json.loads(text)
+        text = None
+        parse_time += time.time() - start
+    sock.close()
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == 'darwin':
+        peak //= 1024
+    return {"variant": variant, "bytes": received, "receive_seconds": receive_time,
+            "parse_seconds": parse_time, "peak_rss_kb": peak}
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark of the JSON-RPC receive path")
+    parser.add_argument('--size', type=int, default=40, help="response size in MB")
+    parser.add_argument('--repeat', type=int, default=3, help="responses read per variant")
+    parser.add_argument('--variant', choices=VARIANTS, help=argparse.SUPPRESS)
+    parser.add_argument('--port', type=int, help=argparse.SUPPRESS)
+    parser.add_argument('--serve', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.size * 1024 * 1024)
+        return
+    if args.variant is not None:
+        sys.stdout.write(json.dumps(run_variant(args.variant, args.port, args.repeat)) + "\n")
+        return
+
+    server = subprocess.Popen([sys.executable, __file__, '--serve', '--size', str(args.size)], stdout=subprocess.PIPE)
+    try:
+        port, length = [int(value) for value in server.stdout.readline().split()]
+        print("response size: %.1f MB, %d responses per variant" % (length / 1048576.0, args.repeat))
+        print("%-10s %14s %14s %14s %14s" % ("variant", "receive s", "receive MB/s", "json.loads s", "peak RSS MB"))
+        for variant in VARIANTS:
+            output = subprocess.check_output([sys.executable, __file__, '--variant', variant,
+                        '--port', str(port), '--repeat', str(args.repeat)])
+            result = json.loads(output.decode('utf-8'))
+            print("%-10s %14.3f %14.1f %14.3f %14.1f" % (variant, result['receive_seconds'],
+                result['bytes'] / 1048576.0 / result['receive_seconds'], result['parse_seconds'],
+                result['peak_rss_kb'] / 1024.0))
+    finally:
+        server.kill()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,101 @@
+"""
+Rendering benchmark of the debugger views on DlvMemoryView, a stub that
+counts the editor commands. Compares the former per-line rendering, one
+dlv_view_add_line per line after dlv_view_clear, with the single edit
+of DlvView.set_lines for a goroutine list and a breakpoint list, and
+the incremental update of a rendered view where a few lines changed.
+
+    python3 bench/bench_render.py --goroutines 50000 --breakpoints 500 --changed 2 --output bench_render.json
+
+Writes the commands per render and the wall time in ms as JSON to the
+output file.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import types
+
+PACKAGE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# The plugin modules import each other as the GoDebug package
+package = types.ModuleType('GoDebug')
+package.__path__ = [PACKAGE_DIR]
+sys.modules.setdefault('GoDebug', package)
+
+from GoDebug.sdview import DlvView
+from GoDebug.sdfrontend import DlvMemoryView
+from GoDebug.sdobjecttype import DlvGoroutineType, DlvBreakpointType
+
+def location(idx):
+    return {"file": "/go/src/service/worker/pool_%d.go" % (idx % 97), "line": 10 + idx % 500,
+            "function": {"name": "service/worker.(*Pool).run%d" % (idx % 13)}}
+
+def make_goroutines(count):
+    goroutines = []
+    for idx in range(count):
+        gr = DlvGoroutineType()
+        gr._update({"Goroutine": {"id": idx + 1, "currentLoc": location(idx), "userCurrentLoc": location(idx),
+                                  "goStatementLoc": location(idx + 1), "startLoc": location(idx + 2)}})
+        goroutines.append(gr)
+    return goroutines
+
+def make_breakpoints(count):
+    return [DlvBreakpointType("/go/src/service/worker/pool_%d.go" % (idx % 97), 10 + idx) for idx in range(count)]
+
+def render_per_line(view, lines, prefix):
+    view.update_view()
+    for line in lines:
+        view.add_line(line, prefix)
+
+def render_single_edit(view, lines, prefix):
+    view.set_lines(lines, prefix)
+
+def measure(render, lines, prefix, iterations, changed=None):
+    times = []
+    for i in range(iterations):
+        mem = DlvMemoryView()
+        view = DlvView('', None, None, mem)
+        if changed is not None:
+            # the view shows the former stop, a few lines differ
+            view.set_lines(lines, prefix)
+            lines = list(lines)
+            for k in range(changed):
+                idx = (k * 7919 + i) % len(lines)
+                lines[idx] = lines[idx] + " *"
+        mem.commands = 0
+        start = time.time()
+        render(view, lines, prefix)
+        times.append((time.time() - start) * 1000.0)
+    return {"commands": mem.commands, "mean_ms": sum(times) / len(times), "min_ms": min(times), "size": mem.size()}
+
+def main():
+    parser = argparse.ArgumentParser(description="Rendering benchmark of the debugger views")
+    parser.add_argument('--goroutines', type=int, default=50000)
+    parser.add_argument('--breakpoints', type=int, default=500)
+    parser.add_argument('--changed', type=int, default=2, help="lines changed between two stops in the incremental mode")
+    parser.add_argument('--iterations', type=int, default=10)
+    parser.add_argument('--output', default='bench_render.json', help="machine-readable results")
+    args = parser.parse_args()
+
+    cases = [("goroutines", [gr._format() for gr in make_goroutines(args.goroutines)], ''),
+             ("breakpoints", [bkpt._format(False) for bkpt in make_breakpoints(args.breakpoints)], ' - ')]
+    results = []
+    print("%-12s %-12s %10s %10s %10s" % ("view", "render", "lines", "commands", "mean ms"))
+    for name, lines, prefix in cases:
+        for mode, render, changed in [("per-line", render_per_line, None), ("single-edit", render_single_edit, None),
+                                      ("incremental", render_single_edit, args.changed)]:
+            result = measure(render, lines, prefix, args.iterations, changed)
+            result.update({"view": name, "render": mode, "lines": len(lines)})
+            results.append(result)
+            print("%-12s %-12s %10d %10d %10.2f" % (name, mode, len(lines), result['commands'], result['mean_ms']))
+    report = {"time": time.time(), "python": sys.version.split()[0],
+              "config": {"goroutines": args.goroutines, "breakpoints": args.breakpoints, "changed": args.changed, "iterations": args.iterations},
+              "results": results}
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2, sort_keys=True)
+    print("results written to %s" % args.output)
+
+if __name__ == '__main__':
+    main()
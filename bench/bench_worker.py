@@ -0,0 +1,239 @@
+"""
+End-to-end latency benchmark of DlvWorker against bench/fakedlv.py.
+
+Every scenario replays the requests the views send, the time is taken
+from the command enqueue to the end of the worker callback. The chained
+scenarios (continue, next, step) run a stop like the editor does: the
+command with the goroutines, then the stacktrace of the current
+goroutine, then the variables and watches of the top frame. The
+held-next scenario sends ten steps with their refreshes at once, like a
+held key, and waits for all of them. The group-goroutines scenario
+counts the goroutines per location and loads the members of the largest
+group, like expanding it in the view. The dump-stacks scenario reads the
+stacks of all goroutines, one per location unless --exact is given.
+
+    python3 bench/bench_worker.py --goroutines 100000 --scenario dump-stacks --iterations 3
+
+checks the default dump of a large program.
+
+    python3 bench/bench_worker.py --goroutines 10000 --rtt 2 --iterations 50 --output bench_worker.json
+
+Writes p50/p99/mean latency in ms and the bytes transferred per
+iteration for every scenario as JSON to the output file.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+import types
+
+PACKAGE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# The plugin modules import each other as the GoDebug package
+package = types.ModuleType('GoDebug')
+package.__path__ = [PACKAGE_DIR]
+sys.modules.setdefault('GoDebug', package)
+
+from GoDebug.sdconst import DlvDefaults
+from GoDebug.sdworker import DlvWorker
+from GoDebug.sdfrontend import DlvMemoryFrontend
+from GoDebug.jsonrpctcp_client import JsonRpcTcpClient
+
+HELD_STEPS = 10
+
+SCENARIOS = ['continue', 'next', 'step', 'select-goroutine', 'select-frame', 'held-next', 'group-goroutines', 'dump-stacks']
+
+class BenchConst(DlvDefaults):
+    # the slow scenarios are measured, not abandoned
+    TIMEOUT = 30
+    RECONNECT_ATTEMPTS = 0
+
+class BenchLogger(object):
+    def get_file(self):
+        return BenchConst.STDOUT
+
+    def debug(self, message):
+        pass
+
+    info = warning = debug
+
+    def error(self, message):
+        sys.stderr.write("%s\n" % message)
+
+    critical = error
+
+class BenchProject(object):
+    def __init__(self, host, port):
+        self.const = BenchConst()
+        self.logger = BenchLogger()
+        self.frontend = DlvMemoryFrontend(self.const, self.logger)
+        self.__endpoint = (host, port)
+
+    def get_endpoint(self):
+        return self.__endpoint
+
+class BenchSession(object):
+    """ Sends the batches of the views and waits for the final callback. """
+
+    def __init__(self, prj, watches, goroutine_list=True, group=None, exact=False):
+        self.__done = threading.Event()
+        self.__responses = None
+        self.__pending = 0
+        # with the goroutine view closed the stop reads the current goroutine only
+        self.goroutine = {"cmd": BenchConst.GOROUTINE_COMMAND, "parms": None if goroutine_list else {"list": False}}
+        self.group = group if group is not None else {"by": "user", "wait_reason": False}
+        self.dump = {"filter": "", "exact": exact}
+        self.watches = [{"watch_id": "w%d" % k, "expr": "w%d" % k} for k in range(watches)]
+        self.worker = DlvWorker(prj, self.__callback)
+
+    def __callback(self, prj, responses):
+        # chunks of a streamed goroutine list come before the final responses
+        if len(responses) == 1 and responses[0].get('partial', False):
+            return
+        self.__responses = responses
+        self.__pending -= 1
+        if self.__pending == 0:
+            self.__done.set()
+
+    def call(self, *batches):
+        self.__done.clear()
+        self.__pending = len(batches)
+        start = time.time()
+        for requests in batches:
+            self.worker.do_batch(requests)
+        self.__done.wait()
+        return time.time() - start, self.__responses
+
+    def call_dump(self):
+        self.__done.clear()
+        self.__pending = 1
+        start = time.time()
+        self.worker.dump_stacks(self.dump)
+        self.__done.wait()
+        return time.time() - start, self.__responses
+
+    def run(self, scenario, goroutine_id=1):
+        const = BenchConst
+        watch = {"cmd": const.WATCH_COMMAND, "parms": {"watches": self.watches, "goroutine_id": goroutine_id, "frame": 0}}
+        variable = {"cmd": const.VARIABLE_COMMAND, "parms": {"goroutine_id": goroutine_id, "frame": 0}}
+        stacktrace = {"cmd": const.STACKTRACE_COMMAND, "parms": {"goroutine_id": goroutine_id}}
+        if scenario == 'select-goroutine':
+            return self.call([stacktrace])[0]
+        if scenario == 'select-frame':
+            return self.call([variable, watch] if len(self.watches) > 0 else [variable])[0]
+        if scenario == 'dump-stacks':
+            elapsed, responses = self.call_dump()
+            if not responses[0]['result']:
+                raise RuntimeError("dump of the stacks failed")
+            return elapsed
+        if scenario == 'group-goroutines':
+            elapsed, responses = self.call([{"cmd": const.GOROUTINE_COMMAND, "parms": {"group": self.group}}])
+            group = responses[0]['group']
+            name = responses[0]['response']['Groups'][0]['Name']
+            expand = {"group": dict(group, expand=[name]), "scroll": True}
+            return elapsed + self.call([{"cmd": const.GOROUTINE_COMMAND, "parms": expand}])[0]
+        if scenario == 'held-next':
+            # key repeat: the refreshes of the earlier steps are superseded while they wait
+            batch = [{"cmd": const.NEXT_COMMAND, "parms": None}, self.goroutine, variable]
+            if len(self.watches) > 0:
+                batch.append(watch)
+            return self.call(*[list(batch) for k in range(HELD_STEPS)])[0]
+        elapsed, responses = self.call([{"cmd": scenario, "parms": None}, self.goroutine])
+        for response in responses:
+            if response['cmd'] == const.GOROUTINE_COMMAND and response['result']:
+                goroutine_id = response['current_goroutine_id']
+        stacktrace['parms']['goroutine_id'] = goroutine_id
+        elapsed += self.call([stacktrace])[0]
+        variable['parms']['goroutine_id'] = goroutine_id
+        watch['parms']['goroutine_id'] = goroutine_id
+        elapsed += self.call([variable, watch] if len(self.watches) > 0 else [variable])[0]
+        return elapsed
+
+def get_server_stats(host, port):
+    client = JsonRpcTcpClient(BenchConst(), BenchLogger())
+    client._open(host, port)
+    try:
+        return client._call_async("RPCServer.BenchStats", {}).result()
+    finally:
+        client._close()
+
+def percentile(values, fraction):
+    values = sorted(values)
+    idx = min(len(values) - 1, max(0, int(round(fraction * (len(values) - 1)))))
+    return values[idx]
+
+def main():
+    parser = argparse.ArgumentParser(description="End-to-end latency benchmark of the worker")
+    parser.add_argument('--goroutines', type=int, default=1000)
+    parser.add_argument('--depth', type=int, default=20)
+    parser.add_argument('--fanout', type=int, default=10)
+    parser.add_argument('--string-len', type=int, default=64)
+    parser.add_argument('--rtt', type=float, default=0.0, help="artificial round trip time in ms")
+    parser.add_argument('--watches', type=int, default=5)
+    parser.add_argument('--cache-size', type=int, default=BenchConst.INSPECTION_CACHE_SIZE, help="inspection cache in MB, 0 turns it off")
+    parser.add_argument('--prefetch-frames', type=int, default=BenchConst.PREFETCH_FRAMES, help="frames whose variables are read with the stop")
+    parser.add_argument('--page-size', type=int, default=BenchConst.GOROUTINE_PAGE_SIZE, help="goroutines per page, 0 reads all of them")
+    parser.add_argument('--group-by', choices=['user', 'go', 'start'], default='user', help="location of the group-goroutines scenario")
+    parser.add_argument('--group-state', action='store_true', help="group by the wait reason too, always done by the client")
+    parser.add_argument('--no-grouping', action='store_true', help="fake server without the grouping options")
+    parser.add_argument('--exact', action='store_true', help="dump-stacks reads the stack of every goroutine")
+    parser.add_argument('--goroutine-view', choices=['open', 'closed'], default='open', help="whether the stops read the goroutine list")
+    parser.add_argument('--iterations', type=int, default=30)
+    parser.add_argument('--scenario', action='append', choices=SCENARIOS, help="default all")
+    parser.add_argument('--output', default='bench_worker.json', help="machine-readable results")
+    args = parser.parse_args()
+
+    cmd = [sys.executable, os.path.join(PACKAGE_DIR, 'bench', 'fakedlv.py'), '--goroutines', str(args.goroutines),
+           '--depth', str(args.depth), '--fanout', str(args.fanout), '--string-len', str(args.string_len), '--rtt', str(args.rtt)]
+    if args.no_grouping:
+        cmd.append('--no-grouping')
+    server = subprocess.Popen(cmd, stdout=subprocess.PIPE)
+    prj = None
+    session = None
+    try:
+        host, port = '127.0.0.1', int(server.stdout.readline())
+        prj = BenchProject(host, port)
+        prj.const.INSPECTION_CACHE_SIZE = args.cache_size
+        prj.const.PREFETCH_FRAMES = args.prefetch_frames
+        prj.const.GOROUTINE_PAGE_SIZE = args.page_size
+        session = BenchSession(prj, args.watches, args.goroutine_view == 'open', {"by": args.group_by, "wait_reason": args.group_state}, args.exact)
+        results = []
+        print("%-18s %10s %10s %10s %14s %14s" % ("scenario", "p50 ms", "p99 ms", "mean ms", "KB sent/it", "KB recv/it"))
+        for scenario in (args.scenario or SCENARIOS):
+            # the first run opens the connections, it is not measured
+            session.run(scenario)
+            before = get_server_stats(host, port)
+            times = [session.run(scenario) * 1000.0 for i in range(args.iterations)]
+            after = get_server_stats(host, port)
+            # includes the few hundred bytes of the first stats call
+            result = {"scenario": scenario, "iterations": args.iterations,
+                      "p50_ms": percentile(times, 0.5), "p99_ms": percentile(times, 0.99),
+                      "mean_ms": sum(times) / len(times), "min_ms": min(times), "max_ms": max(times),
+                      "bytes_sent_per_iteration": (after['bytes_in'] - before['bytes_in']) / float(args.iterations),
+                      "bytes_received_per_iteration": (after['bytes_out'] - before['bytes_out']) / float(args.iterations)}
+            results.append(result)
+            print("%-18s %10.2f %10.2f %10.2f %14.1f %14.1f" % (scenario, result['p50_ms'], result['p99_ms'], result['mean_ms'],
+                result['bytes_sent_per_iteration'] / 1024.0, result['bytes_received_per_iteration'] / 1024.0))
+        report = {"time": time.time(), "python": sys.version.split()[0],
+                  "config": {"goroutines": args.goroutines, "depth": args.depth, "fanout": args.fanout,
+                             "string_len": args.string_len, "rtt_ms": args.rtt, "watches": args.watches,
+                             "cache_size_mb": args.cache_size, "prefetch_frames": args.prefetch_frames,
+                             "goroutine_view": args.goroutine_view, "page_size": args.page_size,
+                             "group_by": args.group_by, "group_state": args.group_state, "no_grouping": args.no_grouping,
+                             "exact": args.exact},
+                  "results": results}
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+        print("results written to %s" % args.output)
+    finally:
+        if session is not None:
+            session.worker.stop()
+        if prj is not None:
+            prj.frontend.stop()
+        server.kill()
+
+if __name__ == '__main__':
+    main()
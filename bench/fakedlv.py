@@ -0,0 +1,265 @@
+"""
+Fake headless Delve server speaking the RPCServer methods used by the
+worker over the JSON-RPC line protocol of Delve API v2. Response sizes
+and the round trip time are tunable, so the worker can be benchmarked
+without a Go toolchain.
+
+    python3 bench/fakedlv.py --goroutines 10000 --depth 50 --fanout 20 --rtt 2
+
+Prints the listening port on the first line of stdout. Besides the Delve
+methods it answers RPCServer.BenchStats with the bytes read and written
+since the start. ListGoroutines supports the location filters and
+grouping options of newer Delve versions unless --no-grouping is given.
+Like the runtime list Delve pages through, every seventh slot holds a
+dead goroutine, so Start and Nextg are no row positions.
+"""
+import argparse
+import json
+import os
+import queue
+import socket
+import sys
+import threading
+import time
+
+# every DEAD_SLOT-th slot of the goroutine list is skipped like a dead goroutine
+DEAD_SLOT = 7
+
+class FakeDelve(object):
+    def __init__(self, goroutines=100, depth=20, fanout=10, string_len=64, rtt=0.0, locations=50, grouping=True):
+        self.goroutines = goroutines
+        self.locations = locations
+        self.grouping = grouping
+        self.depth = depth
+        self.fanout = fanout
+        self.string_len = string_len
+        self.rtt = rtt
+        self.line = 10
+        self.breakpoints = {}
+        self.next_breakpoint_id = 1
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.lock = threading.Lock()
+
+    def location(self, idx, line=None):
+        return {"pc": 4198400 + idx, "file": "/go/src/service/worker/pool_%d.go" % (idx % 97),
+                "line": line if line is not None else 10 + idx % 500,
+                "function": {"name": "service/worker.(*Pool).run%d" % (idx % 13), "value": 4198000 + idx,
+                             "type": 0, "goType": 0, "optimized": False}}
+
+    def goroutine(self, idx):
+        # goroutines are parked at a few locations, like the workers of a pool
+        site = idx % self.locations
+        loc = self.location(site, self.line if idx == 1 else None)
+        return {"id": idx, "currentLoc": loc, "userCurrentLoc": loc, "goStatementLoc": self.location(site + 1),
+                "startLoc": self.location(site + 2), "threadID": 1 if idx == 1 else 0, "unreadable": "",
+                "status": 2 if idx == 1 else 4, "waitReason": 0 if idx == 1 else [14, 9, 18, 20][site % 4], "waitSince": 0}
+
+    def group_name(self, goroutine, field):
+        # formatLoc of Delve's service/debugger
+        loc = goroutine[{1: "currentLoc", 2: "userCurrentLoc", 3: "goStatementLoc", 4: "startLoc"}[field]]
+        return "%s:%d in %s" % (loc["file"], loc["line"], (loc.get("function") or {}).get("name") or "?")
+
+    def list_goroutines(self, params):
+        start = params.get("Start", 0)
+        count = params.get("Count", 0)
+        # the slots of the dead goroutines are passed over, they are not counted
+        slots = self.goroutines + (self.goroutines - 1) // (DEAD_SLOT - 1) if self.goroutines > 0 else 0
+        goroutines = []
+        slot = start
+        while slot < slots and (count <= 0 or len(goroutines) < count):
+            if slot % DEAD_SLOT != DEAD_SLOT - 1:
+                goroutines.append(self.goroutine(slot - slot // DEAD_SLOT + 1))
+            slot += 1
+        result = {"Goroutines": goroutines, "Nextg": slot if slot < slots else -1}
+        if not self.grouping:
+            return result
+        for element in params.get("Filters") or []:
+            matched = [gr for gr in goroutines if element["Arg"] in self.group_name(gr, element["Kind"])]
+            goroutines = matched if not element.get("Negated") else [gr for gr in goroutines if gr not in matched]
+        result["Goroutines"] = goroutines
+        # ListGoroutinesIn embeds the grouping options
+        if params.get("GroupBy", 0) > 0:
+            groups = {}
+            for gr in goroutines:
+                groups.setdefault(self.group_name(gr, params["GroupBy"]), []).append(gr)
+            names = sorted(groups)[:params.get("MaxGroups", 0) or len(groups)]
+            result["Goroutines"] = []
+            result["Groups"] = []
+            for name in names:
+                members = groups[name][:params.get("MaxGroupMembers", 0) or 10]
+                result["Groups"].append({"Name": name, "Offset": len(result["Goroutines"]), "Count": len(members), "Total": len(groups[name])})
+                result["Goroutines"].extend(members)
+            result["TooManyGroups"] = len(names) < len(groups)
+        return result
+
+    def variable(self, name, level=0):
+        children = []
+        kind = 17
+        value = ("v" * self.string_len)
+        if level == 0 and self.fanout > 0:
+            kind = 25
+            value = ""
+            children = [self.variable("%s.f%d" % (name, k), level + 1) for k in range(self.fanout)]
+        return {"name": name, "addr": 824634000000 + len(name), "onlyAddr": False, "type": "string" if kind == 17 else "main.T",
+                "realType": "string" if kind == 17 else "main.T", "flags": 0, "kind": kind, "value": value,
+                "len": len(value) if kind == 17 else len(children), "cap": 0, "children": children, "base": 0,
+                "unreadable": "", "LocationExpr": "", "DeclLine": 0}
+
+    def state(self):
+        loc = self.location(1, self.line)
+        thread = {"id": 1, "pc": loc["pc"], "file": loc["file"], "line": loc["line"], "function": loc["function"],
+                  "goroutineID": 1, "breakPoint": None, "breakPointInfo": None, "ReturnValues": None}
+        return {"State": {"Running": False, "currentThread": thread, "currentGoroutine": self.goroutine(1), "Threads": [thread],
+                          "NextInProgress": False, "exited": False, "exitStatus": 0, "When": ""}}
+
+    def handle(self, method, params):
+        if method == "State":
+            return self.state()
+        elif method == "Command":
+            name = params.get("name")
+            if name in ["continue", "next", "step", "stepOut"]:
+                self.line = 10 + (self.line + 1) % 500
+            return self.state()
+        elif method in ["Restart", "CancelNext"]:
+            return {}
+        elif method == "CreateBreakpoint":
+            bkpt = dict(params.get("Breakpoint", {}))
+            bkpt["id"] = self.next_breakpoint_id
+            bkpt.setdefault("name", "")
+            bkpt.setdefault("addr", 4198400)
+            bkpt.setdefault("functionName", "main.main")
+            self.next_breakpoint_id += 1
+            self.breakpoints[bkpt["id"]] = bkpt
+            return {"Breakpoint": bkpt}
+        elif method == "ClearBreakpoint":
+            return {"Breakpoint": self.breakpoints.pop(params.get("Id"), {"id": params.get("Id"), "file": "", "line": 0})}
+        elif method == "ListBreakpoints":
+            return {"Breakpoints": list(self.breakpoints.values())}
+        elif method == "ListGoroutines":
+            return self.list_goroutines(params)
+        elif method == "Stacktrace":
+            depth = min(params.get("Depth", self.depth), self.depth)
+            # the goroutines parked at the same location share their stack
+            goroutine_id = params.get("Id", 1)
+            site = 0 if goroutine_id <= 1 else goroutine_id % self.locations
+            frames = []
+            for k in range(depth):
+                frame = self.location(site + k, self.line if k == 0 and goroutine_id <= 1 else None)
+                frame.update({"Locals": None, "Arguments": None, "FrameOffset": 0, "FramePointerOffset": 0, "Defers": None, "Bottom": k == depth - 1, "Err": ""})
+                if params.get("Full"):
+                    frame["Locals"] = [self.variable("l%d" % i) for i in range(2)]
+                    frame["Arguments"] = [self.variable("a%d" % i, 1) for i in range(2)]
+                frames.append(frame)
+            return {"Locations": frames}
+        elif method == "ListLocalVars":
+            return {"Variables": [self.variable("l%d" % i) for i in range(self.fanout)]}
+        elif method == "ListFunctionArgs":
+            return {"Args": [self.variable("a%d" % i, 1) for i in range(max(1, self.fanout // 4))]}
+        elif method == "Eval":
+            return {"Variable": self.variable(params.get("Expr", ""))}
+        elif method == "BenchStats":
+            with self.lock:
+                return {"bytes_in": self.bytes_in, "bytes_out": self.bytes_out}
+        raise ValueError("unknown method RPCServer.%s" % method)
+
+    def serve(self, conn):
+        # responses leave after the round trip time, without holding back the next requests
+        outgoing = queue.Queue()
+        t = threading.Thread(target=self.send, args=(conn, outgoing))
+        t.daemon = True
+        t.start()
+        decoder = json.JSONDecoder()
+        text = ''
+        while True:
+            try:
+                data = conn.recv(65536)
+            except OSError:
+                break
+            if not data:
+                break
+            with self.lock:
+                self.bytes_in += len(data)
+            text += data.decode('utf-8')
+            while True:
+                text = text.lstrip()
+                try:
+                    request, end = decoder.raw_decode(text)
+                except ValueError:
+                    break
+                text = text[end:]
+                method = request.get("method", "").split(".")[-1]
+                params = (request.get("params") or [{}])[0] or {}
+                try:
+                    response = {"id": request.get("id"), "result": self.handle(method, params), "error": None}
+                except Exception as e:
+                    response = {"id": request.get("id"), "result": None, "error": str(e)}
+                outgoing.put((time.time() + self.rtt, (json.dumps(response) + "\n").encode('utf-8')))
+        outgoing.put(None)
+
+    def send(self, conn, outgoing):
+        while True:
+            item = outgoing.get()
+            if item is None:
+                break
+            due, data = item
+            delay = due - time.time()
+            if delay > 0:
+                time.sleep(delay)
+            try:
+                conn.sendall(data)
+            except OSError:
+                break
+            with self.lock:
+                self.bytes_out += len(data)
+        conn.close()
+
+    def listen(self, host, port, unix=None):
+        if unix is not None:
+            server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            server.bind(unix)
+        else:
+            server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            server.bind((host, port))
+        server.listen(16)
+        return server
+
+    def run(self, server):
+        while True:
+            conn, addr = server.accept()
+            if conn.family != socket.AF_UNIX:
+                # as the Go net package does by default
+                conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            t = threading.Thread(target=self.serve, args=(conn,))
+            t.daemon = True
+            t.start()
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake headless Delve JSON-RPC server")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=0, help="0 picks a free port, printed on stdout")
+    parser.add_argument('--unix', help="listen on this Unix domain socket path instead")
+    parser.add_argument('--goroutines', type=int, default=100, help="goroutines returned by ListGoroutines")
+    parser.add_argument('--depth', type=int, default=20, help="maximal stack depth")
+    parser.add_argument('--fanout', type=int, default=10, help="local variables and fields per struct")
+    parser.add_argument('--string-len', type=int, default=64, help="length of the string values")
+    parser.add_argument('--rtt', type=float, default=0.0, help="artificial round trip time in ms")
+    parser.add_argument('--locations', type=int, default=50, help="distinct locations the goroutines are parked at")
+    parser.add_argument('--no-grouping', action='store_true', help="ignore the filters and grouping options like older Delve versions")
+    args = parser.parse_args()
+
+    fake = FakeDelve(args.goroutines, args.depth, args.fanout, args.string_len, args.rtt / 1000.0, args.locations, not args.no_grouping)
+    server = fake.listen(args.host, args.port, args.unix)
+    sys.stdout.write("%s\n" % (args.unix if args.unix is not None else server.getsockname()[1]))
+    sys.stdout.flush()
+    try:
+        fake.run(server)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if args.unix is not None and os.path.exists(args.unix):
+            os.remove(args.unix)
+
+if __name__ == '__main__':
+    main()
@@ -1,9 +1,13 @@
 import sys 
 import json
 import socket 
+import select
+import codecs
+import gzip
+import re
 import uuid
 import time
-import traceback
+import threading
 
 JSONRPC_ERRORS = {
     -32800: {'code':-32800, 'message':'Client connection not opened'},
@@ -12,11 +16,25 @@ JSONRPC_ERRORS = {
     -32803: {'code':-32803, 'message':'Client socket timeout'},
     -32804: {'code':-32804, 'message':'Client batch mode already enabled'},
     -32805: {'code':-32805, 'message':'Client socket receive buffer is full'},
+    -32806: {'code':-32806, 'message':'Client request deadline exceeded'},
+    -32807: {'code':-32807, 'message':'Client request cancelled'},
     -32700: {'code':-32700, 'message':'Parse Delve response error'},
     -32701: {'code':-32701, 'message':'Internal Delve error'},
     -32600: {'code':-32600, 'message':'Invalid client request'},
 }
 
+UNIX_ENDPOINT_PREFIX = 'unix:'
+
+REPLAY_ENDPOINT_PREFIX = 'replay:'
+
+# Deadline of the requests waiting for the response without a time limit
+NO_DEADLINE = float('inf')
+
+# How often a wait for the response looks for a cancel from another thread, in seconds
+CANCEL_POLL_INTERVAL = 0.05
+
+JSONRPC_ID_PREFIX = re.compile(r'\s*\{\s*"id"\s*:\s*')
+
 class JsonRpcTcpProtocolError(Exception):
     """ Used for system errors and custom errors. """
     
@@ -56,12 +74,21 @@ class JsonRpcTcpProtocolError(Exception):
 
 class JsonRpcTcpClient(object):
 
-    def __init__(self, const, logger):
+    def __init__(self, const, logger, trace=None):
         self.__const = const
         self.__logger = logger
+        self.__trace = trace
+        self.__traced = {}
+        self.__replay = None
         self.__requests = []
         self.__batch = False
         self.__sock_opened = False
+        self.__buffer = JsonRpcTcpReceiveBuffer(const.BUFFER, const.MAX_BUFFER)
+        self.__pending = {}
+        self.__abandoned = set()
+        self.__outgoing = []
+        self.__cancel = threading.Event()
+        self.__cancel_filter = None
 
     def __getattr__(self, key):
         if key.startswith('_'):
@@ -74,24 +101,52 @@ class JsonRpcTcpClient(object):
     def _is_open(self):
         return self.__sock_opened
 
-    def _open(self, host, port):
+    def _open(self, host, port=None):
+        """
+        Connects to host and port, or to the Unix domain socket
+        given as host in the form unix:path.
+        """
         if self.__sock_opened:
             self.__logger.debug("Socket already opened!")
             return
         self.__requests = []
         self.__batch = False
-        self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        self.sock.settimeout(self.__const.TIMEOUT)
-        self.sock.connect((host, port))
+        self.__buffer.clear()
+        self.__pending = {}
+        self.__abandoned = set()
+        self.__traced = {}
+        self.__outgoing = []
+        if host.startswith(REPLAY_ENDPOINT_PREFIX):
+            # responses come from a trace file, no Delve server is needed
+            self.__replay = JsonRpcTcpReplayServer(host[len(REPLAY_ENDPOINT_PREFIX):], self.__logger)
+            self.sock = self.__replay.connect()
+            self.sock.settimeout(self.__const.TIMEOUT)
+            self.__logger.debug("Open replay of %s" % host)
+        elif host.startswith(UNIX_ENDPOINT_PREFIX):
+            self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self.sock.settimeout(self.__const.TIMEOUT)
+            self.sock.connect(host[len(UNIX_ENDPOINT_PREFIX):])
+            self.__logger.debug("Open socket %s" % host)
+        else:
+            self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            self.sock.settimeout(self.__const.TIMEOUT)
+            # pipelined requests are small writes, do not let Nagle hold them back
+            self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            self.sock.connect((host, port))
+            self.__logger.debug("Open socket %s:%d" % (host, port))
         self.__sock_opened = True
-        self.__logger.debug("Open socket %s:%d" % (host, port))
 
     def _close(self):
         if self.__sock_opened:
             self.sock.close()
             self.sock = None
+            if self.__replay is not None:
+                self.__replay.close()
+                self.__replay = None
             self.__logger.debug("Close socket")
             self.__sock_opened = False
+            self.__outgoing = []
+            self.__fail_pending(JsonRpcTcpProtocolError(-32800))
         else:
             self.__logger.debug("Socket already closed!")
 
@@ -122,73 +177,197 @@ class JsonRpcTcpClient(object):
         return self.__batch
         
     def __call__(self):
-        if not self.__sock_opened:
-            raise JsonRpcTcpProtocolError(-32800)
-        assert len(self.__requests) > 0
         requests = []
-        for i in range(len(self.__requests)):
-            request = self.__requests.pop(0)
+        for request in self.__requests:
             requests.append(request._request())
-        if not self._is_batch():
-            result = self._call_single(requests[0])
-        else:
-            result = self._call_batch(requests)
-            self.__batch = False    
         self.__requests = []
-        return result
+        batch = self.__batch
+        self.__batch = False
+        if not self.__sock_opened:
+            raise JsonRpcTcpProtocolError(-32800)
+        assert len(requests) > 0
+        if not batch:
+            return self._call_single(requests[0])
+        return self._call_batch(requests)
             
     def _call_single(self, request):
         """
         Processes a single request, and returns the response.
         """
         self._request = request
-        try:
-            message = json.dumps(request)
-        except:
-            raise JsonRpcTcpProtocolError(-32600)
-        notify = False
         if 'id' not in request:
-            notify = True
-        self._send(message)
-        if not notify:
-            response = self._receive2(notify)
-        else:
+            try:
+                message = json.dumps(request)
+            except:
+                raise JsonRpcTcpProtocolError(-32600)
+            self._flush()
+            self._send(message)
             return None
-        self._response = response        
-        jsonrpctcp_validate_response(response)
-        return response['result']
+        future = self.__submit(request)
+        self._wait(future)
+        return future.result()
         
     def _call_batch(self, requests):
         """
-        Processes a batch, and returns a generator to iterate over the
-        response results.
+        Processes a batch, and returns a JsonRpcTcpBatchResponses object
+        to iterate over the response results or retrieve them by id.
         """
         ids = []
+        futures = []
+        self._request = requests
         for request in requests:
             if 'id' in request:
                 ids.append(request['id'])
-        self._request = requests
+                futures.append(self.__submit(request))
+            else:
+                try:
+                    self.__outgoing.append(json.dumps(request))
+                except:
+                    raise JsonRpcTcpProtocolError(-32600)
+        self._flush()
+        responses = []
+        errors = {}
+        for future in futures:
+            # a failed call is raised on its own id, the others are kept
+            try:
+                self._wait(future)
+                responses.append(future._response)
+            except JsonRpcTcpProtocolError as e:
+                errors[future.id] = e
+        return JsonRpcTcpBatchResponses(responses, ids, errors)
+
+    def _call_async(self, method, params=None, callback=None, timeout=None, tag=None):
+        """
+        Queues a request without waiting for the response and returns a
+        JsonRpcTcpFuture. Queued requests are written together on the next
+        flush or wait, each response is handed to its future by id.
+        The timeout defaults to TIMEOUT, zero means waiting without a limit.
+        The tag is kept on the future for a cancel to pick the requests.
+        """
+        if not self.__sock_opened:
+            raise JsonRpcTcpProtocolError(-32800)
+        request = {
+            'jsonrpc': '2.0',
+            'method': method,
+            'id': u'%s' % uuid.uuid4()
+        }
+        if params is not None:
+            request['params'] = [params]
+        return self.__submit(request, callback, timeout, tag)
+
+    def _cancel(self, is_cancelled=None):
+        """
+        Can be called from any thread: the current wait abandons the
+        pending requests with -32807, all of them or the ones whose tag
+        is_cancelled returns True for. The connection stays open.
+        """
+        self.__cancel_filter = is_cancelled
+        self.__cancel.set()
+
+    def _clear_cancel(self):
+        self.__cancel.clear()
+
+    def _flush(self):
+        """ Writes all queued requests at once. """
+        if len(self.__outgoing) == 0:
+            return
+        # Delve's codec decodes one JSON value at a time and does not accept
+        # JSON-RPC arrays, so requests are written as a stream of objects
+        message = '\n'.join(self.__outgoing)
+        self.__outgoing = []
+        try:
+            self._send(message)
+        except JsonRpcTcpProtocolError as e:
+            self.__fail_pending(e)
+            raise
+
+    def _wait(self, future):
+        """
+        Reads responses and dispatches them to the waiting futures
+        until the given future is resolved. A future whose deadline
+        expires is abandoned, the connection stays open.
+        """
+        self._flush()
+        while not future.done():
+            if not self.__sock_opened:
+                raise JsonRpcTcpProtocolError(-32800)
+            try:
+                response = self._receive(False, future._deadline)
+            except JsonRpcTcpProtocolError as e:
+                if e.code == -32806:
+                    self._abandon(future, e)
+                    return
+                if e.code == -32807:
+                    # the requests the cancel is not about are still waited for
+                    self.__abandon_cancelled(e)
+                    continue
+                self.__fail_pending(e)
+                raise
+            self.__dispatch(response)
+
+    def _abandon(self, future, e=None):
+        """
+        Resolves a pending request with an error without waiting for the
+        response, the late response is discarded when it arrives.
+        """
+        if future.done():
+            return
+        if self.__pending.pop(future.id, None) is not None:
+            self.__abandoned.add(future.id)
+            # the late response is not traced either
+            self.__traced.pop(future.id, None)
+        future._set_error(e if e is not None else JsonRpcTcpProtocolError(-32807))
+
+    def __submit(self, request, callback=None, timeout=None, tag=None):
         try:
-            message = json.dumps(requests)
+            message = json.dumps(request)
         except:
             raise JsonRpcTcpProtocolError(-32600)
-        notify = False
-        if len(ids) == 0:
-            notify = True
-        self._send(message)
-        responses = None
-        if not notify:
-            response = self._receive2(notify)
-        if responses is None:
-            responses = []
-        assert type(responses) is list
-        return JsonRpcTcpBatchResponses(responses, ids)
+        if timeout is None:
+            timeout = self.__const.TIMEOUT
+        deadline = time.time() + timeout if timeout > 0 else NO_DEADLINE
+        future = JsonRpcTcpFuture(request['id'], deadline, self, callback, tag)
+        if self.__trace is not None:
+            self.__traced[request['id']] = (time.time(), request)
+        self.__pending[request['id']] = future
+        self.__outgoing.append(message)
+        return future
+
+    def __dispatch(self, response):
+        req_id = response.get('id', None) if type(response) is dict else None
+        if self.__trace is not None and req_id in self.__traced:
+            start, request = self.__traced.pop(req_id)
+            self.__trace.write(start, time.time() - start, request, response)
+        future = self.__pending.pop(req_id, None)
+        if future is None and req_id in self.__abandoned:
+            self.__abandoned.remove(req_id)
+            self.__logger.debug("Late response for abandoned request id %s discarded" % req_id)
+            return
+        if future is None:
+            self.__logger.debug("Response for unknown request id %s discarded" % req_id)
+            return
+        future._set_response(response)
+
+    def __is_cancelled(self, future):
+        is_cancelled = self.__cancel_filter
+        return is_cancelled is None or is_cancelled(future.tag)
+
+    def __abandon_cancelled(self, e):
+        for future in list(self.__pending.values()):
+            if self.__is_cancelled(future):
+                self._abandon(future, e)
+
+    def __fail_pending(self, e):
+        pending = self.__pending
+        self.__pending = {}
+        for future in pending.values():
+            future._set_error(e)
     
     def _send(self, message):
         self.__logger.debug('CLIENT | REQUEST: %s' % message)
 
         try:
-            self.sock.send(message.encode(sys.getdefaultencoding()))
+            self.sock.sendall(message.encode(sys.getdefaultencoding()))
         except socket.timeout:
             self._close()
             raise JsonRpcTcpProtocolError(-32803)
@@ -196,78 +375,587 @@ class JsonRpcTcpClient(object):
             self._close()
             raise JsonRpcTcpProtocolError(-32801)
 
-    def _receive(self, notify):
-        responselist = []
-        while not notify and self.__sock_opened:
+    def _receive(self, notify, deadline=None):
+        """
+        Blocks until one complete JSON value has been read from the socket,
+        or the request deadline expires. Bytes received after the value
+        (coalesced frames) stay in the buffer for the next call.
+        """
+        if notify:
+            return None
+        if deadline is None:
+            deadline = time.time() + self.__const.TIMEOUT
+        response = self.__buffer.read_frame()
+        while response is None:
+            idle = not self.__recv(deadline)
+            response = self.__buffer.read_frame(idle)
+        if self.__const.DEBUG:
+            self.__logger.debug('CLIENT | RESPONSE: %s' % response)
+        self.__logger.debug('JSON response length in bytes: %d' % len(response))
+        try:
+            json_obj = json.loads(response)
+        except ValueError:
+            raise JsonRpcTcpProtocolError(-32700)
+        return json_obj
+
+    def __recv(self, deadline):
+        """
+        Waits for the socket to be readable and reads once into the buffer.
+        Returns False if nothing came in for a poll interval.
+        """
+        while True:
+            if self.__cancel.isSet():
+                self.__cancel.clear()
+                raise JsonRpcTcpProtocolError(-32807)
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                raise JsonRpcTcpProtocolError(-32806)
             try:
-                data = self.sock.recv(self.__const.BUFFER)
+                readable, writable, exceptional = select.select([self.sock], [], [], min(remaining, CANCEL_POLL_INTERVAL))
+                if not readable:
+                    return False
+                count = self.__buffer.recv_from(self.sock)
             except socket.timeout:
                 self._close()
                 raise JsonRpcTcpProtocolError(-32803)
             except:
                 self._close()
                 raise JsonRpcTcpProtocolError(-32802)
-            if not data: 
+            if count == 0:
+                self._close()
+                raise JsonRpcTcpProtocolError(-32802)
+            return True
+
+    def _call_stream(self, method, params, key, timeout=None, tag=None):
+        """
+        Sends a request whose result holds a large array under the given key,
+        and returns a JsonRpcTcpStream yielding the array elements as they
+        are decoded off the socket. The other result fields are available
+        from the stream result() once the iteration is over.
+        """
+        future = self._call_async(method, params, timeout=timeout, tag=tag)
+        return JsonRpcTcpStream(self, future, key)
+
+    def _iter_stream(self, future, key):
+        self._flush()
+        decoder = None
+        if self.__trace is not None:
+            # the trace records whole responses, so they are not streamed
+            self._wait(future)
+        while not future.done():
+            if not self.__sock_opened:
+                raise JsonRpcTcpProtocolError(-32800)
+            try:
+                if decoder is None:
+                    found, req_id = self.__buffer.peek_id()
+                    if not found:
+                        self.__recv(future._deadline)
+                    elif req_id != future.id:
+                        # response of another pipelined request comes first
+                        self.__dispatch(self._receive(False, future._deadline))
+                    else:
+                        decoder = JsonRpcTcpStreamDecoder(key)
+                    continue
+                elements = self.__buffer.read_stream(decoder)
+                if decoder.done:
+                    self.__pending.pop(future.id, None)
+                    future._set_response(decoder.response)
+                elif len(elements) == 0:
+                    self.__recv(future._deadline)
+            except JsonRpcTcpProtocolError as e:
+                if e.code not in [-32806, -32807]:
+                    self.__fail_pending(e)
+                    raise
+                if e.code == -32807 and not self.__is_cancelled(future):
+                    self.__abandon_cancelled(e)
+                    continue
+                if decoder is not None:
+                    # the rest of the response is dropped as it arrives
+                    self.__buffer.discard_frame()
+                    self.__pending.pop(future.id, None)
+                    future._set_error(e)
+                else:
+                    self._abandon(future, e)
+                if e.code == -32807:
+                    self.__abandon_cancelled(e)
+                raise
+            for element in elements:
+                yield element
+        if decoder is None:
+            # the whole response was read by another wait, yield from it
+            result = future.result()
+            if type(result) is dict and result.get(key) is not None:
+                for element in result.pop(key):
+                    yield element
+
+class JsonRpcTcpTraceWriter(object):
+    """
+    Writes every request with its response and timestamps as one JSON
+    line to the trace file, gzip compressed if the name ends with .gz.
+    It can be shared by the clients of several threads.
+    """
+
+    def __init__(self, file_name):
+        if file_name.endswith('.gz'):
+            self.__file = gzip.open(file_name, 'wt', encoding='utf-8')
+        else:
+            self.__file = open(file_name, 'w', encoding='utf-8')
+        self.__lock = threading.Lock()
+
+    def write(self, start, duration, request, response):
+        line = json.dumps({"time": start, "duration": duration, "request": request, "response": response}, separators=(',', ':'))
+        with self.__lock:
+            if self.__file is not None:
+                self.__file.write(line + "\n")
+
+    def close(self):
+        with self.__lock:
+            if self.__file is not None:
+                self.__file.close()
+                self.__file = None
+
+class JsonRpcTcpReplayServer(object):
+    """
+    Serves the responses recorded by JsonRpcTcpTraceWriter over one end of
+    a socket pair. A request gets the next recorded response to the same
+    method and params, else the next one to the same method, with the
+    request id put in.
+    """
+
+    def __init__(self, file_name, logger):
+        self.__logger = logger
+        self.__by_request = {}
+        self.__by_method = {}
+        trace = gzip.open(file_name, 'rt', encoding='utf-8') if file_name.endswith('.gz') else open(file_name, 'r', encoding='utf-8')
+        with trace:
+            for line in trace:
+                if len(line.strip()) == 0:
+                    continue
+                record = json.loads(line)
+                request = record['request']
+                self.__by_request.setdefault(self.__get_key(request), []).append(record['response'])
+                self.__by_method.setdefault(request['method'], []).append(record['response'])
+        self.__sock = None
+
+    def __get_key(self, request):
+        return json.dumps([request['method'], request.get('params')], sort_keys=True)
+
+    def __get_response(self, request):
+        for responses, key in [(self.__by_request, self.__get_key(request)), (self.__by_method, request['method'])]:
+            if len(responses.get(key, [])) > 0:
+                response = dict(responses[key].pop(0))
+                # keep the last one for the requests repeated more often than recorded
+                if len(responses[key]) == 0:
+                    responses[key].append(response)
+                response['id'] = request['id']
+                return response
+        return {"id": request['id'], "result": None, "error": "No recorded response for %s" % request['method']}
+
+    def connect(self):
+        self.__sock, client = socket.socketpair()
+        t = threading.Thread(name='replay', target=self.__serve, args=(self.__sock,))
+        t.daemon = True
+        t.start()
+        return client
+
+    def close(self):
+        if self.__sock is not None:
+            self.__sock.close()
+            self.__sock = None
+
+    def __serve(self, sock):
+        decoder = json.JSONDecoder()
+        text = ''
+        while True:
+            try:
+                data = sock.recv(65536)
+            except OSError:
                 break
-            response_text = data.strip().decode(sys.getdefaultencoding())
-            responselist.append(response_text)
-            if len(data) < self.__const.BUFFER:
+            if not data:
                 break
-        response = ''.join(responselist)
-        self.__logger.debug('CLIENT | RESPONSE: %s' % response)
-        self.__logger.debug('JSON response length in bytes: %d' % len(response))
-        if response == '':
+            text += data.decode('utf-8')
+            while True:
+                text = text.lstrip()
+                try:
+                    request, end = decoder.raw_decode(text)
+                except ValueError:
+                    break
+                text = text[end:]
+                if 'id' not in request:
+                    continue
+                try:
+                    sock.sendall((json.dumps(self.__get_response(request)) + "\n").encode('utf-8'))
+                except OSError:
+                    return
+
+class JsonRpcTcpReceiveBuffer(object):
+    """
+    Growable receive buffer. The socket reads straight into the free tail
+    of a single bytearray, with a read size that grows while reads keep
+    filling it, and every complete response is decoded to text once,
+    directly from the buffer memory. It keeps the pipelined responses
+    apart, it does not save memory: while a response is decoded both the
+    bytes and the text are held, like the chunks and their join were.
+    """
+
+    def __init__(self, read_size, max_read_size):
+        self.__min_read_size = read_size
+        self.__max_read_size = max(read_size, max_read_size)
+        self.clear()
+
+    def __len__(self):
+        return self.__end - self.__start
+
+    def clear(self):
+        self.__data = bytearray()
+        self.__start = 0
+        self.__end = 0
+        self.__scanned = 0
+        self.__read_size = self.__min_read_size
+        self.__discard = False
+        # the peer ends its values by newline, the fallback is of no use
+        self.__newline_framed = False
+
+    def discard_frame(self):
+        """ Drops the rest of the current frame, also the part not received yet. """
+        self.__discard = True
+        self.__drop_discarded()
+
+    def __drop_discarded(self):
+        if not self.__discard:
+            return
+        pos = self.__data.find(b'\n', self.__start, self.__end)
+        if pos < 0:
+            self.__consume(self.__end)
+            return
+        self.__discard = False
+        self.__consume(pos + 1)
+
+    def recv_from(self, sock):
+        """ Reads once from the socket, returns the number of bytes read. """
+        self.__reserve(self.__read_size)
+        with memoryview(self.__data) as view:
+            count = sock.recv_into(view[self.__end:], self.__read_size)
+        self.__end += count
+        if count == self.__read_size and self.__read_size < self.__max_read_size:
+            self.__read_size = min(self.__read_size * 2, self.__max_read_size)
+        return count
+
+    def read_frame(self, idle=False):
+        """
+        Returns the text of the first complete JSON value in the buffer
+        and removes it, or None if more data is needed. The peer is idle
+        when nothing came in for a while, the value may be complete then.
+        """
+        self.__drop_discarded()
+        if self.__discard:
             return None
+        while True:
+            # Delve encodes every response on its own line, newline closes the frame
+            pos = self.__data.find(b'\n', self.__scanned, self.__end)
+            if pos < 0:
+                self.__scanned = self.__end
+                return None if self.__newline_framed else self.__raw_decode_frame(idle)
+            self.__newline_framed = True
+            text = ''
+            if pos > self.__start:
+                try:
+                    with memoryview(self.__data) as view:
+                        text = str(view[self.__start:pos], 'utf-8')
+                except UnicodeDecodeError:
+                    self.__consume(pos + 1)
+                    raise JsonRpcTcpProtocolError(-32700)
+            self.__consume(pos + 1)
+            if len(text) > 0 and not text.isspace():
+                return text
+
+    def peek_id(self):
+        """
+        Returns (True, id) once the id of the next response can be read from
+        its first bytes, (True, None) if it does not start with an id field,
+        or (False, None) if more data is needed.
+        """
+        self.__drop_discarded()
+        if self.__discard:
+            return (False, None)
+        end = self.__data.find(b'\n', self.__start, self.__end)
+        final = end >= 0
+        if not final:
+            end = self.__end
+        end = min(end, self.__start + 256)
+        with memoryview(self.__data) as view:
+            text = str(view[self.__start:end], 'utf-8', 'ignore')
+        match = JSONRPC_ID_PREFIX.match(text)
+        if match is None:
+            return (final or len(text.lstrip()) >= 16, None)
         try:
-            json_obj = json.loads(response)
+            req_id, pos = json.JSONDecoder().raw_decode(text, match.end())
         except ValueError:
-            raise JsonRpcTcpProtocolError(-32700)
-        if type(json_obj) is dict and 'error' in json_obj and json_obj.get('error') is not None:
-            raise JsonRpcTcpProtocolError(-32701, json_obj.get('error'))
-        return json_obj
+            return (final, None)
+        return (True, req_id)
 
-    def _receive2(self, notify):
-        self.sock.setblocking(False)
-        responselist = []
-        start = False
-        while not notify and self.__sock_opened:
-            data = None
-            try:
-                data = self.sock.recv(self.__const.BUFFER)
-            except:
-                pass
-            if not data:
-                if start: 
-                    break
-                else:
-                    continue
-            else:
-                start = True
-            response_text = data.strip().decode(sys.getdefaultencoding())
-            responselist.append(response_text)
-        self.sock.setblocking(True)
-        response = ''.join(responselist)
-        self.__logger.debug('CLIENT | RESPONSE: %s' % response)
-        self.__logger.debug('JSON response length in bytes: %d' % len(response))
-        if response == '':
+    def read_stream(self, decoder):
+        """
+        Feeds the bytes of the current response to the stream decoder and
+        returns the array elements decoded so far.
+        """
+        pos = self.__data.find(b'\n', self.__start, self.__end)
+        final = pos >= 0
+        end = pos if final else self.__end
+        with memoryview(self.__data) as view:
+            elements = decoder.feed(view[self.__start:end], final)
+        self.__consume(end + 1 if final else end)
+        return elements
+
+    def __raw_decode_frame(self, idle):
+        # Fallback for peers which do not terminate values by newline
+        end = self.__end
+        while end > self.__start and self.__data[end - 1] in b' \t\r':
+            end -= 1
+        if end == self.__start or self.__data[end - 1] not in b'}]':
+            return None
+        # a partial value mostly has open brackets, it is not decoded on every read
+        if not idle and not self.__balanced(end):
             return None
         try:
-            json_obj = json.loads(response)
+            with memoryview(self.__data) as view:
+                text = str(view[self.__start:end], 'utf-8')
+            start = len(text) - len(text.lstrip())
+            json_obj, pos = json.JSONDecoder().raw_decode(text, start)
         except ValueError:
+            return None
+        self.__consume(self.__start + len(text[:pos].encode('utf-8')))
+        return text[start:pos]
+
+    def __balanced(self, end):
+        data = self.__data
+        return data.count(b'{', self.__start, end) == data.count(b'}', self.__start, end) and \
+            data.count(b'[', self.__start, end) == data.count(b']', self.__start, end)
+
+    def __consume(self, pos):
+        self.__start = pos
+        self.__scanned = max(self.__scanned, pos)
+        if self.__start == self.__end:
+            self.__start = self.__end = self.__scanned = 0
+            if len(self.__data) > 2 * self.__max_read_size:
+                # do not keep the memory of a huge response for the session
+                self.__data = bytearray()
+
+    def __reserve(self, size):
+        if len(self.__data) - self.__end >= size:
+            return
+        live = self.__end - self.__start
+        if self.__start > 0:
+            with memoryview(self.__data) as view:
+                view[:live] = view[self.__start:self.__end]
+            self.__scanned -= self.__start
+            self.__start = 0
+            self.__end = live
+        free = len(self.__data) - self.__end
+        if free < size:
+            # realloc may copy the live bytes, the new tail is zero filled
+            self.__data.extend(bytes(size - free))
+
+class JsonRpcTcpStreamDecoder(object):
+    """
+    Incremental decoder of one response, which yields the elements of the
+    result array under the given key one by one, so the whole array is
+    never held as text or as a list. The other fields are kept in response.
+    """
+
+    START, KEY, ARRAY = range(3)
+
+    def __init__(self, key):
+        self.__key = key
+        self.__utf8 = codecs.getincrementaldecoder('utf-8')()
+        self.__decoder = json.JSONDecoder()
+        self.__text = ''
+        self.__pos = 0
+        self.__state = self.START
+        self.__in_result = False
+        self.response = {}
+        self.done = False
+
+    def feed(self, data, final=False):
+        try:
+            self.__text = self.__text[self.__pos:] + self.__utf8.decode(data, final)
+        except UnicodeDecodeError:
             raise JsonRpcTcpProtocolError(-32700)
-        if type(json_obj) is dict and 'error' in json_obj and json_obj.get('error') is not None:
-            raise JsonRpcTcpProtocolError(-32701, json_obj.get('error'))
-        return json_obj
-        
+        self.__pos = 0
+        elements = []
+        self.__parse(elements)
+        if final and not self.done:
+            raise JsonRpcTcpProtocolError(-32700)
+        return elements
+
+    def __skip(self, text, pos):
+        while pos < len(text) and text[pos] in ' \t\r\n':
+            pos += 1
+        return pos
+
+    def __decode(self, text, pos):
+        # a value is complete only when a delimiter follows, a number could go on
+        try:
+            value, end = self.__decoder.raw_decode(text, pos)
+        except ValueError:
+            return (None, None)
+        if end >= len(text) or text[end] not in ' \t\r\n,:]}':
+            return (None, None)
+        return (value, end)
+
+    def __parse(self, elements):
+        text = self.__text
+        while not self.done:
+            pos = self.__skip(text, self.__pos)
+            if pos >= len(text):
+                return
+            ch = text[pos]
+            if self.__state == self.START:
+                if ch != '{':
+                    raise JsonRpcTcpProtocolError(-32700)
+                self.__state = self.KEY
+                self.__pos = pos + 1
+            elif self.__state == self.ARRAY:
+                if ch == ',':
+                    self.__pos = pos + 1
+                elif ch == ']':
+                    self.__state = self.KEY
+                    self.__pos = pos + 1
+                else:
+                    value, end = self.__decode(text, pos)
+                    if end is None:
+                        return
+                    elements.append(value)
+                    self.__pos = end
+            elif ch == ',':
+                self.__pos = pos + 1
+            elif ch == '}':
+                self.__pos = pos + 1
+                if self.__in_result:
+                    self.__in_result = False
+                else:
+                    self.done = True
+            else:
+                key, end = self.__decode(text, pos)
+                if end is None:
+                    return
+                colon = self.__skip(text, end)
+                if colon >= len(text):
+                    return
+                if text[colon] != ':':
+                    raise JsonRpcTcpProtocolError(-32700)
+                pos = self.__skip(text, colon + 1)
+                if pos >= len(text):
+                    return
+                if not self.__in_result and key == 'result' and text[pos] == '{':
+                    self.__in_result = True
+                    self.response['result'] = {}
+                    self.__pos = pos + 1
+                    continue
+                if self.__in_result and key == self.__key and text[pos] == '[':
+                    self.__state = self.ARRAY
+                    self.__pos = pos + 1
+                    continue
+                value, end = self.__decode(text, pos)
+                if end is None:
+                    return
+                if self.__in_result:
+                    self.response['result'][key] = value
+                else:
+                    self.response[key] = value
+                self.__pos = end
+
+class JsonRpcTcpStream(object):
+    """
+    Iterable over the elements of a streamed result array, see
+    JsonRpcTcpClient._call_stream. Can be iterated once.
+    """
+
+    def __init__(self, client, future, key):
+        self.__client = client
+        self.__future = future
+        self.__key = key
+
+    @property
+    def id(self):
+        return self.__future.id
+
+    def __iter__(self):
+        return self.__client._iter_stream(self.__future, self.__key)
+
+    def result(self):
+        """ The result without the streamed array, after the iteration. """
+        return self.__future.result()
+
+class JsonRpcTcpFuture(object):
+    """
+    The pending result of a pipelined request. It is resolved by the
+    client when the response with the same id is received, the optional
+    callback is then called with the future.
+    """
+
+    def __init__(self, req_id, deadline, client, callback=None, tag=None):
+        self.__req_id = req_id
+        self.__tag = tag
+        self.__client = client
+        self.__callback = callback
+        self.__response = None
+        self.__error = None
+        self.__done = False
+        self._deadline = deadline
+
+    @property
+    def id(self):
+        return self.__req_id
+
+    @property
+    def tag(self):
+        return self.__tag
+
+    @property
+    def _response(self):
+        if self.__error is not None:
+            raise self.__error
+        return self.__response
+
+    def done(self):
+        return self.__done
+
+    def cancel(self):
+        """ Abandons the request, its response is discarded when it arrives. """
+        self.__client._abandon(self, JsonRpcTcpProtocolError(-32807))
+
+    def result(self):
+        if not self.__done:
+            self.__client._wait(self)
+        if self.__error is not None:
+            raise self.__error
+        jsonrpctcp_validate_response(self.__response)
+        return self.__response['result']
+
+    def _set_response(self, response):
+        self.__response = response
+        self.__resolve()
+
+    def _set_error(self, e):
+        self.__error = e
+        self.__resolve()
+
+    def __resolve(self):
+        self.__done = True
+        if self.__callback is not None:
+            self.__callback(self)
+
 class JsonRpcTcpBatchResponses(object):
     """ 
     This is just a wrapper around the responses so you can 
     iterate or retrieve by single id.
     """
     
-    def __init__(self, responses, ids):
+    def __init__(self, responses, ids, errors=None):
         self.__responses = responses
         self.__ids = ids        
+        self.__errors = errors if errors is not None else {}
         response_by_id = {}
         for response in responses:
             response_id = response.get('id', None)
@@ -280,6 +968,8 @@ class JsonRpcTcpBatchResponses(object):
             yield self.get(request_id)
             
     def get(self, req_id):
+        if req_id in self.__errors:
+            raise self.__errors.pop(req_id)
         responses = self.__response_by_id.get(req_id, None)
         if not responses:
             responses = self.__response_by_id.get(None)
@@ -335,7 +1025,9 @@ class JsonRpcTcpClientRequest(object):
         self.__params = params
         if not self.__client._is_batch():
             return self.__client()
-        # Add batch logic here
+        # In batch mode the request is sent by the client call, the caller
+        # uses the id to retrieve the result from JsonRpcTcpBatchResponses
+        return self.__req_id
         
     def _request(self):
         request = {
@@ -1,7 +1,59 @@
-import sublime
+try:
+    import sublime
+except ImportError:
+    # outside the editor only DlvDefaults is of use, the benchmarks and tests run the worker with it
+    sublime = None
 import os
 
-class DlvConst(object):
+class DlvDefaults(object):
+    """
+    Defaults of the constants the worker and the JSON-RPC client read,
+    usable without the editor. DlvConst reads the settings on top of them.
+    """
+    STATE_COMMAND = 'state'
+    STACKTRACE_COMMAND = 'stacktrace'
+    GOROUTINE_COMMAND = 'goroutine'
+    VARIABLE_COMMAND = 'variable'
+    WATCH_COMMAND = 'watch'
+    CREATE_BREAKPOINT_COMMAND = 'createbreakpoint'
+    CLEAR_BREAKPOINT_COMMAND = 'clearbreakpoint'
+    BREAKPOINT_COMMAND = 'listbreakpoints'
+    CONTINUE_COMMAND = 'continue'
+    NEXT_COMMAND = 'next'
+    CANCEL_NEXT_COMMAND = 'cancelnext'
+    HALT_COMMAND = 'halt'
+    STEP_COMMAND = 'step'
+    STEPOUT_COMMAND = 'stepOut'
+    RESTART_COMMAND = 'restart'
+    DUMP_STACKS_COMMAND = 'dumpstacks'
+    RUNTIME_COMMANDS = [CONTINUE_COMMAND, NEXT_COMMAND, STEP_COMMAND, STEPOUT_COMMAND]
+    STDOUT = 'stdout'
+    DEFAULT_BINARY = 'dlv'
+    DEFAULT_HOST = 'localhost'
+    DEFAULT_PORT = 3456
+    DEFAULT_TIMEOUT = 10
+    # Initial socket read size, grows while reads fill it up to MAX_BUFFER
+    BUFFER = 65536
+    MAX_BUFFER = 4194304
+    # Goroutines handed over to the view per chunk while ListGoroutines is streamed
+    STREAM_CHUNK = 2000
+    DEBUG = False
+    TIMEOUT = DEFAULT_TIMEOUT
+    RECONNECT_ATTEMPTS = 5
+    # Delay before the first reconnect attempt in seconds, doubled for every next one
+    RECONNECT_DELAY = 0.5
+    RECONNECT_MAX_DELAY = 8
+    INSPECTION_CONNECTIONS = 1
+    INSPECTION_CACHE_SIZE = 16
+    PREFETCH_FRAMES = 1
+    GOROUTINE_PAGE_SIZE = 1000
+    TRACE_FILE = ''
+
+    @property
+    def TIMEOUTS(self):
+        return {"control": 0, "state": self.TIMEOUT, "inspection": self.TIMEOUT, "eval": self.TIMEOUT}
+
+class DlvConst(DlvDefaults):
     def __init__(self, window):
         self.__window = window
         self.__settings_file_name = "GoDebug.sublime-settings"
@@ -67,6 +119,13 @@ class DlvConst(object):
                 self.__close_at_stop_suffix: self.__get_breakpoint_close_at_stop,
                 self.__title_suffix: self.__get_breakpoint_title
             }, 
+            self.STACKS_VIEW: 
+            { 
+                self.__panel_group_suffix: self.__get_stacks_group, 
+                self.__open_at_start_suffix: self.__get_stacks_open_at_start, 
+                self.__close_at_stop_suffix: self.__get_stacks_close_at_stop,
+                self.__title_suffix: self.__get_stacks_title
+            }, 
         }
 
     def __get_settings(self, key, default):
@@ -138,66 +197,6 @@ class DlvConst(object):
     def save_watches(self, watches):
         self.__save_project_settings(self.__watch_settings_file_name, watches)
 
-    @property
-    def STATE_COMMAND(self):
-        return 'state'
-
-    @property
-    def STACKTRACE_COMMAND(self):
-        return 'stacktrace'
-
-    @property
-    def GOROUTINE_COMMAND(self):
-        return 'goroutine'
-
-    @property
-    def VARIABLE_COMMAND(self):
-        return 'variable'
-
-    @property
-    def WATCH_COMMAND(self):
-        return 'watch'
-
-    @property
-    def CREATE_BREAKPOINT_COMMAND(self):
-        return 'createbreakpoint'
-
-    @property
-    def CLEAR_BREAKPOINT_COMMAND(self):
-        return 'clearbreakpoint'
-
-    @property
-    def BREAKPOINT_COMMAND(self):
-        return 'listbreakpoints'
-
-    @property
-    def CONTINUE_COMMAND(self):
-        return 'continue'
-
-    @property
-    def NEXT_COMMAND(self):
-        return 'next'
-
-    @property
-    def CANCEL_NEXT_COMMAND(self):
-        return 'cancelnext'
-
-    @property
-    def STEP_COMMAND(self):
-        return 'step'
-
-    @property
-    def STEPOUT_COMMAND(self):
-        return 'stepOut'
-
-    @property
-    def RESTART_COMMAND(self):
-        return 'restart'
-
-    @property
-    def RUNTIME_COMMANDS(self):
-        return [self.CONTINUE_COMMAND, self.NEXT_COMMAND, self.STEP_COMMAND, self.STEPOUT_COMMAND]
-
     @property
     def PANEL_GROUP(self):
         return self.__panel_group_suffix
@@ -214,30 +213,6 @@ class DlvConst(object):
     def TITLE(self):
         return self.__title_suffix
 
-    @property
-    def STDOUT(self):
-        return 'stdout'
-
-    @property
-    def DEFAULT_BINARY(self):
-        return 'dlv'
-
-    @property
-    def DEFAULT_HOST(self):
-        return 'localhost'
-
-    @property
-    def DEFAULT_PORT(self):
-        return 3456
-
-    @property
-    def DEFAULT_TIMEOUT(self):
-        return 10
-
-    @property
-    def BUFFER(self):
-        return 4096
-
     @property
     def DEBUG_MODE(self):
         return 'debug'
@@ -275,6 +250,12 @@ class DlvConst(object):
     def PORT(self):
         return self.__get_settings('port', self.DEFAULT_PORT)
 
+    # If set, Delve server listens on a Unix domain socket in a temporary directory instead of host and port.
+    # Used for "local" or "test" mode, not on Windows
+    @property
+    def UNIX_SOCKET(self):
+        return self.__get_settings('unix_socket', False)
+
     # If set, Delve server run in logging mode. Used for "local" or "test" mode
     @property
     def LOG(self):
@@ -299,6 +280,60 @@ class DlvConst(object):
             value = self.DEFAULT_TIMEOUT
         return value
 
+    # Timeouts of the request classes in seconds, zero means no limit: "control" for continue, next, step,
+    # stepOut and restart, "state" for state and breakpoint changes, "inspection" for stacktrace, variables,
+    # goroutines and breakpoints, "eval" for watches. Requests over the time are abandoned, the session goes on
+    @property
+    def TIMEOUTS(self):
+        timeouts = {"control": 0, "state": self.TIMEOUT, "inspection": self.TIMEOUT, "eval": self.TIMEOUT}
+        value = self.__get_settings('timeouts', {})
+        if type(value) is dict:
+            for key in timeouts:
+                if key in value and value[key] >= 0:
+                    timeouts[key] = value[key]
+        return timeouts
+
+    # Attempts to restore a dropped connection to the Delve server, zero disables reconnect
+    @property
+    def RECONNECT_ATTEMPTS(self):
+        value = self.__get_settings('reconnect_attempts', DlvDefaults.RECONNECT_ATTEMPTS)
+        if value < 0:
+            value = 0
+        return value
+
+    # Number of the connections used for inspection (stack, variables, goroutines, watches),
+    # beside the one for the control commands, must be above zero
+    @property
+    def INSPECTION_CONNECTIONS(self):
+        value = self.__get_settings('inspection_connections', DlvDefaults.INSPECTION_CONNECTIONS)
+        if value <= 0:
+            value = 1
+        return value
+
+    # Memory for the inspection results of the current stop in megabytes, zero turns the cache off
+    @property
+    def INSPECTION_CACHE_SIZE(self):
+        value = self.__get_settings('inspection_cache_size', DlvDefaults.INSPECTION_CACHE_SIZE)
+        if value < 0:
+            value = 0
+        return value
+
+    # Frames of the current goroutine whose variables are read together with the stop
+    @property
+    def PREFETCH_FRAMES(self):
+        value = self.__get_settings('prefetch_frames', DlvDefaults.PREFETCH_FRAMES)
+        if value < 0:
+            value = 0
+        return value
+
+    # Goroutines read and shown per page of the goroutine view, zero reads and shows all of them
+    @property
+    def GOROUTINE_PAGE_SIZE(self):
+        value = self.__get_settings('goroutine_page_size', DlvDefaults.GOROUTINE_PAGE_SIZE)
+        if value < 0:
+            value = 0
+        return value
+
     # Save breakpoints to the settings file before start debug, restore when the project is loaded
     @property
     def SAVE_BREAKPOINT(self):
@@ -312,7 +347,7 @@ class DlvConst(object):
     # Whether to log the raw data read from and written to the Delve session and the inferior program
     @property
     def DEBUG(self):
-        return self.__get_settings('debug', False)
+        return self.__get_settings('debug', DlvDefaults.DEBUG)
 
     # File to optionally write all the raw data read from and written to the Delve session and the inferior program.
     # Must be set 'stdout' or file name. If file name set without full path, save into project directory
@@ -320,6 +355,15 @@ class DlvConst(object):
     def DEBUG_FILE(self):
         return self.__get_settings('debug_file', self.STDOUT)
 
+    # File to optionally record every request and response of the Delve session with timestamps, one JSON line each,
+    # gzip compressed if the name ends with ".gz". If file name set without full path, save into project directory
+    @property
+    def TRACE_FILE(self):
+        value = self.__get_settings('trace_file', DlvDefaults.TRACE_FILE)
+        if value != '' and not os.path.isabs(value) and self.__window.project_file_name() is not None:
+            value = os.path.join(os.path.dirname(self.__window.project_file_name()), value)
+        return value
+
     # Defalt Delve panel layout
     @property
     def PANEL_LAYOUT(self):
@@ -483,3 +527,24 @@ class DlvConst(object):
     # View title
     def __get_breakpoint_title(self):
         return self.__get_settings("%s_%s" % (self.BREAKPOINT_VIEW, self.__title_suffix), 'Delve Breakpoints')
+
+    # View name
+    @property
+    def STACKS_VIEW(self):
+        return "stacks"
+
+    # View group in Delve panel
+    def __get_stacks_group(self):
+        return self.__get_settings("%s_%s" % (self.STACKS_VIEW, self.__panel_group_suffix), 2)
+
+    # Open view when debugging starts
+    def __get_stacks_open_at_start(self):
+        return self.__get_settings("%s_%s" % (self.STACKS_VIEW, self.__open_at_start_suffix), False)
+
+    # Close view when debugging stops
+    def __get_stacks_close_at_stop(self):
+        return self.__get_settings("%s_%s" % (self.STACKS_VIEW, self.__close_at_stop_suffix), True)
+
+    # View title
+    def __get_stacks_title(self):
+        return self.__get_settings("%s_%s" % (self.STACKS_VIEW, self.__title_suffix), 'Delve Stacks')
@@ -0,0 +1,163 @@
+import threading
+import traceback
+import queue
+import sys
+
+from GoDebug.sdview import split_rows
+
+class DlvFrontend(object):
+    """
+    What the debugger core needs from the editor: dispatch to the main
+    thread, the status line and line markers in the views.
+    """
+    def set_timeout(self, callback, delay=0):
+        raise NotImplementedError
+
+    def status_message(self, message):
+        raise NotImplementedError
+
+    def add_marker(self, view, key, row, scope, icon):
+        raise NotImplementedError
+
+    def erase_marker(self, view, key):
+        raise NotImplementedError
+
+    def get_marker(self, view, key):
+        raise NotImplementedError
+
+class DlvSublimeFrontend(DlvFrontend):
+    def __init__(self):
+        import sublime
+        self.__sublime = sublime
+
+    def set_timeout(self, callback, delay=0):
+        self.__sublime.set_timeout(callback, delay)
+
+    def status_message(self, message):
+        self.__sublime.status_message(message)
+
+    def add_marker(self, view, key, row, scope, icon):
+        assert (row == 0 or view.text_point(row, 0) != 0)
+        view.add_regions(key, [view.line(view.text_point(row, 0))], scope, icon, self.__sublime.HIDDEN)
+
+    def erase_marker(self, view, key):
+        view.erase_regions(key)
+
+    def get_marker(self, view, key):
+        regions = view.get_regions(key)
+        if regions is None or len(regions) == 0:
+            return None
+        assert (len(regions) == 1)
+        return view.rowcol(regions[0].a)[0]
+
+class DlvMemoryFrontend(DlvFrontend):
+    """
+    Runs the callbacks in order on its own thread, which stands for the
+    main thread of the editor, and keeps the markers in DlvMemoryView.
+    """
+    def __init__(self, const, logger):
+        self.__const = const
+        self.__logger = logger
+        self.__queue = queue.Queue()
+        self.__lock = threading.Lock()
+        self.__thread = None
+        self.messages = []
+
+    def __run(self):
+        while True:
+            callback = self.__queue.get()
+            if callback is None:
+                break
+            try:
+                callback()
+            except:
+                traceback.print_exc(file=(sys.stdout if self.__logger.get_file() == self.__const.STDOUT else open(self.__logger.get_file(),"a")))
+                self.__logger.error("Exception thrown, details in file: %s" % self.__logger.get_file())
+
+    def set_timeout(self, callback, delay=0):
+        with self.__lock:
+            if self.__thread is None:
+                self.__thread = threading.Thread(name='frontend-main', target=self.__run)
+                self.__thread.daemon = True
+                self.__thread.start()
+        if delay > 0:
+            t = threading.Timer(delay / 1000.0, self.__queue.put, args=(callback,))
+            t.daemon = True
+            t.start()
+        else:
+            self.__queue.put(callback)
+
+    def stop(self):
+        with self.__lock:
+            thread = self.__thread
+            self.__thread = None
+        if thread is not None:
+            self.__queue.put(None)
+            if thread is not threading.current_thread():
+                thread.join()
+
+    def status_message(self, message):
+        self.messages.append(message)
+
+    def add_marker(self, view, key, row, scope, icon):
+        view.markers[key] = (row, scope, icon)
+
+    def erase_marker(self, view, key):
+        view.markers.pop(key, None)
+
+    def get_marker(self, view, key):
+        marker = view.markers.get(key)
+        return marker[0] if marker is not None else None
+
+class DlvMemoryView(object):
+    """ Text sink for DlvView outside the editor. """
+
+    __next_id = 0
+
+    def __init__(self, name=''):
+        DlvMemoryView.__next_id += 1
+        self.__id = DlvMemoryView.__next_id
+        self.__name = name
+        self.__text = []
+        self.markers = {}
+        self.commands = 0
+
+    def id(self):
+        return self.__id
+
+    def name(self):
+        return self.__name
+
+    def set_name(self, name):
+        self.__name = name
+
+    def window(self):
+        return None
+
+    def file_name(self):
+        return None
+
+    def size(self):
+        return sum(len(text) for text in self.__text)
+
+    def text(self):
+        return ''.join(self.__text)
+
+    def lines(self):
+        return [row.rstrip('\n') for row in split_rows(self.text())]
+
+    def run_command(self, cmd, args=None):
+        self.commands += 1
+        if cmd == "dlv_view_clear":
+            self.__text = []
+        elif cmd == "dlv_view_add_line":
+            self.__text.append(args["line"])
+        elif cmd == "dlv_view_set_text":
+            self.__text = [args["text"]]
+        elif cmd == "dlv_view_replace_lines":
+            lines = split_rows(self.text())
+            for first, last, text in reversed(args["changes"]):
+                lines[first:last] = [text]
+            self.__text = lines
+        else:
+            raise ValueError("Command %s is not supported" % cmd)
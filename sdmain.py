@@ -1,17 +1,21 @@
 import sublime
 import sublime_plugin
 import subprocess
-import threading
+import functools
 import traceback
 import os
 import sys 
 import re
 import signal
 import uuid
+import tempfile
+import shutil
 
 from GoDebug.sdconst import DlvConst
 from GoDebug.sdlogger import DlvLogger
 from GoDebug.sdworker import DlvWorker
+from GoDebug.sdpipe import DlvPipeReader
+from GoDebug.sdfrontend import DlvSublimeFrontend
 
 from GoDebug.sdview import DlvView
 from GoDebug.sdobjecttype import *
@@ -23,6 +27,7 @@ class DlvProject(object):
         self.window = window
         self.const = DlvConst(self.window)
         self.logger = DlvLogger(self.window, self.const)
+        self.frontend = DlvSublimeFrontend()
 
         self.cursor = ''
         self.cursor_position = 0
@@ -37,10 +42,15 @@ class DlvProject(object):
         self.command_history_pos = 0
 
         self.next_in_progress = False
+        self.current_goroutine_id = 0
 
         self.__session_proc = None
         self.__session_send_signal = False
         self.__server_proc = None
+        self.__cmd_session = None
+        self.__started_session = False
+        self.__socket_dir = None
+        self.__pipe_reader = DlvPipeReader(self.const, self.logger, self.dlv_output, self.dlv_output_closed)
 
         self.session_view = self.__initialize_view(self.const.SESSION_VIEW)
         self.console_view = self.__initialize_view(self.const.CONSOLE_VIEW)
@@ -49,11 +59,12 @@ class DlvProject(object):
         self.variable_view = self.__initialize_view(self.const.VARIABLE_VIEW)
         self.watch_view = self.__initialize_view(self.const.WATCH_VIEW)
         self.bkpt_view = self.__initialize_view(self.const.BREAKPOINT_VIEW)
+        self.stacks_view = self.__initialize_view(self.const.STACKS_VIEW)
 
         self.worker = DlvWorker(self, worker_callback)
 
     def get_views(self):
-        return [self.session_view, self.variable_view, self.watch_view, self.stacktrace_view, self.bkpt_view, self.goroutine_view]
+        return [self.session_view, self.variable_view, self.watch_view, self.stacktrace_view, self.bkpt_view, self.goroutine_view, self.stacks_view]
 
     def get_new_view(self, name, view):
         if name == self.const.SESSION_VIEW:
@@ -70,6 +81,8 @@ class DlvProject(object):
             return DlvVariableView(name, self, view)
         elif name == self.const.BREAKPOINT_VIEW:
             return DlvBreakpointView(self, view)
+        elif name == self.const.STACKS_VIEW:
+            return DlvStacksView(self, view)
         return None
 
     def __initialize_view(self, name):
@@ -83,6 +96,7 @@ class DlvProject(object):
         self.cursor = ''
         self.cursor_position = 0
         self.next_in_progress = False
+        self.current_goroutine_id = 0
 
     def panel_on_start(self):
         self.panel_window = self.window
@@ -141,7 +155,7 @@ class DlvProject(object):
             traceback.print_exc(file=(sys.stdout if self.logger.get_file() == self.const.STDOUT else open(self.logger.get_file(),"a")))
             self.logger.error("Exception thrown, details in file: %s" % self.logger.get_file())
         requests = []
-        requests.append({"cmd": self.const.STATE_COMMAND, "parms": None})
+        requests.append({"cmd": self.const.STATE_COMMAND, "parms": {"input": True}})
         self.add_breakpoint_request(requests)
         self.add_goroutine_request(requests)
         self.worker.do_batch(requests)
@@ -217,10 +231,27 @@ class DlvProject(object):
             self.const.clear_project_executable()
             self.logger.debug("Cleared project executable settings")
         self.worker.stop()
+        self.remove_socket_dir()
         self.logger.stop()
         self.clear_position()
         self.reset_cursor()
 
+    def create_socket_dir(self):
+        self.remove_socket_dir()
+        self.__socket_dir = tempfile.mkdtemp(prefix="godebug-")
+        self.logger.debug("Created Delve socket directory: %s" % self.__socket_dir)
+
+    def remove_socket_dir(self):
+        if self.__socket_dir is not None:
+            shutil.rmtree(self.__socket_dir, True)
+            self.logger.debug("Removed Delve socket directory: %s" % self.__socket_dir)
+            self.__socket_dir = None
+
+    def get_endpoint(self):
+        if self.__socket_dir is not None:
+            return ("unix:%s" % os.path.join(self.__socket_dir, "dlv.sock"), None)
+        return (self.const.HOST, self.const.PORT)
+
     def __open_subprocess(self, cmd, cwd=None):
         return subprocess.Popen(cmd, shell=False, cwd=cwd, universal_newlines=True,
             stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
@@ -242,10 +273,12 @@ class DlvProject(object):
                 self.cleanup_session()
             return             
         self.reset_cursor()
-        t = threading.Thread(target=self.dlv_output, args=(self.__session_proc.stdout,))
-        t.start()
-        t = threading.Thread(target=self.dlv_output, args=(self.__session_proc.stderr,))
-        t.start()
+        self.frontend.set_timeout(self.show_input, 0)
+        self.logger.debug("Input field is ready")
+        self.frontend.set_timeout(self.bkpt_view.sync_breakpoints, 0)
+        self.frontend.set_timeout(functools.partial(set_status_message, "Delve session started"), 0)
+        self.__pipe_reader.add(self.__session_proc.stdout)
+        self.__pipe_reader.add(self.__session_proc.stderr)
 
     def load_server_subprocess(self, cmd_server, cmd_session, cwd):
         set_status_message("Starts Delve server, wait...")
@@ -263,94 +296,73 @@ class DlvProject(object):
             self.terminate_server()
             self.cleanup_session()
             return             
-        t = threading.Thread(target=self.dlv_output, args=(self.__server_proc.stdout, cmd_session))
-        t.start()
-        t = threading.Thread(target=self.dlv_output, args=(self.__server_proc.stderr,))
-        t.start()
+        self.__cmd_session = cmd_session
+        self.__started_session = False
+        self.__pipe_reader.add(self.__server_proc.stdout)
+        self.__pipe_reader.add(self.__server_proc.stderr)
 
-    def dlv_output(self, pipe, cmd_session=None):
-        started_session = False
+    def dlv_output(self, pipe, line):
         # reaesc = re.compile(r'\x1b[^m]*m')
         reaesc = re.compile(r'\x1b\[[\d;]*m')
 
-        if self.__session_proc is not None and pipe == self.__session_proc.stdout:
-            sublime.set_timeout(self.show_input, 0)
-            self.logger.debug("Input field is ready")
-            sublime.set_timeout(self.bkpt_view.sync_breakpoints, 0)
-            sublime.set_timeout(set_status_message("Delve session started"), 0)
-
-        while True:
-            try:
-                line = pipe.readline()
-                if len(line) == 0:
-                    if self.is_local_mode() and self.__server_proc is not None:
-                        if pipe in [self.__server_proc.stdout, self.__server_proc.stderr]:
-                            self.logger.error("Broken %s pipe of the Delve server" % \
-                                ("stdout" if pipe == self.__server_proc.stdout else "stderr"))
-                            break
-                    if self.__session_proc is not None and self.__session_proc.stdout is not None:
-                        self.logger.error("Broken %s pipe of the Delve session" % \
-                            ("stdout" if pipe == self.__session_proc.stdout else "stderr"))
-                    break
-                else:
-                    line = reaesc.sub('', line)
-                    line = line.replace("\\n", "\n").replace("\\\"", "\"").replace("\\t", "\t")
-    #                line = line.replace('\n', '') #alternative of line above
-                    if line.startswith("(dlv)"):
-                        line = line.replace("(dlv)", "")
-                    line = line.strip()
-                    if len(line) == 0:
-                        continue
-                if self.__session_proc is not None:
-                    if pipe == self.__session_proc.stdout:
-                        self.session_view.add_line(line)
-                        self.logger.info("Session stdout: " + line)
-                    elif pipe == self.__session_proc.stderr:
-                        self.session_view.add_line(line)
-                        self.logger.error("Session stderr: " + line)
-                if self.__server_proc is not None:
-                    if pipe == self.__server_proc.stdout:
-                        self.console_view.add_line(line)
-                        self.logger.info("Server stdout: " + line)
-                        if not started_session:
-                            self.logger.debug("Delve server is working, try to start Delve Session")
-                            lock = threading.RLock()
-                            lock.acquire()
-                            sublime.set_timeout(self.load_session_subprocess(cmd_session), 0)
-                            started_session = True
-                            lock.release()
-                    elif pipe == self.__server_proc.stderr:
-                        self.console_view.add_line(line)
-                        self.logger.error("Server stderr: " + line)
-            except:
-                traceback.print_exc(file=(sys.stdout if self.logger.get_file() == self.const.STDOUT else open(self.logger.get_file(),"a")))
-                self.logger.error("Exception thrown, details in file: %s" % self.logger.get_file())
+        line = reaesc.sub('', line)
+        line = line.replace("\\n", "\n").replace("\\\"", "\"").replace("\\t", "\t")
+#        line = line.replace('\n', '') #alternative of line above
+        if line.startswith("(dlv)"):
+            line = line.replace("(dlv)", "")
+        line = line.strip()
+        if len(line) == 0:
+            return
+        if self.__session_proc is not None:
+            if pipe == self.__session_proc.stdout:
+                self.session_view.add_line(line)
+                self.logger.info("Session stdout: " + line)
+            elif pipe == self.__session_proc.stderr:
+                self.session_view.add_line(line)
+                self.logger.error("Session stderr: " + line)
+        if self.__server_proc is not None:
+            if pipe == self.__server_proc.stdout:
+                self.console_view.add_line(line)
+                self.logger.info("Server stdout: " + line)
+                if not self.__started_session:
+                    self.logger.debug("Delve server is working, try to start Delve Session")
+                    self.__started_session = True
+                    self.frontend.set_timeout(functools.partial(self.load_session_subprocess, self.__cmd_session), 0)
+            elif pipe == self.__server_proc.stderr:
+                self.console_view.add_line(line)
+                self.logger.error("Server stderr: " + line)
+
+    def dlv_output_closed(self, pipe):
+        if self.is_local_mode() and self.__server_proc is not None and pipe in [self.__server_proc.stdout, self.__server_proc.stderr]:
+            self.logger.error("Broken %s pipe of the Delve server" % \
+                ("stdout" if pipe == self.__server_proc.stdout else "stderr"))
+        elif self.__session_proc is not None and self.__session_proc.stdout is not None:
+            self.logger.error("Broken %s pipe of the Delve session" % \
+                ("stdout" if pipe == self.__session_proc.stdout else "stderr"))
 
         if self.__session_proc is not None and pipe == self.__session_proc.stdout:
             message = "Delve session closed"
-            sublime.set_timeout(set_status_message(message), 0)
+            self.frontend.set_timeout(functools.partial(set_status_message, message), 0)
             self.logger.info(message)
-            # sublime.set_timeout(self.terminate_server, 0)
+            # self.frontend.set_timeout(self.terminate_server, 0)
         if self.__server_proc is not None and pipe == self.__server_proc.stdout:
             self.logger.info("Delve server closed")
-            sublime.set_timeout(self.terminate_session, 0)
+            self.frontend.set_timeout(self.terminate_session, 0)
         if (not self.is_local_mode() and self.__session_proc is not None and pipe == self.__session_proc.stdout) or \
                     (self.is_local_mode() and self.__server_proc is not None and pipe == self.__server_proc.stdout):
-            sublime.set_timeout(self.cleanup_session, 0)
+            self.frontend.set_timeout(self.cleanup_session, 0)
 
     def clear_position(self):
         if self.last_cursor_view is not None:
-            region = self.last_cursor_view.get_regions(self.const.DLV_REGION)
-            if region is None or len(region) == 0:
+            row = self.frontend.get_marker(self.last_cursor_view, self.const.DLV_REGION)
+            if row is None:
                 self.last_cursor_view = None
                 return
-            assert (len(region) == 1)
-            row, col = self.last_cursor_view.rowcol(region[0].a)
             bkpt = self.bkpt_view.find_breakpoint(self.last_cursor_view.file_name(), row + 1)
             if self.last_cursor_view is not None:
-                self.last_cursor_view.erase_regions(self.const.DLV_REGION)
+                self.frontend.erase_marker(self.last_cursor_view, self.const.DLV_REGION)
             if bkpt is not None:
-                bkpt._show(self.is_running(), self.last_cursor_view)
+                bkpt._show(self.is_running(), self.last_cursor_view, self.frontend)
             self.last_cursor_view = None
 
     def update_position(self, view):
@@ -358,9 +370,8 @@ class DlvProject(object):
         if self.is_running() and self.cursor == view.file_name() and self.cursor_position != 0:
             bkpt = self.bkpt_view.find_breakpoint(self.cursor, self.cursor_position)
             if bkpt is not None:
-                bkpt._hide(view)
-            view.add_regions(self.const.DLV_REGION, [view.line(view.text_point(self.cursor_position - 1, 0))], \
-                "entity.name.class", "bookmark", sublime.HIDDEN)
+                bkpt._hide(view, self.frontend)
+            self.frontend.add_marker(view, self.const.DLV_REGION, self.cursor_position - 1, "entity.name.class", "bookmark")
             self.last_cursor_view = view
 
     def add_breakpoint_request(self, requests):
@@ -369,11 +380,15 @@ class DlvProject(object):
 
     def add_goroutine_request(self, requests):
         assert (self.is_running())
-        requests.append({"cmd": self.const.GOROUTINE_COMMAND, "parms": None})
+        # data is read for the open views only, the others load it when they are opened
+        if self.goroutine_view.is_open():
+            requests.append({"cmd": self.const.GOROUTINE_COMMAND, "parms": self.goroutine_view.get_request_parms()})
+        elif self.stacktrace_view.is_open() or self.variable_view.is_open() or self.watch_view.is_open():
+            requests.append({"cmd": self.const.GOROUTINE_COMMAND, "parms": {"list": False}})
 
     def add_watch_request(self, requests):
         assert (self.is_running())
-        if self.watch_view.is_watches_exist():
+        if self.watch_view.is_open() and self.watch_view.is_watches_exist():
             goroutine_id = self.goroutine_view.get_selected_goroutine_id()
             frame = self.stacktrace_view.get_selected_frame()
             parms = {"watches": self.watch_view.get_watches_as_parm()}
@@ -384,7 +399,48 @@ class DlvProject(object):
 
     def add_variable_request(self, requests, parms):
         assert (self.is_running())
-        requests.append({"cmd": self.const.VARIABLE_COMMAND, "parms": parms})
+        if self.variable_view.is_open():
+            requests.append({"cmd": self.const.VARIABLE_COMMAND, "parms": parms})
+
+    def load_goroutine(self, goroutine_id):
+        requests = []
+        if self.stacktrace_view.is_open():
+            requests.append({"cmd": self.const.STACKTRACE_COMMAND, "parms": {"goroutine_id": goroutine_id}})
+        else:
+            self.add_variable_request(requests, {"goroutine_id": goroutine_id, "frame": 0})
+            self.add_watch_request(requests)
+        if len(requests) > 0:
+            self.worker.do_batch(requests)
+
+    def load_goroutine_page(self, start, find=None, group=None):
+        if not self.is_running() or self.worker.is_executing():
+            return
+        parms = {"goroutine_id": self.current_goroutine_id, "start": start, "scroll": True}
+        if find is not None:
+            parms['find'] = find
+        if group is not None:
+            parms['group'] = group
+        self.worker.do_batch([{"cmd": self.const.GOROUTINE_COMMAND, "parms": parms}])
+
+    def load_view(self, view):
+        if not self.is_running() or self.worker.is_executing():
+            return
+        requests = []
+        goroutine_id = self.goroutine_view.get_selected_goroutine_id()
+        if view == self.goroutine_view:
+            parms = self.goroutine_view.get_request_parms()
+            parms['goroutine_id'] = self.current_goroutine_id
+            requests.append({"cmd": self.const.GOROUTINE_COMMAND, "parms": parms})
+        elif goroutine_id <= 0:
+            return
+        elif view == self.stacktrace_view:
+            requests.append({"cmd": self.const.STACKTRACE_COMMAND, "parms": {"goroutine_id": goroutine_id}})
+        elif view == self.variable_view:
+            self.add_variable_request(requests, {"goroutine_id": goroutine_id, "frame": self.stacktrace_view.get_selected_frame()})
+        elif view == self.watch_view:
+            self.add_watch_request(requests)
+        if len(requests) > 0:
+            self.worker.do_batch(requests)
 
     def is_local_mode(self):
         return self.const.MODE in [self.const.DEBUG_MODE, self.const.TEST_MODE]
@@ -436,6 +492,7 @@ def worker_callback(prj, responses):
     bkpts_add = [] 
     bkpts_del = []
     commonResult = True
+    stopped = False
 
     for response in responses:
         cmd = response['cmd']
@@ -483,9 +540,11 @@ def worker_callback(prj, responses):
                 if view not in update_views:
                     update_views.append(view)
         elif cmd == const.GOROUTINE_COMMAND:
-            if result:
+            if result and response['response'] is None:
+                prj.goroutine_view.select_current_goroutine(response['current_goroutine_id'])
+            elif result:
                 view = prj.goroutine_view
-                view.load_data(response['response'], response['current_goroutine_id'])
+                view.load_data(response['response'], response.get('current_goroutine_id'), response.get('offset', 0), response.get('partial', False), response.get('page'), response.get('group'))
                 if view not in update_views:
                     update_views.append(view)
         elif cmd == const.STACKTRACE_COMMAND:
@@ -506,6 +565,12 @@ def worker_callback(prj, responses):
                 view.load_watch(response['response'])
                 if view not in update_views:
                     update_views.append(view)
+        elif cmd == const.DUMP_STACKS_COMMAND:
+            if result:
+                view = prj.stacks_view
+                view.load_data(response['response'], response['parms'], response.get('partial', False))
+                if view not in update_views:
+                    update_views.append(view)
         elif cmd == const.STATE_COMMAND:
             if not result and error_code != -32803:
                 prj.terminate_session()
@@ -514,6 +579,7 @@ def worker_callback(prj, responses):
             prj.terminate_session(prj.is_local_mode())
             return
         if result and type(response['response']) is dict and 'State' in response['response']:
+            stopped = stopped or cmd != const.STATE_COMMAND
             state = DlvStateType()
             state._update(response['response'])
             prj.next_in_progress = state.NextInProgress
@@ -531,8 +597,16 @@ def worker_callback(prj, responses):
             if view is None:
                 window.focus_group(0)
             update_position_view = window.open_file("%s:%d" % (thread.file, thread.line), sublime.ENCODED_POSITION)
+            if stopped or (thread.goroutineID, thread.file, thread.line) != (prj.current_goroutine_id, prj.cursor, prj.cursor_position):
+                # a goroutine selected at the former stop is not loaded by the views opened later
+                prj.goroutine_view.reset_selection(thread.goroutineID)
             prj.cursor = thread.file
             prj.cursor_position = thread.line
+            prj.current_goroutine_id = thread.goroutineID
+        prj.goroutine_view.set_current_goroutine(state._get_goroutine())
+        if prj.stacks_view.is_dumping():
+            # the program moved on, the worker dropped the dump
+            prj.stacks_view.cancel_dump()
 
     prj.bkpt_view.upgrade_breakpoints(bkpts_add, bkpts_del)
 
@@ -548,162 +622,6 @@ def worker_callback(prj, responses):
     if not commonResult:
         set_status_message("Errors occured, details in file: %s" % prj.logger.get_file())
 
-class DlvBreakpointType(DlvObjectType):
-    def __init__(self, file=None, line=None, **kwargs):
-        super(DlvBreakpointType, self).__init__("Breakpoint", **kwargs)
-        self.__file = file
-        self.__line = line
-        self.__original_line = line
-        self.__showed = False
-        self.__show_running = False
-        self.__uuid = None
-        self.__error_message = None
-
-    def __getattr__(self, attr):
-        if attr == "file" and self.__file is not None:
-            return self.__file
-        if attr == "line" and self.__line is not None:
-            return self.__line
-        return super(DlvBreakpointType, self).__getattr__(attr)
-
-    @property
-    def _as_parm(self):
-        response = super(DlvBreakpointType, self)._as_parm
-        if self.__file is not None:
-            response[self._object_name]['file'] = self.__file
-        if self.__line is not None:
-            response[self._object_name]['line'] = self.__line
-        return response
-
-    @property
-    def _key(self):
-        if self.__original_line is None:
-            self.__original_line = self.line
-        return "dlv.bkpt%s" % self.__original_line
-
-    def _set_error_message(self, error_message=None):
-        self.__error_message = error_message if error_message is not None else '<not available>'
-
-    def _reset_error_message(self):
-        self.__error_message = None  
-
-    def _is_error(self):
-        return (self.__error_message != None)
-
-    def _set_uuid(self, uuid):
-        self.__uuid = uuid
-
-    def _get_uuid(self):
-        return self.__uuid
-
-    def _update_line(self, line):
-        assert (self.__original_line is not None)
-        self.__line = line
-
-    def _show(self, running, view):
-        assert (view is not None)
-        if not self.__showed or running != self.__show_running:
-            icon_file = "Packages/GoDebug/%s" % ('bkpt_active.png' if running and not self._is_error() else 'bkpt_inactive.png')
-            assert (view.text_point(self.line - 1, 0) != 0)
-            view.add_regions(self._key, [view.line(view.text_point(self.line - 1, 0))], "keyword.dlv", icon_file, sublime.HIDDEN)
-            self.__showed = True
-            self.__show_running = running
-
-    def _hide(self, view):
-        assert (view is not None)
-        if self.__showed:
-            view.erase_regions(self._key)
-            self.__showed = False
-            self.__show_running = False
-
-    def _was_hided(self):
-        self.__showed = False
-        self.__show_running = False
-
-    def _is_loaded(self):
-        return hasattr(self, 'id')
-
-    def _format(self, running):
-        output = "\"%s:%d\"" % (os.path.basename(self.file), self.line)
-        if running:
-            if not self._is_error():
-                if self._is_loaded():
-                    output +=  " %d" % self.id
-            else:
-                output +=  " \"%s\"" % self.__error_message
-        return output
-
-class DlvStateType(DlvObjectType):
-    def __init__(self, **kwargs):
-        super(DlvStateType, self).__init__("State", **kwargs)
-
-    def _get_thread(self, name=None):
-        thread = DlvThreadType()
-        if name is None:
-            name = thread._object_name
-        value = self._kwargs.get(name, None)
-        if value is not None:
-            obj_value = {}
-            obj_value[thread._object_name] = value
-            thread._update(obj_value)
-            return thread
-        else:
-            return None
-
-class DlvLocationType(DlvObjectType):
-    def __init__(self, **kwargs):
-        super(DlvLocationType, self).__init__("Location", **kwargs)
-
-    def _get_variables(self):
-        variables = []
-        for element in self.Locals:
-            var = DlvtVariableType()
-            var._update({"Variable": element})
-            variables.append(var)
-        for element in self.Arguments:
-            var = DlvtVariableType()
-            var._update({"Variable": element})
-            variables.append(var)
-        return variables
-
-    def _format(self):
-        return "%s \"%s:%d\"" % (os.path.basename(self.function['name']), os.path.basename(self.file), self.line)
-
-class DlvThreadType(DlvObjectType):
-    def __init__(self, **kwargs):
-        super(DlvThreadType, self).__init__("Thread", **kwargs)
-
-    def _get_breakpoint(self, name=None):
-        breakpoint = DlvBreakpointType(self.file, self.line)
-        if name is None:
-            name = breakpoint._object_name
-        value = self._kwargs.get(name, None)
-        if value is not None:
-            obj_value = {}
-            obj_value[breakpoint._object_name] = value
-            breakpoint._update(obj_value)
-            return breakpoint
-        else:
-            return None
-
-    def _format(self):
-        return "%d\t%s" % (self.id, self.function['name'])
-
-class DlvGoroutineType(DlvObjectType):
-    def __init__(self, **kwargs):
-        super(DlvGoroutineType, self).__init__("Goroutine", **kwargs)
-
-    @property
-    def _current_file(self):
-        return self.currentLoc['file']
-
-    @property
-    def _current_line(self):
-        return self.currentLoc['line']
-
-    def _format(self):
-        return "%s \"%s:%d\" %d" % (os.path.basename(self.currentLoc['function']['name']), os.path.basename(self.currentLoc['file']), self.currentLoc['line'], self.id)
-
 class DlvSessionView(DlvView):
     def __init__(self, prj, view):
         super(DlvSessionView, self).__init__(prj.const.SESSION_VIEW, prj.window, prj.const, view, True)
@@ -760,7 +678,7 @@ class DlvBreakpointView(DlvView):
                 running = self.__prj.is_running()
                 if not running or running and not \
                             (self.__prj.cursor_position == cur_bkpt.line and self.__prj.cursor == cur_bkpt.file):
-                    cur_bkpt._show(running, update_view)
+                    cur_bkpt._show(running, update_view, self.__prj.frontend)
             need_update = True
         for bkpt in bkpts_del:
             cur_bkpt = self.find_breakpoint(bkpt.file, bkpt.line)
@@ -769,7 +687,7 @@ class DlvBreakpointView(DlvView):
                 continue
             update_view = self.window.find_open_file(cur_bkpt.file)
             if update_view is not None:
-                cur_bkpt._hide(update_view)
+                cur_bkpt._hide(update_view, self.__prj.frontend)
             self.__breakpoints.remove(cur_bkpt)
             need_update = True
         return need_update
@@ -795,23 +713,21 @@ class DlvBreakpointView(DlvView):
                     running = self.__prj.is_running()
                     if not running or running and not \
                                 (self.__prj.cursor_position == bkpt.line and self.__prj.cursor == bkpt.file):
-                        bkpt._show(running, view)
+                        bkpt._show(running, view, self.__prj.frontend)
 
     def clear_markers(self):
         for bkpt in self.__breakpoints:
             view = self.window.find_open_file(bkpt.file)
             if view is None:
                 continue
-            bkpt._hide(view)
+            bkpt._hide(view, self.__prj.frontend)
                             
     def update_view(self):
-        super(DlvBreakpointView, self).update_view()
         if not self.is_open():
             return
         self.__breakpoints.sort(key=lambda b: (b.file, b.line))
         running = self.__prj.is_running()
-        for bkpt in self.__breakpoints:
-            self.add_line(bkpt._format(running))
+        self.set_lines([bkpt._format(running) for bkpt in self.__breakpoints])
 
     def find_breakpoint_by_idx(self, idx):
         if idx >= 0 and idx < len(self.__breakpoints):
@@ -908,9 +824,8 @@ class DlvBreakpointView(DlvView):
                     continue
                 else:
                     cur_view = view
-            region = cur_view.get_regions(bkpt._key)
-            assert (len(region) == 1)
-            row, col = cur_view.rowcol(region[0].a)
+            row = self.__prj.frontend.get_marker(cur_view, bkpt._key)
+            assert (row is not None)
             row += 1
             if bkpt.line != row:
                 bkpt._update_line(row)
@@ -941,11 +856,11 @@ class DlvStacktraceView(DlvView):
         super(DlvStacktraceView, self).clear(reset)
 
     def get_selected_frame(self):
-        return self.__cursor_position
+        return self.__cursor_position if self.is_open() else 0
 
     def select_location(self, view=None):
         if len(self.__locations) == 0:
-            self.view.erase_regions("dlv.location_pos")
+            self.__prj.frontend.erase_marker(self.view, "dlv.location_pos")
             return
         loc = None
         if view is not None:
@@ -953,7 +868,7 @@ class DlvStacktraceView(DlvView):
             if new_row == self.__cursor_position or new_row >= len(self.__locations):
                 return
             else:
-                self.view.erase_regions("dlv.location_pos")
+                self.__prj.frontend.erase_marker(self.view, "dlv.location_pos")
                 self.__cursor_position = new_row
                 loc = self.__locations[new_row]
                 find_view = self.window.find_open_file(loc.file)
@@ -962,15 +877,15 @@ class DlvStacktraceView(DlvView):
                 self.window.open_file("%s:%d" % (loc.file, loc.line), sublime.ENCODED_POSITION)
         if loc is None:
             loc = self.__locations[self.__cursor_position]
-        self.view.add_regions("dlv.location_pos", [self.view.line(self.view.text_point(self.__cursor_position, 0))], \
-            "entity.name.class", "bookmark" if self.__prj.goroutine_view.is_current_goroutine_selected() and \
-                        self.__cursor_position == 0 else "dot", sublime.HIDDEN)
+        self.__prj.frontend.add_marker(self.view, "dlv.location_pos", self.__cursor_position, "entity.name.class", \
+            "bookmark" if self.__prj.goroutine_view.is_current_goroutine_selected() and self.__cursor_position == 0 else "dot")
         goroutine_id = self.__prj.goroutine_view.get_selected_goroutine_id()
         assert (goroutine_id > 0)
         requests = []
         self.__prj.add_variable_request(requests, {"goroutine_id": goroutine_id, "frame": self.__cursor_position})
         self.__prj.add_watch_request(requests)
-        self.__prj.worker.do_batch(requests)
+        if len(requests) > 0:
+            self.__prj.worker.do_batch(requests)
 
     def load_data(self, data):
         self.__reset()
@@ -982,255 +897,446 @@ class DlvStacktraceView(DlvView):
             self.__locations.append(loc)
 
     def update_view(self):
-        super(DlvStacktraceView, self).update_view()
         if not self.is_open():
             return
-        for loc in self.__locations:
-            self.add_line(loc._format(), '')
+        self.set_lines([loc._format() for loc in self.__locations], '')
         self.select_location()
 
 class DlvGoroutineView(DlvView):
     def __init__(self, prj, view):
         super(DlvGoroutineView, self).__init__(prj.const.GOROUTINE_VIEW, prj.window, prj.const, view)
         self.__prj = prj
+        self.__start = 0
+        # Start and rows of the pages before the shown one
+        self.__pages = []
+        self.__current_goroutine = None
+        self.__group = None
         self.__reset()
 
     def __reset(self):
         self.__goroutines = []                
+        self.__groups = []
+        self.__next = -1
+        self.__count = 0
+        self.__complete = False
+        self.__loaded_from = 0
+        self.__partial = False
+        self.__rows = []
         self.__cursor_position = 0
-        self.__current_goroutine_position = -1
+        self.__current_goroutine_id = 0
         self.__selected_goroutine_id = 0
+        self.__load_selected = False
 
     def open(self, reset=False):
         super(DlvGoroutineView, self).open(reset)
         if self.is_open():
             self.set_syntax("Packages/GoDebug/GoDebug.tmLanguage")
             if reset:
+                self.__start = 0
+                self.__pages = []
+                self.__current_goroutine = None
                 self.__reset()
             self.update_view()
 
     def clear(self, reset=False):
         if reset:
+            self.__start = 0
+            self.__pages = []
+            self.__current_goroutine = None
             self.__reset()
         super(DlvGoroutineView, self).clear(reset)
 
     def is_current_goroutine_selected(self):
-        return self.__cursor_position == self.__current_goroutine_position
+        return self.__selected_goroutine_id == self.__current_goroutine_id
 
     def get_selected_goroutine_id(self):
         return self.__selected_goroutine_id
 
+    def get_request_parms(self):
+        if self.__group is not None:
+            return {"group": dict(self.__group)}
+        return {"start": self.__start}
+
+    def set_group(self, group):
+        # None shows the list of the goroutines, else their number per location
+        self.__group = group
+        self.__start = 0
+        self.__pages = []
+        self.__reset()
+        self.update_view()
+        self.__prj.load_view(self)
+
+    def __expand_group(self, element):
+        element['expanded'] = not element['expanded']
+        if element['expanded'] and element['members'] is None:
+            self.__load_members()
+        self.update_view()
+
+    def __load_members(self):
+        # one request for all the groups to load, a newer one supersedes the older
+        names = [element['name'] for element in self.__groups if element['expanded'] and element['members'] is None]
+        if len(names) > 0:
+            self.__prj.load_goroutine_page(0, group=dict(self.__group, expand=names))
+
+    def set_current_goroutine(self, goroutine):
+        # the goroutine of the stop, shown on top when it is not on the page
+        self.__current_goroutine = goroutine
+
+    def __find_row(self, goroutine_id):
+        idx = 0
+        for kind, gr in self.__rows:
+            if kind in ["current", "goroutine"] and gr.id == goroutine_id:
+                return idx
+            idx += 1
+        return -1
+
     def select_goroutine(self, view=None):
-        if len(self.__goroutines) == 0:
-            self.view.erase_regions("dlv.goroutine_pos")
-            return
-        gr = None
         if view is not None:
             new_row, new_col = self.view.rowcol(view.sel()[0].a)
-            if new_row == self.__cursor_position or new_row >= len(self.__goroutines):
+            if new_row == self.__cursor_position or new_row >= len(self.__rows):
                 return
-            else:
-                self.view.erase_regions("dlv.goroutine_pos")
-                self.__cursor_position = new_row
-                gr = self.__goroutines[new_row]
-                find_view = self.window.find_open_file(gr._current_file)
-                if find_view is None:
-                    self.window.focus_group(0)
-                self.window.open_file("%s:%d" % (gr._current_file, gr._current_line), sublime.ENCODED_POSITION)
-        if gr is None:
-            gr = self.__goroutines[self.__cursor_position]
-        self.__selected_goroutine_id = gr.id
-        self.view.add_regions("dlv.goroutine_pos", [self.view.line(self.view.text_point(self.__cursor_position, 0))], \
-            "entity.name.class", "dot" if not self.is_current_goroutine_selected() else "bookmark", sublime.HIDDEN)
-        self.__prj.worker.do(self.const.STACKTRACE_COMMAND, {"goroutine_id": self.__selected_goroutine_id})
-
-    def load_data(self, data, current_goroutine_id):
+            kind, gr = self.__rows[new_row]
+            if kind == "previous":
+                self.__prj.load_goroutine_page(self.__pages[-1][0] if len(self.__pages) > 0 else 0)
+                return
+            elif kind == "next":
+                self.__prj.load_goroutine_page(self.__next)
+                return
+            elif kind == "group":
+                self.__expand_group(gr)
+                return
+            elif kind not in ["current", "goroutine"]:
+                return
+            find_view = self.window.find_open_file(gr._current_file)
+            if find_view is None:
+                self.window.focus_group(0)
+            self.window.open_file("%s:%d" % (gr._current_file, gr._current_line), sublime.ENCODED_POSITION)
+            self.__selected_goroutine_id = gr.id
+            self.__load_selected = True
+        self.__cursor_position = self.__find_row(self.__selected_goroutine_id)
+        if self.__cursor_position < 0:
+            self.__prj.frontend.erase_marker(self.view, "dlv.goroutine_pos")
+        else:
+            self.__prj.frontend.add_marker(self.view, "dlv.goroutine_pos", self.__cursor_position, "entity.name.class", \
+                "dot" if not self.is_current_goroutine_selected() else "bookmark")
+        if self.__load_selected and self.__selected_goroutine_id > 0:
+            self.__load_selected = False
+            self.__prj.load_goroutine(self.__selected_goroutine_id)
+
+    def find_goroutine(self, find):
+        if find.strip() != "":
+            self.__prj.load_goroutine_page(self.__start, find.strip())
+
+    def reset_selection(self, goroutine_id):
+        # a new stop, its goroutine is the selected one also when the view is closed
+        self.__current_goroutine_id = goroutine_id
+        self.__selected_goroutine_id = goroutine_id
+
+    def select_current_goroutine(self, goroutine_id):
+        # the view is closed, the list is loaded when it is opened
+        self.__reset()
+        self.__cursor_position = -1
+        self.__current_goroutine_id = goroutine_id
+        self.__selected_goroutine_id = goroutine_id
+        self.__prj.load_goroutine(goroutine_id)
+
+    def __load_groups(self, data, current_goroutine_id, group):
+        if group.get('expand') is not None:
+            for element in self.__groups:
+                if element['name'] in data['Members']:
+                    element['members'] = []
+                    for member in data['Members'][element['name']]:
+                        gr = DlvGoroutineType()
+                        gr._update({"Goroutine": member})
+                        element['members'].append(gr)
+            return
+        # a new stop, the groups open before are loaded again
+        expanded = [element['name'] for element in self.__groups if element['expanded']]
         self.__reset()
         if not self.__prj.is_running():
             return
-        idx = 0
+        self.__group['server'] = group['server']
+        for element in data['Groups']:
+            self.__groups.append({"name": element['Name'], "total": element['Total'], "members": None, "expanded": element['Name'] in expanded})
+        self.__current_goroutine_id = current_goroutine_id
+        self.__selected_goroutine_id = current_goroutine_id
+        self.__load_selected = True
+        self.__load_members()
+
+    def load_data(self, data, current_goroutine_id, offset=0, partial=False, page=None, group=None):
+        if group is not None:
+            if self.__group is not None and self.__group['by'] == group['by'] and self.__group['wait_reason'] == group['wait_reason']:
+                self.__load_groups(data, current_goroutine_id, group)
+            return
+        if self.__group is not None:
+            return
+        scroll = page is not None and page['scroll']
+        if page is not None:
+            self.__move_page(page)
+        if scroll:
+            # another page of the same stop, the selection stays
+            self.__goroutines = []
+        elif offset == 0 or offset != len(self.__goroutines):
+            # a streamed response comes in chunks, the ones after the first are appended
+            self.__reset()
+        if not self.__prj.is_running():
+            return
+        if page is not None:
+            self.__next = data['Nextg']
+            self.__count = max(self.__count, self.__get_offset() + len(data['Goroutines']))
+            if self.__next < 0:
+                # the last page tells the number of the goroutines
+                self.__count = self.__get_offset() + len(data['Goroutines'])
+                self.__complete = True
+        self.__loaded_from = len(self.__goroutines)
+        self.__partial = partial
         for element in data['Goroutines']:
             gr = DlvGoroutineType()
             gr._update({"Goroutine": element})
             self.__goroutines.append(gr)
-            if gr.id == current_goroutine_id:
-                self.__cursor_position = idx
-                self.__current_goroutine_position = idx
-                self.__selected_goroutine_id = current_goroutine_id
-            idx += 1
+        if current_goroutine_id is None:
+            return
+        self.__current_goroutine_id = current_goroutine_id
+        if not scroll:
+            self.__selected_goroutine_id = current_goroutine_id
+            self.__load_selected = True
+        if page is not None and page['find'] is not None:
+            if page.get('found') is not None:
+                self.__selected_goroutine_id = page['found']
+                self.__load_selected = True
+            else:
+                set_status_message("Goroutine %s not found" % page['find'])
+
+    def __move_page(self, page):
+        # Start and Nextg index the goroutines of the runtime, Delve skips the dead
+        # ones, so the pages visited are kept to go back and to number the rows
+        start = page['start']
+        if page.get('pages') is not None:
+            self.__pages = [tuple(element) for element in page['pages']]
+        elif len(self.__pages) > 0 and start == self.__pages[-1][0]:
+            self.__pages.pop()
+        elif start == self.__next and start != self.__start:
+            self.__pages.append((self.__start, len(self.__goroutines)))
+        elif start == 0:
+            self.__pages = []
+        self.__start = start
+
+    def __get_offset(self):
+        return sum([rows for start, rows in self.__pages])
+
+    def __get_group_rows(self):
+        rows = [("header", None)]
+        if self.__current_goroutine is not None and self.__current_goroutine.id == self.__current_goroutine_id:
+            rows.append(("current", self.__current_goroutine))
+        for element in self.__groups:
+            rows.append(("group", element))
+            if element['expanded'] and element['members'] is None:
+                rows.append(("loading", None))
+            elif element['expanded']:
+                rows.extend([("goroutine", gr) for gr in element['members']])
+                if len(element['members']) < element['total']:
+                    rows.append(("more", element))
+        return rows
+
+    def __get_rows(self):
+        if self.__group is not None:
+            return self.__get_group_rows()
+        rows = [("header", None)]
+        if self.__start > 0:
+            rows.append(("previous", None))
+        gr = self.__current_goroutine
+        if gr is not None and gr.id == self.__current_goroutine_id and gr.id not in [element.id for element in self.__goroutines]:
+            rows.append(("current", gr))
+        rows.extend([("goroutine", gr) for gr in self.__goroutines])
+        if self.__next >= 0:
+            rows.append(("next", None))
+        return rows
+
+    def __format_row(self, kind, gr):
+        if kind == "header" and self.__group is not None:
+            titles = {"user": "user location", "go": "go statement location", "start": "start location"}
+            return "Goroutines: %d in %d groups by %s%s" % (sum([element['total'] for element in self.__groups]), len(self.__groups),
+                titles[self.__group['by']], " and state" if self.__group['wait_reason'] else "")
+        elif kind == "group":
+            return "%s %d %s" % ("-" if gr['expanded'] else "+", gr['total'], gr['name'])
+        elif kind == "loading":
+            return "    ..."
+        elif kind == "more":
+            return "    ... %d more" % (gr['total'] - len(gr['members']))
+        elif kind == "goroutine" and self.__group is not None:
+            return "    " + gr._format()
+        elif kind == "header":
+            if self.const.GOROUTINE_PAGE_SIZE == 0:
+                return "Goroutines: %d%s" % (len(self.__goroutines), "..." if self.__partial else "")
+            total = str(self.__count) if self.__complete else "%d+" % self.__count
+            if len(self.__goroutines) == 0:
+                return "Goroutines: 0 of %s" % total
+            offset = self.__get_offset()
+            return "Goroutines: %d-%d of %s" % (offset + 1, offset + len(self.__goroutines), total)
+        elif kind == "previous":
+            return "<< previous %d" % (self.__pages[-1][1] if len(self.__pages) > 0 else self.const.GOROUTINE_PAGE_SIZE)
+        elif kind == "next":
+            return ">> next %d" % self.const.GOROUTINE_PAGE_SIZE
+        return gr._format()
 
     def update_view(self):
-        super(DlvGoroutineView, self).update_view()
+        start = self.__loaded_from
+        self.__loaded_from = 0
         if not self.is_open():
             return
-        for gr in self.__goroutines:
-            self.add_line(gr._format(), '')
-        self.select_goroutine()
-
-class DlvtVariableType(DlvObjectType):
-    def __init__(self, parent=None, name=None, **kwargs):
-        super(DlvtVariableType, self).__init__("Variable", **kwargs)
-        self.__parent = parent
-        self.__name = name
-        self.__children = []
-        self.__expanded = False
-        self.__line = 0
-        self.__map_element = False
-        self.__uuid = None
-        self.__error_message = None
-
-    def __getattr__(self, attr):
-        if attr == "name" and self.__name is not None:
-            return self.__name
-        return super(DlvtVariableType, self).__getattr__(attr)
-
-    @property
-    def _children(self):
-        return self.__children
-
-    @property
-    def _line(self):
-        return self.__line
-
-    def _set_name(self, name):
-        assert (self.__name is None)
-        self.__name = name
-
-    def _set_error_message(self, error_message=None):
-        self.__error_message = error_message if error_message is not None else '<not available>'
-
-    def _reset_error_message(self):
-        self.__error_message = None        
-
-    def _set_map_key(self, key):
-        assert (self.__name is None)
-        self.__name = key
-        self.__map_element = True
-
-    @property
-    def _uuid(self):
-        if self.__uuid is None:
-            self.__uuid = uuid.uuid4()
-        return self.__uuid
-
-    def _is_loaded(self):
-        return hasattr(self, 'addr')
-
-    def _is_error(self):
-        return (self.__error_message != None)
-
-    def _format(self, running, indent="", output="", line=0):
-        self.__line = line
-        line += 1
-        icon = " "
-        if self._is_error() or not self._is_loaded() or not running:
-            return ("%s%s = \"%s\"" % (icon, self.name, self.__error_message if running and self._is_error() else '<not available>'), line)
-        if self._has_children():
-            if self.__expanded:
-                icon = "-"
-            else:
-                icon = "+"
-
-        length = self.len
-        capacity = self.cap
-        if self._is_pointer():
-            length = self._dereference()['len']
-            capacity = self._dereference()['cap']
-        suffix_len_cap = ""
-        suffix_len = str(length) if length > 0 or (length >= 0 and self._is_slice()) else ""
-        suffix_cap = str(capacity) if capacity > 0 or (capacity >= 0 and self._is_slice()) else ""
-
-        if suffix_len != "" and suffix_cap != "":
-            suffix_len_cap = "(len: %s, cap: %s)" % (suffix_len, suffix_cap)
-        elif suffix_len != "":
-            suffix_len_cap = "(len: %s)" % suffix_len
-        elif suffix_cap != "":
-            suffix_len_cap = "(cap: %s)" % suffix_cap
-
-        suffix_val = ""
-        chldn_len = len(self.children)
-        if chldn_len == 0 and not self._is_slice() and not self._is_map():
-            val = str(self.value)
-            if self._is_string():
-                val = '"%s"' % val
-            if not self.__map_element:
-                suffix_val = " = "
-            suffix_val += val
-
-        if output != "":
-            output += "\n"
-        if not self._is_map_element():
-            output += "%s%s%s %s%s%s" % (indent, icon, self.name, self.type, suffix_len_cap, suffix_val)
-        elif self._is_slice() or self._is_map():
-            output += "%s%s%s: %s%s" % (indent, icon, self.name, self.type, suffix_len_cap)
+        if start > 0:
+            rows = [("goroutine", gr) for gr in self.__goroutines[start:]]
+            self.__rows.extend(rows)
+            self.add_lines([gr._format() for kind, gr in rows], '')
+        if start == 0 or not self.__partial:
+            # after the last chunk only the header changes
+            self.__rows = self.__get_rows()
+            self.set_lines([self.__format_row(kind, gr) for kind, gr in self.__rows], '')
+        if not self.__partial:
+            self.select_goroutine()
+
+class DlvStacksView(DlvView):
+    __MAX_GOROUTINE_IDS = 20
+
+    def __init__(self, prj, view):
+        super(DlvStacksView, self).__init__(prj.const.STACKS_VIEW, prj.window, prj.const, view)
+        self.__prj = prj
+        self.__sort = "count"
+        self.__dump_id = None
+        self.__reset()
+
+    def __reset(self):
+        self.__buckets = []
+        self.__summary = None
+        self.__progress = None
+        self.__rows = []
+
+    def open(self, reset=False):
+        super(DlvStacksView, self).open(reset)
+        if self.is_open():
+            self.set_syntax("Packages/GoDebug/GoDebug.tmLanguage")
+            if reset:
+                self.__reset()
+            self.update_view()
+
+    def clear(self, reset=False):
+        if reset:
+            self.__reset()
+        super(DlvStacksView, self).clear(reset)
+
+    def is_dumping(self):
+        return self.__progress is not None
+
+    def dump_stacks(self, parms):
+        self.__reset()
+        self.__progress = {"Listed": 0, "Done": 0, "Total": 0}
+        # the responses of a dump replaced by this one are ignored
+        self.__dump_id = str(uuid.uuid4())
+        if self.is_closed():
+            self.open()
+        self.update_view()
+        self.__prj.worker.dump_stacks(dict(parms, dump_id=self.__dump_id))
+
+    def cancel_dump(self):
+        self.__prj.worker.cancel_dump()
+        if self.__progress is not None:
+            self.__progress = None
+            self.__summary = {"Goroutines": 0, "Read": 0, "Exact": False, "Filter": "", "Cancelled": True}
+            self.update_view()
+
+    def set_sort(self, sort):
+        self.__sort = sort
+        self.__sort_buckets()
+        self.update_view()
+
+    def __sort_buckets(self):
+        if self.__sort == "function":
+            self.__buckets.sort(key=lambda element: (element['frames'][0].function['name'] if len(element['frames']) > 0 else '', -element['count']))
         else:
-            output += "%s%s%s: %s" % (indent, icon, self.name, suffix_val)
-
-        indent += "    "
-        if self.__expanded:
-            for chld_var in self.__children:
-                output, line = chld_var._format(running, indent, output, line)
-        return (output, line)
-
-    def _is_expanded(self):
-        return self.__expanded
-
-    def _is_expanded(self):
-        return self.__expanded
-
-    def _is_string(self): 
-        return (self.type == 'string')
-
-    def _is_slice(self): 
-        return self.type.startswith('[')
-
-    def _is_map(self):
-        return self.type.startswith('map[')
-
-    def _is_map_element(self):
-        return self.__map_element
-
-    def _is_pointer(self): 
-        return self.type.startswith('*')
-
-    def _dereference(self):
-        assert (self._is_pointer() and len(self.children) == 1)
-        return self.children[0]
-
-    def _expand(self):
-        self.__expanded = True
-        if len(self.children) > 0 and len(self.__children) == 0:
-            self.__add_children()
-
-    def _collapse(self):
-        self.__expanded = False
-
-    def __add_children(self):
-        counter = 0
-        map_element_key = None
-        children = self.children
-        if self._is_pointer():
-            children = self._dereference()['children']
-        for child in children:
-            chld_var = DlvtVariableType(self)
-            chld_var._update({"Variable": child})
-            if chld_var.name == "" and self._is_slice():
-                chld_var._set_name(counter)
-                counter += 1
-            if self._is_map():
-                if map_element_key is None:
-                    val = chld_var.value
-                    if chld_var._is_string():
-                        val = '"%s"' % val
-                    map_element_key = val
-                    continue
-                else:
-                    chld_var._set_map_key(map_element_key)
-                    map_element_key = None
-            self.__children.append(chld_var)
-    
-    def _has_children(self):
-        return len(self.children) > 0
+            self.__buckets.sort(key=lambda element: -element['count'])
+
+    def load_data(self, data, parms, partial=False):
+        if parms.get('dump_id') != self.__dump_id:
+            return
+        if partial:
+            if self.__progress is not None:
+                self.__progress = data
+            return
+        self.__reset()
+        if not self.__prj.is_running():
+            return
+        self.__summary = data
+        for element in data['Buckets']:
+            frames = []
+            for frame in element['frames']:
+                loc = DlvLocationType()
+                loc._update({"Location": frame})
+                frames.append(loc)
+            self.__buckets.append({"frames": frames, "goroutines": element['goroutines'], "count": len(element['goroutines']), "expanded": False})
+        self.__sort_buckets()
+        if data['Cancelled']:
+            set_status_message("Dump of the stacks cancelled")
+
+    def select_row(self, view):
+        row, col = self.view.rowcol(view.sel()[0].a)
+        if row >= len(self.__rows):
+            return
+        kind, element = self.__rows[row]
+        if kind == "bucket":
+            element['expanded'] = not element['expanded']
+            self.update_view()
+        elif kind == "frame":
+            find_view = self.window.find_open_file(element.file)
+            if find_view is None:
+                self.window.focus_group(0)
+            self.window.open_file("%s:%d" % (element.file, element.line), sublime.ENCODED_POSITION)
+
+    def __get_rows(self):
+        rows = [("header", None)]
+        for element in self.__buckets:
+            rows.append(("bucket", element))
+            if element['expanded']:
+                rows.extend([("frame", loc) for loc in element['frames']])
+                rows.append(("goroutines", element))
+        return rows
+
+    def __format_header(self):
+        if self.__progress is not None:
+            if self.__progress['Total'] == 0:
+                return "Stacks: listing goroutines... %d" % self.__progress['Listed']
+            return "Stacks: reading stacks... %d of %d" % (self.__progress['Done'], self.__progress['Total'])
+        if self.__summary is None:
+            return "Stacks: use GoDebug: Dump All Stacks"
+        count = sum([element['count'] for element in self.__buckets])
+        if count < self.__summary['Goroutines']:
+            text = "Stacks: %d of %d goroutines in %d stacks" % (count, self.__summary['Goroutines'], len(self.__buckets))
+        else:
+            text = "Stacks: %d goroutines in %d stacks" % (count, len(self.__buckets))
+        if self.__summary['Filter'] != "":
+            text += " matching \"%s\"" % self.__summary['Filter']
+        if not self.__summary['Exact']:
+            text += ", %d read, one per location" % self.__summary['Read']
+        if self.__summary['Cancelled']:
+            text += ", cancelled"
+        return "%s, sorted by %s" % (text, self.__sort)
+
+    def __format_row(self, kind, element):
+        if kind == "header":
+            return self.__format_header()
+        elif kind == "bucket":
+            top = element['frames'][0]._format() if len(element['frames']) > 0 else ''
+            return "%s %d %s" % ("-" if element['expanded'] else "+", element['count'], top)
+        elif kind == "frame":
+            return "    " + element._format()
+        ids = " ".join([str(goroutine_id) for goroutine_id in element['goroutines'][:self.__MAX_GOROUTINE_IDS]])
+        more = element['count'] - self.__MAX_GOROUTINE_IDS
+        return "    goroutines: %s%s" % (ids, " ... %d more" % more if more > 0 else "")
+
+    def update_view(self):
+        if not self.is_open():
+            return
+        self.__rows = self.__get_rows()
+        self.set_lines([self.__format_row(kind, element) for kind, element in self.__rows], '')
 
 class DlvVariableView(DlvView):
     def __init__(self, name, prj, view=None):
@@ -1301,14 +1407,15 @@ class DlvVariableView(DlvView):
                     var._set_error_message()   
 
     def update_view(self):
-        super(DlvVariableView, self).update_view()
         if not self.is_open():
             return
         line = 0
+        lines = []
         running = self.__prj.is_running()
         for var in self.__variables:
             output, line = var._format(running, line=line)
-            self.add_line(output, ' ')
+            lines.append(output)
+        self.set_lines(lines, ' ')
 
     def get_variable_at_line(self, line, var_list=None):
         if var_list is None:
@@ -1397,6 +1504,45 @@ class DlvVariableView(DlvView):
             watches.append(watch.name)
         self.const.save_watches(watches)
 
+class DlvViewClear(sublime_plugin.TextCommand):
+    def run(self, edit):
+        self.view.set_read_only(False)
+        self.view.erase(edit, sublime.Region(0, self.view.size()))
+        self.view.set_read_only(True)
+
+class DlvViewSetText(sublime_plugin.TextCommand):
+    def run(self, edit, text, scroll):
+        rows = [(self.view.rowcol(region.a), self.view.rowcol(region.b)) for region in self.view.sel()]
+        position = self.view.viewport_position()
+        self.view.set_read_only(False)
+        self.view.replace(edit, sublime.Region(0, self.view.size()), text)
+        self.view.set_read_only(True)
+        if scroll:
+            self.view.show(self.view.size())
+            return
+        self.view.sel().clear()
+        for a, b in rows:
+            self.view.sel().add(sublime.Region(self.view.text_point(*a), self.view.text_point(*b)))
+        self.view.set_viewport_position(position, False)
+
+class DlvViewReplaceLines(sublime_plugin.TextCommand):
+    def run(self, edit, changes, scroll):
+        self.view.set_read_only(False)
+        # from the bottom, the rows of the changes above stay valid
+        for first, last, text in reversed(changes):
+            self.view.replace(edit, sublime.Region(self.view.text_point(first, 0), self.view.text_point(last, 0)), text)
+        self.view.set_read_only(True)
+        if scroll:
+            self.view.show(self.view.size())
+
+class DlvViewAddLine(sublime_plugin.TextCommand):
+    def run(self, edit, line, scroll):
+        self.view.set_read_only(False)
+        self.view.insert(edit, self.view.size(), line)
+        self.view.set_read_only(True)
+        if scroll:
+            self.view.show(self.view.size())
+
 class DlvToggleBreakpoint(sublime_plugin.TextCommand):
     def run(self, edit):
         ok, prj = is_plugin_enable()
@@ -1449,6 +1595,8 @@ class DlvClick(sublime_plugin.TextCommand):
             prj.goroutine_view.select_goroutine(self.view)
         elif prj.stacktrace_view.is_open() and is_equal(self.view, prj.stacktrace_view):
             prj.stacktrace_view.select_location(self.view)
+        elif prj.stacks_view.is_open() and is_equal(self.view, prj.stacks_view):
+            prj.stacks_view.select_row(self.view)
 
     def is_enabled(self):
         ok, prj = is_plugin_enable()
@@ -1628,7 +1776,13 @@ class DlvStart(sublime_plugin.WindowCommand):
         cmd_server.append("--api-version=2")
         if prj.const.LOG:
             cmd_server.append("--log")
-        value = "%s:%d" % (prj.const.HOST, prj.const.PORT)
+        if prj.is_local_mode() and prj.const.UNIX_SOCKET and sys.platform != 'win32':
+            # per session socket, no port clashes between sessions
+            prj.create_socket_dir()
+            value = prj.get_endpoint()[0]
+        else:
+            prj.remove_socket_dir()
+            value = "%s:%d" % (prj.const.HOST, prj.const.PORT)
         cmd_server.append("--listen=%s" % value)
         cmd_session.append(value)
         if prj.const.ARGS != "":
@@ -1736,6 +1890,21 @@ class DlvResume(sublime_plugin.WindowCommand):
         ok, prj = is_plugin_enable()
         return (ok and prj.is_running())
 
+class DlvPause(sublime_plugin.WindowCommand):
+    def run(self):
+        ok, prj = is_plugin_enable()
+        if not ok:
+            return
+        prj.worker.halt()
+    
+    def is_enabled(self):
+        ok, prj = is_plugin_enable()
+        return (ok and prj.is_running() and prj.worker.is_executing())
+
+    def is_visible(self):
+        ok, prj = is_plugin_enable()
+        return (ok and prj.is_running())
+
 class DlvNext(sublime_plugin.WindowCommand):
     def run(self):
         ok, prj = is_plugin_enable()
@@ -1928,6 +2097,7 @@ class DlvOpenVariableView(sublime_plugin.WindowCommand):
         ok, prj = is_plugin_enable()
         if ok and prj.variable_view.is_closed():
             prj.variable_view.open()
+            prj.load_view(prj.variable_view)
 
     def is_enabled(self):
         ok, prj = is_plugin_enable()
@@ -1942,6 +2112,7 @@ class DlvOpenWatchView(sublime_plugin.WindowCommand):
         ok, prj = is_plugin_enable()
         if ok and prj.watch_view.is_closed():
             prj.watch_view.open()
+            prj.load_view(prj.watch_view)
 
     def is_enabled(self):
         ok, prj = is_plugin_enable()
@@ -1956,6 +2127,7 @@ class DlvOpenStacktraceView(sublime_plugin.WindowCommand):
         ok, prj = is_plugin_enable()
         if ok and  prj.stacktrace_view.is_closed():
             prj.stacktrace_view.open()
+            prj.load_view(prj.stacktrace_view)
 
     def is_enabled(self):
         ok, prj = is_plugin_enable()
@@ -1970,6 +2142,7 @@ class DlvOpenGoroutineView(sublime_plugin.WindowCommand):
         ok, prj = is_plugin_enable()
         if ok and prj.goroutine_view.is_closed():
             prj.goroutine_view.open()
+            prj.load_view(prj.goroutine_view)
 
     def is_enabled(self):
         ok, prj = is_plugin_enable()
@@ -1979,6 +2152,91 @@ class DlvOpenGoroutineView(sublime_plugin.WindowCommand):
         ok, prj = is_plugin_enable()
         return (ok and prj.is_running() and prj.goroutine_view.is_closed())
 
+class DlvFindGoroutine(sublime_plugin.WindowCommand):
+    def run(self):
+        ok, prj = is_plugin_enable()
+        if ok:
+            self.window.show_input_panel('Delve find goroutine (id or function) =', '', prj.goroutine_view.find_goroutine, None, None)
+
+    def is_enabled(self):
+        ok, prj = is_plugin_enable()
+        return (ok and prj.is_running() and prj.goroutine_view.is_open() and prj.const.GOROUTINE_PAGE_SIZE > 0)
+
+    def is_visible(self):
+        ok, prj = is_plugin_enable()
+        return (ok and prj.is_running() and prj.goroutine_view.is_open() and prj.const.GOROUTINE_PAGE_SIZE > 0)
+
+class DlvGroupGoroutines(sublime_plugin.WindowCommand):
+    __groups = [("No grouping", None),
+                ("User location", {"by": "user", "wait_reason": False}),
+                ("Go statement location", {"by": "go", "wait_reason": False}),
+                ("Start location", {"by": "start", "wait_reason": False}),
+                ("User location and state", {"by": "user", "wait_reason": True}),
+                ("Go statement location and state", {"by": "go", "wait_reason": True}),
+                ("Start location and state", {"by": "start", "wait_reason": True})]
+
+    def run(self):
+        ok, prj = is_plugin_enable()
+        if not ok:
+            return
+        def on_choose(index):
+            if index >= 0:
+                prj.goroutine_view.set_group(self.__groups[index][1])
+        self.window.show_quick_panel([caption for caption, group in self.__groups], on_choose)
+
+    def is_enabled(self):
+        ok, prj = is_plugin_enable()
+        return (ok and prj.is_running() and prj.goroutine_view.is_open())
+
+    def is_visible(self):
+        ok, prj = is_plugin_enable()
+        return (ok and prj.is_running() and prj.goroutine_view.is_open())
+
+class DlvDumpStacks(sublime_plugin.WindowCommand):
+    def run(self, exact=False):
+        ok, prj = is_plugin_enable()
+        if not ok:
+            return
+        def on_done(find):
+            prj.stacks_view.dump_stacks({"filter": find.strip(), "exact": exact})
+        self.window.show_input_panel('Delve dump stacks of goroutines (id or function, empty for all) =', '', on_done, None, None)
+
+    def is_enabled(self):
+        ok, prj = is_plugin_enable()
+        return (ok and prj.is_running() and not prj.worker.is_executing())
+
+    def is_visible(self):
+        ok, prj = is_plugin_enable()
+        return (ok and prj.is_running())
+
+class DlvCancelDumpStacks(sublime_plugin.WindowCommand):
+    def run(self):
+        ok, prj = is_plugin_enable()
+        if ok:
+            prj.stacks_view.cancel_dump()
+
+    def is_enabled(self):
+        ok, prj = is_plugin_enable()
+        return (ok and prj.is_running() and prj.stacks_view.is_dumping())
+
+    def is_visible(self):
+        ok, prj = is_plugin_enable()
+        return (ok and prj.is_running() and prj.stacks_view.is_dumping())
+
+class DlvSortStacks(sublime_plugin.WindowCommand):
+    def run(self, by="count"):
+        ok, prj = is_plugin_enable()
+        if ok:
+            prj.stacks_view.set_sort(by)
+
+    def is_enabled(self):
+        ok, prj = is_plugin_enable()
+        return (ok and prj.is_running() and prj.stacks_view.is_open())
+
+    def is_visible(self):
+        ok, prj = is_plugin_enable()
+        return (ok and prj.is_running() and prj.stacks_view.is_open())
+
 class DlvEnable(sublime_plugin.WindowCommand):
     def run(self):
         ok, prj = is_plugin_enable()
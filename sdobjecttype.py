@@ -1,3 +1,6 @@
+import uuid
+import os
+
 class DlvObjectType(object):
     def __init__(self, __name, **kwargs):
         self.__object_name = __name
@@ -31,3 +34,332 @@ class DlvObjectType(object):
 
     def _is_loaded(self):
         return False
+
+class DlvBreakpointType(DlvObjectType):
+    def __init__(self, file=None, line=None, **kwargs):
+        super(DlvBreakpointType, self).__init__("Breakpoint", **kwargs)
+        self.__file = file
+        self.__line = line
+        self.__original_line = line
+        self.__showed = False
+        self.__show_running = False
+        self.__uuid = None
+        self.__error_message = None
+
+    def __getattr__(self, attr):
+        if attr == "file" and self.__file is not None:
+            return self.__file
+        if attr == "line" and self.__line is not None:
+            return self.__line
+        return super(DlvBreakpointType, self).__getattr__(attr)
+
+    @property
+    def _as_parm(self):
+        response = super(DlvBreakpointType, self)._as_parm
+        if self.__file is not None:
+            response[self._object_name]['file'] = self.__file
+        if self.__line is not None:
+            response[self._object_name]['line'] = self.__line
+        return response
+
+    @property
+    def _key(self):
+        if self.__original_line is None:
+            self.__original_line = self.line
+        return "dlv.bkpt%s" % self.__original_line
+
+    def _set_error_message(self, error_message=None):
+        self.__error_message = error_message if error_message is not None else '<not available>'
+
+    def _reset_error_message(self):
+        self.__error_message = None  
+
+    def _is_error(self):
+        return (self.__error_message != None)
+
+    def _set_uuid(self, uuid):
+        self.__uuid = uuid
+
+    def _get_uuid(self):
+        return self.__uuid
+
+    def _update_line(self, line):
+        assert (self.__original_line is not None)
+        self.__line = line
+
+    def _show(self, running, view, frontend):
+        assert (view is not None)
+        if not self.__showed or running != self.__show_running:
+            icon_file = "Packages/GoDebug/%s" % ('bkpt_active.png' if running and not self._is_error() else 'bkpt_inactive.png')
+            frontend.add_marker(view, self._key, self.line - 1, "keyword.dlv", icon_file)
+            self.__showed = True
+            self.__show_running = running
+
+    def _hide(self, view, frontend):
+        assert (view is not None)
+        if self.__showed:
+            frontend.erase_marker(view, self._key)
+            self.__showed = False
+            self.__show_running = False
+
+    def _was_hided(self):
+        self.__showed = False
+        self.__show_running = False
+
+    def _is_loaded(self):
+        return hasattr(self, 'id')
+
+    def _format(self, running):
+        output = "\"%s:%d\"" % (os.path.basename(self.file), self.line)
+        if running:
+            if not self._is_error():
+                if self._is_loaded():
+                    output +=  " %d" % self.id
+            else:
+                output +=  " \"%s\"" % self.__error_message
+        return output
+
+class DlvStateType(DlvObjectType):
+    def __init__(self, **kwargs):
+        super(DlvStateType, self).__init__("State", **kwargs)
+
+    def _get_thread(self, name=None):
+        thread = DlvThreadType()
+        if name is None:
+            name = thread._object_name
+        value = self._kwargs.get(name, None)
+        if value is not None:
+            obj_value = {}
+            obj_value[thread._object_name] = value
+            thread._update(obj_value)
+            return thread
+        else:
+            return None
+
+    def _get_goroutine(self, name='currentGoroutine'):
+        value = self._kwargs.get(name, None)
+        if value is not None:
+            goroutine = DlvGoroutineType()
+            goroutine._update({goroutine._object_name: value})
+            return goroutine
+        else:
+            return None
+
+class DlvLocationType(DlvObjectType):
+    def __init__(self, **kwargs):
+        super(DlvLocationType, self).__init__("Location", **kwargs)
+
+    def _get_variables(self):
+        variables = []
+        for element in self.Locals:
+            var = DlvtVariableType()
+            var._update({"Variable": element})
+            variables.append(var)
+        for element in self.Arguments:
+            var = DlvtVariableType()
+            var._update({"Variable": element})
+            variables.append(var)
+        return variables
+
+    def _format(self):
+        return "%s \"%s:%d\"" % (os.path.basename(self.function['name']), os.path.basename(self.file), self.line)
+
+class DlvThreadType(DlvObjectType):
+    def __init__(self, **kwargs):
+        super(DlvThreadType, self).__init__("Thread", **kwargs)
+
+    def _get_breakpoint(self, name=None):
+        breakpoint = DlvBreakpointType(self.file, self.line)
+        if name is None:
+            name = breakpoint._object_name
+        value = self._kwargs.get(name, None)
+        if value is not None:
+            obj_value = {}
+            obj_value[breakpoint._object_name] = value
+            breakpoint._update(obj_value)
+            return breakpoint
+        else:
+            return None
+
+    def _format(self):
+        return "%d\t%s" % (self.id, self.function['name'])
+
+class DlvGoroutineType(DlvObjectType):
+    def __init__(self, **kwargs):
+        super(DlvGoroutineType, self).__init__("Goroutine", **kwargs)
+
+    @property
+    def _current_file(self):
+        return self.currentLoc['file']
+
+    @property
+    def _current_line(self):
+        return self.currentLoc['line']
+
+    def _format(self):
+        return "%s \"%s:%d\" %d" % (os.path.basename(self.currentLoc['function']['name']), os.path.basename(self.currentLoc['file']), self.currentLoc['line'], self.id)
+
+class DlvtVariableType(DlvObjectType):
+    def __init__(self, parent=None, name=None, **kwargs):
+        super(DlvtVariableType, self).__init__("Variable", **kwargs)
+        self.__parent = parent
+        self.__name = name
+        self.__children = []
+        self.__expanded = False
+        self.__line = 0
+        self.__map_element = False
+        self.__uuid = None
+        self.__error_message = None
+
+    def __getattr__(self, attr):
+        if attr == "name" and self.__name is not None:
+            return self.__name
+        return super(DlvtVariableType, self).__getattr__(attr)
+
+    @property
+    def _children(self):
+        return self.__children
+
+    @property
+    def _line(self):
+        return self.__line
+
+    def _set_name(self, name):
+        assert (self.__name is None)
+        self.__name = name
+
+    def _set_error_message(self, error_message=None):
+        self.__error_message = error_message if error_message is not None else '<not available>'
+
+    def _reset_error_message(self):
+        self.__error_message = None        
+
+    def _set_map_key(self, key):
+        assert (self.__name is None)
+        self.__name = key
+        self.__map_element = True
+
+    @property
+    def _uuid(self):
+        if self.__uuid is None:
+            self.__uuid = uuid.uuid4()
+        return self.__uuid
+
+    def _is_loaded(self):
+        return hasattr(self, 'addr')
+
+    def _is_error(self):
+        return (self.__error_message != None)
+
+    def _format(self, running, indent="", output="", line=0):
+        self.__line = line
+        line += 1
+        icon = " "
+        if self._is_error() or not self._is_loaded() or not running:
+            return ("%s%s = \"%s\"" % (icon, self.name, self.__error_message if running and self._is_error() else '<not available>'), line)
+        if self._has_children():
+            if self.__expanded:
+                icon = "-"
+            else:
+                icon = "+"
+
+        length = self.len
+        capacity = self.cap
+        if self._is_pointer():
+            length = self._dereference()['len']
+            capacity = self._dereference()['cap']
+        suffix_len_cap = ""
+        suffix_len = str(length) if length > 0 or (length >= 0 and self._is_slice()) else ""
+        suffix_cap = str(capacity) if capacity > 0 or (capacity >= 0 and self._is_slice()) else ""
+
+        if suffix_len != "" and suffix_cap != "":
+            suffix_len_cap = "(len: %s, cap: %s)" % (suffix_len, suffix_cap)
+        elif suffix_len != "":
+            suffix_len_cap = "(len: %s)" % suffix_len
+        elif suffix_cap != "":
+            suffix_len_cap = "(cap: %s)" % suffix_cap
+
+        suffix_val = ""
+        chldn_len = len(self.children)
+        if chldn_len == 0 and not self._is_slice() and not self._is_map():
+            val = str(self.value)
+            if self._is_string():
+                val = '"%s"' % val
+            if not self.__map_element:
+                suffix_val = " = "
+            suffix_val += val
+
+        if output != "":
+            output += "\n"
+        if not self._is_map_element():
+            output += "%s%s%s %s%s%s" % (indent, icon, self.name, self.type, suffix_len_cap, suffix_val)
+        elif self._is_slice() or self._is_map():
+            output += "%s%s%s: %s%s" % (indent, icon, self.name, self.type, suffix_len_cap)
+        else:
+            output += "%s%s%s: %s" % (indent, icon, self.name, suffix_val)
+
+        indent += "    "
+        if self.__expanded:
+            for chld_var in self.__children:
+                output, line = chld_var._format(running, indent, output, line)
+        return (output, line)
+
+    def _is_expanded(self):
+        return self.__expanded
+
+    def _is_expanded(self):
+        return self.__expanded
+
+    def _is_string(self): 
+        return (self.type == 'string')
+
+    def _is_slice(self): 
+        return self.type.startswith('[')
+
+    def _is_map(self):
+        return self.type.startswith('map[')
+
+    def _is_map_element(self):
+        return self.__map_element
+
+    def _is_pointer(self): 
+        return self.type.startswith('*')
+
+    def _dereference(self):
+        assert (self._is_pointer() and len(self.children) == 1)
+        return self.children[0]
+
+    def _expand(self):
+        self.__expanded = True
+        if len(self.children) > 0 and len(self.__children) == 0:
+            self.__add_children()
+
+    def _collapse(self):
+        self.__expanded = False
+
+    def __add_children(self):
+        counter = 0
+        map_element_key = None
+        children = self.children
+        if self._is_pointer():
+            children = self._dereference()['children']
+        for child in children:
+            chld_var = DlvtVariableType(self)
+            chld_var._update({"Variable": child})
+            if chld_var.name == "" and self._is_slice():
+                chld_var._set_name(counter)
+                counter += 1
+            if self._is_map():
+                if map_element_key is None:
+                    val = chld_var.value
+                    if chld_var._is_string():
+                        val = '"%s"' % val
+                    map_element_key = val
+                    continue
+                else:
+                    chld_var._set_map_key(map_element_key)
+                    map_element_key = None
+            self.__children.append(chld_var)
+    
+    def _has_children(self):
+        return len(self.children) > 0
@@ -0,0 +1,83 @@
+import threading
+import traceback
+import select
+import codecs
+import sys
+import os
+
+class DlvPipeReader(object):
+    """
+    Reads the lines of the subprocess pipes on one background thread,
+    multiplexed by select. Select does not work with pipes on Windows,
+    there each pipe is read by its own thread as before.
+    """
+    def __init__(self, const, logger, line_callback, close_callback):
+        self.__const = const
+        self.__logger = logger
+        self.__line_callback = line_callback
+        self.__close_callback = close_callback
+        self.__lock = threading.Lock()
+        self.__pipes = {}
+        self.__thread = None
+        self.__wakeup = None
+
+    def add(self, pipe):
+        if sys.platform == 'win32':
+            t = threading.Thread(target=self.__read_pipe, args=(pipe,))
+            t.start()
+            return
+        with self.__lock:
+            decoder = codecs.getincrementaldecoder(pipe.encoding or 'utf-8')('replace')
+            self.__pipes[pipe.fileno()] = (pipe, decoder, [''])
+            if self.__thread is None:
+                self.__wakeup = os.pipe()
+                self.__thread = threading.Thread(target=self.__read_pipes, args=(self.__wakeup,))
+                self.__thread.start()
+            else:
+                os.write(self.__wakeup[1], b'\0')
+
+    def __call(self, callback, *args):
+        try:
+            callback(*args)
+        except:
+            traceback.print_exc(file=(sys.stdout if self.__logger.get_file() == self.__const.STDOUT else open(self.__logger.get_file(),"a")))
+            self.__logger.error("Exception thrown, details in file: %s" % self.__logger.get_file())
+
+    def __read_pipe(self, pipe):
+        while True:
+            line = pipe.readline()
+            if len(line) == 0:
+                break
+            self.__call(self.__line_callback, pipe, line)
+        self.__call(self.__close_callback, pipe)
+
+    def __read_pipes(self, wakeup):
+        while True:
+            with self.__lock:
+                if len(self.__pipes) == 0:
+                    # the next added pipe starts a new thread
+                    self.__thread = None
+                    self.__wakeup = None
+                    break
+                fds = list(self.__pipes.keys())
+            readable, writable, exceptional = select.select(fds + [wakeup[0]], [], [])
+            for fd in readable:
+                if fd == wakeup[0]:
+                    os.read(fd, 512)
+                    continue
+                pipe, decoder, tail = self.__pipes[fd]
+                data = os.read(fd, 65536)
+                text = tail[0] + decoder.decode(data, len(data) == 0)
+                lines = text.replace('\r\n', '\n').split('\n')
+                # keep the unterminated rest until the next read, or the end of file
+                tail[0] = lines.pop()
+                for line in lines:
+                    self.__call(self.__line_callback, pipe, line + '\n')
+                if len(data) == 0:
+                    if len(tail[0]) > 0:
+                        self.__call(self.__line_callback, pipe, tail[0])
+                    with self.__lock:
+                        del self.__pipes[fd]
+                    self.__call(self.__close_callback, pipe)
+        os.close(wakeup[0])
+        os.close(wakeup[1])
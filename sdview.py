@@ -1,5 +1,9 @@
-import sublime
-import sublime_plugin
+import difflib
+
+def split_rows(text):
+    # rows of the buffer with their "\n", Sublime Text breaks lines on it only
+    rows = text.split('\n')
+    return [row + '\n' for row in rows[:-1]] + ([rows[-1]] if rows[-1] != '' else [])
 
 class DlvView(object):
     def __init__(self, name, window, const, view=None, scroll=False):
@@ -9,6 +13,8 @@ class DlvView(object):
         self.__view = view
         self.__scroll = scroll
         self.__dirty = (view is not None)
+        # lines in the buffer as last rendered, None when the text is not known
+        self.__lines = None
 
     @property
     def name(self):
@@ -49,6 +55,7 @@ class DlvView(object):
         self.__view.set_scratch(True)
         self.__view.set_read_only(True)
         self.__view.settings().set('command_mode', False)
+        self.__lines = []
 
     def is_open_at_start(self):
         return False if self.__name == '' else self.__const.get_view_setting(self.__name, self.__const.OPEN_AT_START)
@@ -76,35 +83,64 @@ class DlvView(object):
 
     def was_closed(self):
         self.__view = None
+        self.__lines = None
 
     def __destroy_view(self):
         self.__window.focus_view(self.__view)
         self.__window.run_command("close")
         self.__view = None
+        self.__lines = None
 
     def add_line(self, line, prefix=' - '):
         if self.__view is not None:
             full_line = prefix + line + "\n"
+            if self.__lines is not None:
+                self.__lines.extend(split_rows(full_line))
             self.view.run_command("dlv_view_add_line", {"line": full_line, "scroll": self.__scroll})
 
+    def add_lines(self, lines, prefix=' - '):
+        if self.__view is not None and len(lines) > 0:
+            text = ''.join([prefix + line + "\n" for line in lines])
+            if self.__lines is not None:
+                self.__lines.extend(split_rows(text))
+            self.view.run_command("dlv_view_add_line", {"line": text, "scroll": self.__scroll})
+
+    def __get_changes(self, old, new):
+        # the common head and tail are skipped before the line diff of the rest
+        if old == new:
+            return []
+        size = min(len(old), len(new))
+        head = 0
+        while head < size and old[head] == new[head]:
+            head += 1
+        tail = 0
+        while tail < size - head and old[-tail - 1] == new[-tail - 1]:
+            tail += 1
+        matcher = difflib.SequenceMatcher(None, old[head:len(old) - tail], new[head:len(new) - tail], False)
+        changes = []
+        for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+            if tag != 'equal':
+                changes.append([head + i1, head + i2, ''.join(new[head + j1:head + j2])])
+        return changes
+
+    def set_lines(self, lines, prefix=' - '):
+        # only the changed rows are replaced, all in one edit, the regions of the others stay
+        if self.__view is not None:
+            text = ''.join([prefix + line + "\n" for line in lines])
+            new_lines = split_rows(text)
+            if self.__lines is None:
+                self.view.run_command("dlv_view_set_text", {"text": text, "scroll": self.__scroll})
+            else:
+                changes = self.__get_changes(self.__lines, new_lines)
+                if len(changes) > 0:
+                    self.view.run_command("dlv_view_replace_lines", {"changes": changes, "scroll": self.__scroll})
+            self.__lines = new_lines
+
     def update_view(self):
         if self.__view is not None:
             self.view.run_command("dlv_view_clear")
+            self.__lines = []
 
     def set_syntax(self, syntax):
         if self.is_open():
             self.__view.set_syntax_file(syntax)
-
-class DlvViewClear(sublime_plugin.TextCommand):
-    def run(self, edit):
-        self.view.set_read_only(False)
-        self.view.erase(edit, sublime.Region(0, self.view.size()))
-        self.view.set_read_only(True)
-
-class DlvViewAddLine(sublime_plugin.TextCommand):
-    def run(self, edit, line, scroll):
-        self.view.set_read_only(False)
-        self.view.insert(edit, self.view.size(), line)
-        self.view.set_read_only(True)
-        if scroll:
-            self.view.show(self.view.size())
@@ -1,30 +1,15 @@
-import sublime
 import threading
+import functools
 import traceback
 import sys 
-import queue
+import time
+import collections
+import os
+import json
 
 from GoDebug.jsonrpctcp_client import JsonRpcTcpClient
 from GoDebug.jsonrpctcp_client import JsonRpcTcpProtocolError
-
-def __start(connect, const, logger):
-    logger.debug("Start worker")
-    try:
-        connect._open(const.HOST, const.PORT)
-        return True
-    except:
-        traceback.print_exc(file=(sys.stdout if logger.get_file() == const.STDOUT else open(logger.get_file(),"a")))
-        logger.error("Exception thrown, details in file: %s" % logger.get_file())
-    return False
-
-def __stop(connect, const, logger):
-    try:
-        if connect._is_open():
-            connect._close()
-    except:
-        traceback.print_exc(file=(sys.stdout if logger.get_file() == const.STDOUT else open(logger.get_file(),"a")))
-        logger.error("Exception thrown, details in file: %s" % logger.get_file())
-    logger.debug("Stop worker")
+from GoDebug.jsonrpctcp_client import JsonRpcTcpTraceWriter
 
 def __default_cfg():
     return  {  
@@ -52,149 +37,1062 @@ def __get_current_goroutine(response):
                 return response['State']['currentThread']['goroutineID']
     return None
 
+def __get_position(response):
+    # where the program stands, a change tells that it moved
+    if type(response) is dict and 'State' in response:
+        state = response['State']
+        thread = state.get('currentThread') or {}
+        goroutine = state.get('currentGoroutine') or {}
+        return (state.get('exited', False), thread.get('goroutineID'), thread.get('pc'), thread.get('file'), thread.get('line'), goroutine.get('id'))
+    return None
+
 def __get_error_response(cmd, parms):
     return {"cmd": cmd, "parms": parms, "result": False}
 
 def __get_error_response_ex(cmd, parms, e):
     return {"cmd": cmd, "parms": parms, "result": False, "error_code": e.code, "error_message": e.message}
 
-def _do_method(alive, queue, prj, worker_callback=None):
+def __get_prefetch_parms(goroutine_id, depth):
+    return {"Id": goroutine_id, "Depth": depth, "Full": True, "Cfg": __default_cfg()}
+
+# Stacktrace of the current goroutine with the variables of the top frames, read with the stop
+__PREFETCH_COMMAND = "prefetch"
+
+def __get_inspection_calls(const, cmd, parms):
+    if cmd == __PREFETCH_COMMAND:
+        return [("Stacktrace", __get_stacktrace_parms(parms['goroutine_id'])), ("Stacktrace", __get_prefetch_parms(parms['goroutine_id'], parms['frames']))]
+    elif cmd == const.STACKTRACE_COMMAND:
+        return [("Stacktrace", __get_stacktrace_parms(parms['goroutine_id']))]
+    elif cmd == const.BREAKPOINT_COMMAND:
+        return [("ListBreakpoints", parms)]
+    elif cmd == const.VARIABLE_COMMAND:
+        call_parms = __get_variable_parms(parms['goroutine_id'], parms['frame'])
+        return [("ListLocalVars", call_parms), ("ListFunctionArgs", call_parms)]
+    elif cmd == const.GOROUTINE_COMMAND:
+        return [("ListGoroutines", parms)]
+    elif cmd == const.WATCH_COMMAND:
+        return [("Eval", __get_eval_parms(parms['goroutine_id'], parms['frame'], parms['expr']))]
+    raise ValueError("Unknown inspection command: %s" % cmd)
+
+def __get_inspection_response(const, cmd, values):
+    if cmd == __PREFETCH_COMMAND:
+        return values[1]
+    elif cmd == const.VARIABLE_COMMAND:
+        return {"Locals": values[0]['Variables'], "Arguments": values[1]['Args']}
+    return values[0]
+
+# Timeout class of the Delve methods, see DlvConst.TIMEOUTS
+__TIMEOUT_CLASSES = {"Command": "control", "Restart": "control", "State": "state", "CreateBreakpoint": "state",
+                     "ClearBreakpoint": "state", "CancelNext": "state", "Eval": "eval"}
+
+def __get_timeout(timeouts, method):
+    return timeouts[__TIMEOUT_CLASSES.get(method, "inspection")]
+
+def __call(connect, const, method, parms, epoch=None):
+    # a call tagged with its stop epoch is cancelled when the program moves on
+    return connect._call_async("RPCServer.%s" % method, parms, timeout=__get_timeout(const.TIMEOUTS, method), tag=epoch).result()
+
+# Results of these do not depend on the stop, a run does not cancel them
+__STOPLESS_CALLS = ["ListBreakpoints"]
+
+# Results with a huge array, which is decoded element by element off the socket
+__STREAM_CALLS = {"ListGoroutines": "Goroutines"}
+
+def __read_stream(stream, key, chunk_size, chunk_callback):
+    # Full chunks go to the callback as they are decoded, the rest stays in the result
+    chunk = []
+    for element in stream:
+        chunk.append(element)
+        if len(chunk) >= chunk_size:
+            chunk_callback(chunk)
+            chunk = []
+    result = stream.result()
+    result[key] = chunk
+    return result
+
+def __is_goroutine_match(goroutine, find):
+    if find.isdigit():
+        return goroutine['id'] == int(find)
+    for key in ['currentLoc', 'userCurrentLoc']:
+        loc = goroutine.get(key) or {}
+        function = loc.get('function') or {}
+        if find in function.get('name', '') or find in os.path.basename(loc.get('file', '')):
+            return True
+    return False
+
+def __find_goroutine_page(connect, const, logger, find, count, epoch):
+    # Delve has no lookup of a goroutine, the pages are read until it shows up,
+    # the Start and rows of the pages before are passed on for the view to go back
+    start = 0
+    pages = []
+    try:
+        while start >= 0:
+            result = __call(connect, const, "ListGoroutines", {"Start": start, "Count": count}, epoch)
+            for goroutine in result['Goroutines']:
+                if __is_goroutine_match(goroutine, find):
+                    return start, goroutine['id'], pages
+            pages.append((start, len(result['Goroutines'])))
+            start = result['Nextg']
+    except JsonRpcTcpProtocolError as e:
+        logger.error("Search of goroutine %s failed: %s" % (find, e))
+    return None, None, None
+
+# Delve api.GoroutineField of the location groupings
+__GROUP_FIELDS = {"user": 2, "go": 3, "start": 4}
+__GROUP_LOCATIONS = {"user": "userCurrentLoc", "go": "goStatementLoc", "start": "startLoc"}
+# Goroutines read per call while they are grouped or the members of a group are looked for
+__GROUP_BATCH = 10000
+
+# runtime g status and waitReason names
+__GOROUTINE_STATUSES = ["idle", "runnable", "running", "syscall", "waiting", "moribund", "dead", "enqueue", "copystack", "preempted"]
+__WAIT_REASONS = ["", "GC assist marking", "IO wait", "chan receive (nil chan)", "chan send (nil chan)", "dumping heap",
+                  "garbage collection", "garbage collection scan", "panicwait", "select", "select (no cases)",
+                  "GC assist wait", "GC sweep wait", "GC scavenge wait", "chan receive", "chan send", "finalizer wait",
+                  "force gc (idle)", "semacquire", "sleep", "sync.Cond.Wait", "timer goroutine (idle)",
+                  "trace reader (blocked)", "wait for GC cycle", "GC worker (idle)", "preempted", "debug call"]
+
+def __get_goroutine_state(goroutine):
+    status = goroutine.get('status', 0)
+    if status == 4:
+        reason = goroutine.get('waitReason', 0)
+        return __WAIT_REASONS[reason] if 0 < reason < len(__WAIT_REASONS) else "waiting"
+    return __GOROUTINE_STATUSES[status] if 0 <= status < len(__GOROUTINE_STATUSES) else "status %d" % status
+
+def __get_goroutine_group(goroutine, group):
+    # same text as the group names of Delve, see formatLoc in service/debugger
+    loc = goroutine.get(__GROUP_LOCATIONS[group['by']]) or {}
+    function = loc.get('function') or {}
+    name = "%s:%d in %s" % (loc.get('file', ''), loc.get('line', 0), function.get('name') or '?')
+    if group['wait_reason']:
+        name += " [%s]" % __get_goroutine_state(goroutine)
+    return name
+
+def __list_goroutine_groups(connect, const, logger, group, epoch):
+    # Delve groups every batch, older versions ignore the options and the batches are grouped here
+    totals = collections.OrderedDict()
+    server = not group['wait_reason']
+    start = 0
+    while start >= 0:
+        parms = {"Start": start, "Count": __GROUP_BATCH}
+        if server:
+            # ListGoroutinesIn embeds api.GoroutineGroupingOptions, its fields are on the top level
+            parms.update({"GroupBy": __GROUP_FIELDS[group['by']], "MaxGroupMembers": 1, "MaxGroups": __GROUP_BATCH})
+        result = __call(connect, const, "ListGoroutines", parms, epoch)
+        if server and start == 0 and result.get('Groups') is None:
+            logger.debug("Goroutine grouping is not supported by the server, grouped by the client")
+            server = False
+        if server:
+            for element in result['Groups']:
+                totals[element['Name']] = totals.get(element['Name'], 0) + element['Total']
+        else:
+            for goroutine in result['Goroutines']:
+                name = __get_goroutine_group(goroutine, group)
+                totals[name] = totals.get(name, 0) + 1
+        start = result['Nextg']
+    groups = [{"Name": name, "Total": total} for name, total in totals.items()]
+    groups.sort(key=lambda element: -element['Total'])
+    return groups, server
+
+def __list_goroutine_members(connect, const, group, limit, epoch):
+    members = collections.OrderedDict((name, []) for name in group['expand'])
+    if group.get('server', False):
+        for name in group['expand']:
+            start = 0
+            while start >= 0 and len(members[name]) < limit:
+                result = __call(connect, const, "ListGoroutines", {"Start": start, "Count": __GROUP_BATCH,
+                    "Filters": [{"Kind": __GROUP_FIELDS[group['by']], "Negated": False, "Arg": name}]}, epoch)
+                members[name].extend(result['Goroutines'])
+                start = result['Nextg']
+    else:
+        start = 0
+        while start >= 0 and min(len(element) for element in members.values()) < limit:
+            result = __call(connect, const, "ListGoroutines", {"Start": start, "Count": __GROUP_BATCH}, epoch)
+            for goroutine in result['Goroutines']:
+                name = __get_goroutine_group(goroutine, group)
+                if name in members:
+                    members[name].append(goroutine)
+            start = result['Nextg']
+    return dict((name, element[:limit]) for name, element in members.items())
+
+def __do_goroutine_group(connect, const, logger, group, goroutine_id, epoch):
+    cmd = const.GOROUTINE_COMMAND
+    try:
+        if group.get('expand') is None:
+            groups, server = __list_goroutine_groups(connect, const, logger, group, epoch)
+            group = dict(group, server=server)
+            response = {"Groups": groups}
+        else:
+            response = {"Members": __list_goroutine_members(connect, const, group, const.GOROUTINE_PAGE_SIZE or __GROUP_BATCH, epoch)}
+        return {"cmd": cmd, "result": True, "response": response, "group": group, "current_goroutine_id": goroutine_id}
+    except JsonRpcTcpProtocolError as e:
+        logger.error("Inspection command %s failed: %s" % (cmd, e))
+        return __get_error_response_ex(cmd, group, e)
+    except:
+        traceback.print_exc(file=(sys.stdout if logger.get_file() == const.STDOUT else open(logger.get_file(),"a")))
+        logger.error("Exception thrown, details in file: %s" % logger.get_file())
+        return __get_error_response(cmd, group)
+
+def __call_batch(connect, calls, timeouts, chunk_size=0, chunk_callback=None, cache=None, epoch=0):
+    # All calls are pipelined in one write, responses are matched back by request id
+    futures = []
+    for method, parms in calls:
+        timeout = __get_timeout(timeouts, method)
+        tag = None if method in __STOPLESS_CALLS else epoch
+        cached = cache.get(epoch, method, parms) if cache is not None else None
+        if cached is not None:
+            futures.append(cached)
+        elif chunk_callback is not None and method in __STREAM_CALLS:
+            futures.append(connect._call_stream("RPCServer.%s" % method, parms, __STREAM_CALLS[method], timeout, tag))
+        else:
+            futures.append(connect._call_async("RPCServer.%s" % method, parms, timeout=timeout, tag=tag))
+    results = []
+    for (method, parms), future in zip(calls, futures):
+        try:
+            if type(future) is DlvCachedResult:
+                results.append((True, future.result))
+            elif chunk_callback is not None and method in __STREAM_CALLS:
+                results.append((True, __read_stream(future, __STREAM_CALLS[method], chunk_size, chunk_callback)))
+            else:
+                results.append((True, future.result()))
+                if cache is not None:
+                    cache.put(epoch, method, parms, results[-1][1])
+        except Exception as e:
+            results.append((False, e))
+    return results
+
+def __do_inspection(connect, const, logger, inspections, chunk_callback=None, cache=None, epoch=0):
+    calls = []
+    for cmd, parms in inspections:
+        calls.extend(__get_inspection_calls(const, cmd, parms))
+    try:
+        results = __call_batch(connect, calls, const.TIMEOUTS, const.STREAM_CHUNK, chunk_callback, cache, epoch)
+    except Exception as e:
+        traceback.print_exc(file=(sys.stdout if logger.get_file() == const.STDOUT else open(logger.get_file(),"a")))
+        logger.error("Exception thrown, details in file: %s" % logger.get_file())
+        results = [(False, e)] * len(calls)
+    responses = []
+    idx = 0
+    for cmd, parms in inspections:
+        count = len(__get_inspection_calls(const, cmd, parms))
+        values = []
+        error = None
+        for result, value in results[idx:idx + count]:
+            if result:
+                values.append(value)
+            elif error is None:
+                error = value
+        idx += count
+        if error is None:
+            responses.append({"cmd": cmd, "result": True, "response": __get_inspection_response(const, cmd, values)})
+        elif isinstance(error, JsonRpcTcpProtocolError):
+            logger.error("Inspection command %s failed: %s" % (cmd, error))
+            responses.append(__get_error_response_ex(cmd, parms, error))
+        else:
+            logger.error("Inspection command %s failed: %s" % (cmd, error))
+            responses.append(__get_error_response(cmd, parms))
+    return responses
+
+def _is_inspection_request(const, cmd):
+    return cmd in [const.STACKTRACE_COMMAND, const.BREAKPOINT_COMMAND, const.VARIABLE_COMMAND, const.WATCH_COMMAND, const.GOROUTINE_COMMAND]
+
+def _is_stop_request(const, cmd):
+    # results of these depend on the stop they were read at
+    return cmd in [const.STACKTRACE_COMMAND, const.VARIABLE_COMMAND, const.WATCH_COMMAND, const.GOROUTINE_COMMAND, const.DUMP_STACKS_COMMAND]
+
+def __get_inspection_work():
+    return {"responses": [], "errors": False, "goroutine_id": None, "frame": 0, "goroutines": False, "goroutine_list": True, "goroutine_page": None, "watches": None, "inspections": [], "epoch": 0}
+
+def __add_inspection(const, work, cmd, parms):
+    if cmd in [const.STACKTRACE_COMMAND, const.BREAKPOINT_COMMAND, const.VARIABLE_COMMAND]:
+        # read-only requests go out together after the control commands
+        work['inspections'].append((cmd, parms))
+    elif cmd == const.WATCH_COMMAND:
+        if 'goroutine_id' in parms:
+            work['goroutine_id'] = parms['goroutine_id']
+            work['frame'] = parms['frame']
+        work['watches'] = parms['watches']
+    elif cmd == const.GOROUTINE_COMMAND:
+        if 'goroutine_id' in parms:
+            work['goroutine_id'] = parms['goroutine_id']
+        # without the list only the current goroutine is called back, see DlvGoroutineView
+        work['goroutines'] = True
+        work['goroutine_list'] = parms.get('list', True)
+        work['goroutine_page'] = {"start": parms.get('start', 0), "count": parms.get('count', const.GOROUTINE_PAGE_SIZE),
+                                  "find": parms.get('find'), "scroll": parms.get('scroll', False), "group": parms.get('group')}
+    else:
+        return False
+    return True
+
+def __copy_inspection_work(work):
+    copy = dict(work)
+    copy['responses'] = list(work['responses'])
+    copy['inspections'] = list(work['inspections'])
+    return copy
+
+def __is_connection_lost(connect, e):
+    return isinstance(e, JsonRpcTcpProtocolError) and e.code in [-32800, -32801, -32802, -32803] and not connect._is_open()
+
+def __has_inspection(work):
+    return len(work['inspections']) > 0 or work['goroutines'] or work['watches'] is not None
+
+def __clear_cache(cache, epoch):
+    if cache is not None:
+        cache.clear(epoch)
+
+def __check_position(epoch, cache, work, response):
+    # a command typed in the session input moves the program behind the worker
+    if epoch.move_to(__get_position(response)):
+        __clear_cache(cache, epoch.next())
+        work['epoch'] = epoch.value
+
+def __drop_stop_inspection(const, work):
+    work['inspections'] = [(cmd, parms) for cmd, parms in work['inspections'] if not _is_stop_request(const, cmd)]
+    work['goroutines'] = False
+    work['watches'] = None
+
+def _do_callback(epoch, work_epoch, worker_callback, prj, responses):
+    if epoch.is_stale(work_epoch):
+        # the program moved on since the request, keep the views of the new stop
+        responses = [response for response in responses if not _is_stop_request(prj.const, response['cmd'])]
+        if len(responses) == 0:
+            return
+    worker_callback(prj, responses)
+
+def __do_control(pool, alive, epoch, cache, const, logger, requests, executing):
+    connect = pool.control
+    online = connect._is_open() or pool.reconnect(connect, alive)
+    work = __get_inspection_work()
+    responses = work['responses']
+    lost = []
+    for request in requests:
+        cmd = request["cmd"]
+        parms = request["parms"]
+        if parms is None:
+            parms = {}
+        work['epoch'] = max(work['epoch'], request.get("epoch", 0))
+        try:
+            if __add_inspection(const, work, cmd, parms):
+                continue
+            elif cmd in const.RUNTIME_COMMANDS:
+                parms['name'] = cmd
+                # results read at the former stop are stale from now on
+                running = epoch.next()
+                __clear_cache(cache, running)
+                # the program may run for minutes until it stops, see the "control" timeout
+                executing.set()
+                try:
+                    response = __call(connect, const, "Command", parms)
+                finally:
+                    executing.clear()
+                    # so are the ones read while the program was running, the stop
+                    # is stale already when a newer run was requested meanwhile
+                    work['epoch'] = epoch.next_from(running)
+                epoch.move_to(__get_position(response))
+                work['goroutine_id'] = __get_current_goroutine(response)
+            elif cmd == const.STATE_COMMAND:
+                if work['errors']:
+                    work['errors'] = False
+                if parms.get('input', False):
+                    # a command typed in the session input may change memory without moving
+                    __clear_cache(cache, epoch.next())
+                    work['epoch'] = epoch.value
+                response = __call(connect, const, "State", dict((key, value) for key, value in parms.items() if key != 'input'))
+                __check_position(epoch, cache, work, response)
+                work['goroutine_id'] = __get_current_goroutine(response)
+            elif cmd == const.CREATE_BREAKPOINT_COMMAND:
+                response = __call(connect, const, "CreateBreakpoint", parms)
+            elif cmd == const.CLEAR_BREAKPOINT_COMMAND:
+                response = __call(connect, const, "ClearBreakpoint", {"Id": parms['bkpt_id'], "Name": parms['bkpt_name']})
+            elif cmd == const.RESTART_COMMAND:
+                running = epoch.next()
+                __clear_cache(cache, running)
+                try:
+                    response = __call(connect, const, "Restart", parms)
+                finally:
+                    work['epoch'] = epoch.next_from(running)
+            elif cmd == const.CANCEL_NEXT_COMMAND:
+                response = __call(connect, const, "CancelNext", parms)
+            else:
+                raise ValueError("Unknown worker command: %s" % cmd)
+            responses.append({"cmd": cmd, "result": True, "response": response})
+        except JsonRpcTcpProtocolError as e:
+            traceback.print_exc(file=(sys.stdout if logger.get_file() == const.STDOUT else open(logger.get_file(),"a")))
+            logger.error("Exception thrown, details in file: %s" % logger.get_file())
+            if online and __is_connection_lost(connect, e):
+                online = pool.reconnect(connect, alive)
+                if online:
+                    # state and breakpoints are queried again below
+                    lost.append(cmd)
+                    work['errors'] = True
+                    continue
+            responses.append(__get_error_response_ex(cmd, parms, e))
+            if cmd not in [const.STATE_COMMAND, const.CREATE_BREAKPOINT_COMMAND, const.CLEAR_BREAKPOINT_COMMAND]:
+                work['errors'] = True
+        except:
+            traceback.print_exc(file=(sys.stdout if logger.get_file() == const.STDOUT else open(logger.get_file(),"a")))
+            logger.error("Exception thrown, details in file: %s" % logger.get_file())
+            responses.append(__get_error_response(cmd, parms))
+            if cmd not in [const.STATE_COMMAND, const.CREATE_BREAKPOINT_COMMAND, const.CLEAR_BREAKPOINT_COMMAND]:
+                work['errors'] = True
+    parms = {}
+    if len(lost) > 0:
+        logger.warning("Connection restored, requests %s are lost, state and breakpoints are queried again" % ", ".join(lost))
+        if (const.BREAKPOINT_COMMAND, parms) not in work['inspections']:
+            work['inspections'].append((const.BREAKPOINT_COMMAND, parms))
+    if work['errors']:
+        work['errors'] = False
+        cmd = const.STATE_COMMAND
+        try:
+            response = __call(connect, const, "State", parms)
+            __check_position(epoch, cache, work, response)
+            work['goroutine_id'] = __get_current_goroutine(response)
+            responses.append({"cmd": cmd, "result": True, "response": response})
+        except JsonRpcTcpProtocolError as e:
+            responses.append(__get_error_response_ex(cmd, parms, e))
+            work['errors'] = True
+        except:
+            responses.append(__get_error_response(cmd, parms))
+            work['errors'] = True
+    return work
+
+def __do_inspection_work(connect, prj, work, epoch, cache, worker_callback):
     const = prj.const
     logger = prj.logger
-    connect = JsonRpcTcpClient(const, logger)
-    if __start(connect, const, logger):
+    responses = work['responses']
+    errors = work['errors']
+    goroutine_id = work['goroutine_id']
+    watches = work['watches']
+    inspections = work['inspections']
+    parms = {}
+    page = work['goroutine_page']
+    grouped = page is not None and page['group'] is not None
+    paged = page is not None and page['count'] > 0 and not grouped
+    prefetch = not errors and work['goroutines'] and cache is not None and const.PREFETCH_FRAMES > 0 and \
+        goroutine_id is not None and goroutine_id > 0 and not page['scroll']
+    if prefetch:
+        # pipelined with the goroutines, the views find the results in the cache
+        inspections.insert(0, (__PREFETCH_COMMAND, {"goroutine_id": goroutine_id, "frames": const.PREFETCH_FRAMES}))
+    if not errors and work['goroutines'] and work['goroutine_list'] and grouped:
+        # a few calls one after another, the rows of the groups are small
+        responses.append(__do_goroutine_group(connect, const, logger, page['group'], goroutine_id, work['epoch']))
+    elif not errors and work['goroutines'] and work['goroutine_list']:
+        if paged and page['find'] is not None:
+            start, found, pages = __find_goroutine_page(connect, const, logger, page['find'], page['count'], work['epoch'])
+            page = dict(page, start=(start if start is not None else page['start']), found=found, pages=pages)
+        inspections.append((const.GOROUTINE_COMMAND, {"Start": page['start'], "Count": page['count']} if paged else parms))
+    watch_count = 0
+    if not errors and watches is not None and goroutine_id is not None and goroutine_id > 0:
+        for element in watches:
+            inspections.append((const.WATCH_COMMAND, {"goroutine_id": goroutine_id, "frame": work['frame'], "expr": element['expr']}))
+        watch_count = len(watches)
+    # goroutines are passed to the view in chunks while the response is read
+    streamed = {"offset": 0, "found": False}
+    def goroutines_callback(chunk):
+        for gr in chunk:
+            if gr['id'] == goroutine_id:
+                streamed['found'] = True
+        if worker_callback is not None:
+            partial_response = {"cmd": const.GOROUTINE_COMMAND, "result": True, "response": {"Goroutines": chunk}, "offset": streamed['offset'], "partial": True}
+            prj.frontend.set_timeout(functools.partial(_do_callback, epoch, work['epoch'], worker_callback, prj, [partial_response]), 0)
+        streamed['offset'] += len(chunk)
+    inspection_responses = []
+    if len(inspections) > 0:
+        # a page is small, it is not streamed
+        inspection_responses = __do_inspection(connect, const, logger, inspections, goroutines_callback if not paged else None, cache, work['epoch'])
+    if watch_count > 0:
+        watch_responses = inspection_responses[len(inspection_responses) - watch_count:]
+        inspection_responses = inspection_responses[:len(inspection_responses) - watch_count]
+    if prefetch:
+        response = inspection_responses.pop(0)
+        if response['result']:
+            for frame, loc in enumerate(response['response']['Locations']):
+                if loc['Locals'] is None or loc['Arguments'] is None:
+                    continue
+                call_parms = __get_variable_parms(goroutine_id, frame)
+                cache.put(work['epoch'], "ListLocalVars", call_parms, {"Variables": loc['Locals']})
+                cache.put(work['epoch'], "ListFunctionArgs", call_parms, {"Args": loc['Arguments']})
+    if not errors and work['goroutines'] and not work['goroutine_list'] and goroutine_id is not None:
+        responses.append({"cmd": const.GOROUTINE_COMMAND, "result": True, "response": None, "current_goroutine_id": goroutine_id})
+    responses.extend(inspection_responses)
+    for response in inspection_responses:
+        if response['cmd'] != const.GOROUTINE_COMMAND:
+            continue
+        response['offset'] = streamed['offset']
+        response['page'] = page if paged else None
+        if response['result'] and paged:
+            # the current goroutine may be on another page
+            response['current_goroutine_id'] = goroutine_id
+        elif response['result']:
+            found = streamed['found']
+            for gr in response['response']['Goroutines']:
+                if gr['id'] == goroutine_id:
+                    found = True
+                    break
+            if not found:
+                goroutine_id = 0
+                errors = True
+            response['current_goroutine_id'] = goroutine_id
+        else:
+            errors = True
+    if not errors and watch_count > 0:
+        cmd = const.WATCH_COMMAND
+        response_watches = []
+        for element, response in zip(watches, watch_responses):
+            if response['result']:
+                response_watches.append({"watch_id": element['watch_id'], "result": True, "eval": response['response']})
+            else:
+                response['cmd'] = cmd
+                response['parms'] = element
+                response_watches.append(response)
+        responses.append({"cmd": const.WATCH_COMMAND, "result": True, "response": response_watches})
+    return responses
+
+def _do_control(alive, executing, epoch, cache, queue, inspection_queue, prj, pool, worker_callback=None):
+    const = prj.const
+    logger = prj.logger
+    if pool.open():
         alive.set()
+        threads = []
+        for connect in pool.inspections:
+            t = threading.Thread(name='worker-inspection', target=_do_inspection, args=(alive, epoch, cache, inspection_queue, prj, pool, connect, worker_callback))
+            t.start()
+            threads.append(t)
         while alive.isSet():
             requests = queue.get()
             if requests is None:
                 alive.clear()
                 continue
-            responses = []
-            errors = False
-            goroutine_id = None
-            goroutines = False
-            frame = 0
-            watches = None
-            for request in requests:
-                cmd = request["cmd"]
-                parms = request["parms"]
-                if parms is None:
-                    parms = {}
-                try:
-                    if cmd in const.RUNTIME_COMMANDS:
-                        parms['name'] = cmd
-                        response = connect.RPCServer.Command(parms)
-                        goroutine_id = __get_current_goroutine(response)
-                    elif cmd == const.STATE_COMMAND:
-                        if errors:
-                            errors = False
-                        response = connect.RPCServer.State(parms)
-                        goroutine_id = __get_current_goroutine(response)
-                    elif cmd == const.CREATE_BREAKPOINT_COMMAND:
-                        response = connect.RPCServer.CreateBreakpoint(parms)
-                    elif cmd == const.CLEAR_BREAKPOINT_COMMAND:
-                        response = connect.RPCServer.ClearBreakpoint({"Id": parms['bkpt_id'], "Name": parms['bkpt_name']})
-                    elif cmd == const.RESTART_COMMAND:
-                        response = connect.RPCServer.Restart(parms)
-                    elif cmd == const.CANCEL_NEXT_COMMAND:
-                        response = connect.RPCServer.CancelNext(parms)
-                    elif cmd == const.STACKTRACE_COMMAND:
-                        response = connect.RPCServer.Stacktrace(__get_stacktrace_parms(parms['goroutine_id']))
-                    elif cmd == const.BREAKPOINT_COMMAND:
-                        response = connect.RPCServer.ListBreakpoints(parms)
-                    elif cmd == const.VARIABLE_COMMAND:
-                        call_parms = __get_variable_parms(parms['goroutine_id'], parms['frame'])
-                        response_locals = connect.RPCServer.ListLocalVars(call_parms)
-                        response_args = connect.RPCServer.ListFunctionArgs(call_parms)
-                        response = {"Locals": response_locals['Variables'], "Arguments": response_args['Args']}
-                    elif cmd == const.WATCH_COMMAND:
-                        if 'goroutine_id' in parms:
-                            goroutine_id = parms['goroutine_id']
-                            frame = parms['frame']
-                        watches = parms['watches']
-                        continue  
-                    elif cmd == const.GOROUTINE_COMMAND:
-                        if not goroutines:
-                            goroutines = True
-                        continue  
-                    else:
-                        raise ValueError("Unknown worker command: %s" % cmd)
-                    responses.append({"cmd": cmd, "result": True, "response": response})
-                except JsonRpcTcpProtocolError as e:
-                    traceback.print_exc(file=(sys.stdout if logger.get_file() == const.STDOUT else open(logger.get_file(),"a")))
-                    logger.error("Exception thrown, details in file: %s" % logger.get_file())
-                    responses.append(__get_error_response_ex(cmd, parms, e))
-                    if cmd not in [const.STATE_COMMAND, const.CREATE_BREAKPOINT_COMMAND, const.CLEAR_BREAKPOINT_COMMAND]:
-                        errors = True
-                except:
-                    traceback.print_exc(file=(sys.stdout if logger.get_file() == const.STDOUT else open(logger.get_file(),"a")))
-                    logger.error("Exception thrown, details in file: %s" % logger.get_file())
-                    responses.append(__get_error_response(cmd, parms))
-                    if cmd not in [const.STATE_COMMAND, const.CREATE_BREAKPOINT_COMMAND, const.CLEAR_BREAKPOINT_COMMAND]:
-                        errors = True
-            parms = {}
-            if errors:
-                errors = False
-                cmd = const.STATE_COMMAND
-                try:
-                    response = connect.RPCServer.State(parms)
-                    goroutine_id = __get_current_goroutine(response)
-                    responses.append({"cmd": cmd, "result": True, "response": response})
-                except JsonRpcTcpProtocolError as e:
-                    responses.append(__get_error_response_ex(cmd, parms, e))
-                    errors = True
-                except:
-                    responses.append(__get_error_response(cmd, parms))
-                    errors = True
-            if not errors and goroutines:
-                cmd = const.GOROUTINE_COMMAND
-                try:
-                    response = connect.RPCServer.ListGoroutines(parms)
-                    found = False
-                    for gr in response['Goroutines']:
-                        if gr['id'] == goroutine_id:
-                            found = True
-                            break
-                    if not found:
-                        goroutine_id = 0
-                        errors = True
-                    responses.append({"cmd": const.GOROUTINE_COMMAND, "result": True, "response": response, "current_goroutine_id": goroutine_id})
-                except JsonRpcTcpProtocolError as e:
-                    responses.append(__get_error_response_ex(cmd, parms, e))
-                    errors = True
-                except:
-                    responses.append(__get_error_response(cmd, parms))
-                    errors = True
-            if not errors and watches is not None and goroutine_id > 0:
-                cmd = const.WATCH_COMMAND
-                response_watches = []
-                for element in watches:
-                    try:
-                        value = connect.RPCServer.Eval(__get_eval_parms(goroutine_id, frame, element['expr']))
-                        response_watches.append({"watch_id": element['watch_id'], "result": True, "eval": value})
-                    except JsonRpcTcpProtocolError as e:
-                        response_watches.append(__get_error_response_ex(cmd, element, e))
-                    except:
-                        response_watches.append(__get_error_response(cmd, element))
-                responses.append({"cmd": const.WATCH_COMMAND, "result": True, "response": response_watches})
-
-            if worker_callback is not None:
+            work = __do_control(pool, alive, epoch, cache, const, logger, requests, executing)
+            if epoch.is_stale(work['epoch']):
+                # a newer run is queued, its cancel of the inspection came before this work
+                __drop_stop_inspection(const, work)
+            if __has_inspection(work):
+                # the inspection thread completes the responses and calls back
+                inspection_queue.put(work)
+            elif worker_callback is not None:
                 # callback
-                sublime.set_timeout(worker_callback(prj, responses), 0)
-    __stop(connect, const, logger)
+                prj.frontend.set_timeout(functools.partial(_do_callback, epoch, work['epoch'], worker_callback, prj, work['responses']), 0)
+        for t in threads:
+            inspection_queue.put(None)
+        for t in threads:
+            t.join()
+    pool.close()
+
+def _do_inspection(alive, epoch, cache, queue, prj, pool, connect, worker_callback=None):
+    const = prj.const
+    logger = prj.logger
+    while True:
+        work = queue.get()
+        if work is None:
+            break
+        if type(work) is list:
+            requests = work
+            work = __get_inspection_work()
+            for request in requests:
+                __add_inspection(const, work, request["cmd"], request["parms"] if request["parms"] is not None else {})
+                work['epoch'] = max(work['epoch'], request.get("epoch", 0))
+        # a cancel of the work before this one
+        connect._clear_cancel()
+        if epoch.is_stale(work['epoch']):
+            logger.debug("Inspection of stop %d skipped, the program moved on" % work['epoch'])
+            __drop_stop_inspection(const, work)
+            if not __has_inspection(work) and len(work['responses']) == 0:
+                continue
+        online = connect._is_open() or pool.reconnect(connect, alive)
+        retry = __copy_inspection_work(work)
+        responses = __do_inspection_work(connect, prj, work, epoch, cache, worker_callback)
+        if online and not connect._is_open() and pool.reconnect(connect, alive):
+            # inspection is read-only, run it again on the new connection
+            responses = __do_inspection_work(connect, prj, retry, epoch, cache, worker_callback)
+        if worker_callback is not None:
+            # callback
+            prj.frontend.set_timeout(functools.partial(_do_callback, epoch, work['epoch'], worker_callback, prj, responses), 0)
+
+# Stacktrace requests in flight per dump connection
+__DUMP_WINDOW = 64
+# Seconds between two progress callbacks of a dump
+__DUMP_PROGRESS_INTERVAL = 0.25
+
+def __get_dump_key(goroutine):
+    # goroutines parked at the same place almost always have the same stack, the exact
+    # mode reads every stack instead, one Stacktrace per goroutine is too slow by default
+    return tuple((goroutine.get(key) or {}).get('pc', 0) for key in ['currentLoc', 'userCurrentLoc', 'goStatementLoc', 'startLoc'])
+
+def __get_dump_targets(connect, const, dump, parms, progress):
+    # goroutine to read the stack of, with the goroutines it stands for
+    targets = collections.OrderedDict()
+    count = 0
+    start = 0
+    while start >= 0 and not dump.is_cancelled():
+        result = __call(connect, const, "ListGoroutines", {"Start": start, "Count": __GROUP_BATCH})
+        progress(len(result['Goroutines']), 0)
+        for goroutine in result['Goroutines']:
+            if parms.get('filter') and not __is_goroutine_match(goroutine, parms['filter']):
+                continue
+            count += 1
+            key = goroutine['id'] if parms.get('exact', False) else __get_dump_key(goroutine)
+            if key in targets:
+                targets[key][1].append(goroutine['id'])
+            else:
+                targets[key] = (goroutine['id'], [goroutine['id']])
+        start = result['Nextg']
+    return list(targets.values()), count
+
+def __read_dump_stacks(connect, const, dump, targets, stacks, progress):
+    futures = collections.deque()
+    def read(goroutine_id, future):
+        try:
+            stacks[goroutine_id] = future.result()['Locations']
+        except:
+            # the goroutine exited, the call timed out or the dump was cancelled
+            pass
+        progress(0, 1)
+    for goroutine_id, goroutine_ids in targets:
+        if dump.is_cancelled():
+            break
+        futures.append((goroutine_id, connect._call_async("RPCServer.Stacktrace", __get_stacktrace_parms(goroutine_id),
+            timeout=__get_timeout(const.TIMEOUTS, "Stacktrace"))))
+        if len(futures) >= __DUMP_WINDOW:
+            read(*futures.popleft())
+    while len(futures) > 0:
+        read(*futures.popleft())
+
+def __fold_dump_stacks(targets, stacks):
+    buckets = collections.OrderedDict()
+    for goroutine_id, goroutine_ids in targets:
+        locations = stacks.get(goroutine_id)
+        if locations is None:
+            continue
+        frames = [{"pc": loc.get('pc', 0), "function": {"name": (loc.get('function') or {}).get('name', '')}, "file": loc.get('file', ''), "line": loc.get('line', 0)} for loc in locations]
+        # the same stack is the same pc in every frame
+        signature = tuple(frame['pc'] for frame in frames)
+        if signature not in buckets:
+            buckets[signature] = {"frames": frames, "goroutines": []}
+        buckets[signature]['goroutines'].extend(goroutine_ids)
+    return list(buckets.values())
+
+def _do_dump(dump, epoch, dump_epoch, prj, parms, worker_callback=None):
+    const = prj.const
+    logger = prj.logger
+    cmd = const.DUMP_STACKS_COMMAND
+    status = {"Listed": 0, "Done": 0, "Total": 0}
+    lock = threading.Lock()
+    last = [0]
+    def callback(response):
+        if worker_callback is not None:
+            prj.frontend.set_timeout(functools.partial(_do_callback, epoch, dump_epoch, worker_callback, prj, [response]), 0)
+    def progress(listed, done):
+        with lock:
+            status['Listed'] += listed
+            status['Done'] += done
+            if time.time() - last[0] < __DUMP_PROGRESS_INTERVAL:
+                return
+            last[0] = time.time()
+            response = {"cmd": cmd, "parms": parms, "result": True, "response": dict(status), "partial": True}
+        callback(response)
+    response = None
+    connects = []
+    targets = []
+    stacks = {}
+    count = 0
+    try:
+        host, port = prj.get_endpoint()
+        for i in range(max(const.INSPECTION_CONNECTIONS, 1)):
+            connect = JsonRpcTcpClient(const, logger)
+            connect._open(host, port)
+            connects.append(connect)
+            dump.add_connect(connect)
+        targets, count = __get_dump_targets(connects[0], const, dump, parms, progress)
+        status['Total'] = len(targets)
+        # parallel over the connections, pipelined on each
+        threads = []
+        for idx, connect in enumerate(connects):
+            t = threading.Thread(name='worker-dump', target=__read_dump_stacks, args=(connect, const, dump, targets[idx::len(connects)], stacks, progress))
+            t.start()
+            threads.append(t)
+        for t in threads:
+            t.join()
+    except JsonRpcTcpProtocolError as e:
+        if not dump.is_cancelled():
+            logger.error("Dump of the stacks failed: %s" % e)
+            response = __get_error_response_ex(cmd, parms, e)
+    except:
+        traceback.print_exc(file=(sys.stdout if logger.get_file() == const.STDOUT else open(logger.get_file(),"a")))
+        logger.error("Exception thrown, details in file: %s" % logger.get_file())
+        response = __get_error_response(cmd, parms)
+    if response is None:
+        # a cancelled dump shows the stacks read until then
+        response = {"cmd": cmd, "parms": parms, "result": True, "response": {"Buckets": __fold_dump_stacks(targets, stacks), "Goroutines": count,
+            "Read": len(stacks), "Exact": parms.get('exact', False), "Filter": parms.get('filter', ''), "Cancelled": dump.is_cancelled()}}
+    for connect in connects:
+        try:
+            connect._close()
+        except:
+            pass
+    callback(response)
+
+def _do_halt(pool, prj):
+    const = prj.const
+    logger = prj.logger
+    try:
+        pool.halt()
+    except:
+        traceback.print_exc(file=(sys.stdout if logger.get_file() == const.STDOUT else open(logger.get_file(),"a")))
+        logger.error("Exception thrown, details in file: %s" % logger.get_file())
+
+class DlvStackDump(object):
+    """
+    Cancel switch of a running dump of the goroutine stacks, it is also
+    cancelled when the program moves on.
+    """
+    def __init__(self, epoch):
+        self.__epoch = epoch
+        self.__dump_epoch = epoch.value
+        self.__cancelled = threading.Event()
+        self.__lock = threading.Lock()
+        self.__connects = []
+
+    @property
+    def dump_epoch(self):
+        return self.__dump_epoch
+
+    def add_connect(self, connect):
+        with self.__lock:
+            self.__connects.append(connect)
+            if self.__cancelled.isSet():
+                connect._cancel()
+
+    def cancel(self):
+        with self.__lock:
+            self.__cancelled.set()
+            for connect in self.__connects:
+                connect._cancel()
+
+    def is_cancelled(self):
+        return self.__cancelled.isSet() or self.__epoch.is_stale(self.__dump_epoch)
+
+class DlvStopEpoch(object):
+    """
+    Moves on when a run is requested, when the program starts and when it
+    stops, an inspection is valid for one stop only. The position of the
+    last stop tells a move made outside the worker.
+    """
+
+    def __init__(self):
+        self.__lock = threading.Lock()
+        self.__value = 0
+        self.__position = None
+
+    @property
+    def value(self):
+        return self.__value
+
+    def next(self):
+        with self.__lock:
+            self.__value += 1
+            return self.__value
+
+    def next_from(self, epoch):
+        # moves on only if nobody did since epoch, else epoch is returned, stale
+        with self.__lock:
+            if self.__value != epoch:
+                return epoch
+            self.__value += 1
+            return self.__value
+
+    def is_stale(self, epoch):
+        return epoch < self.__value
+
+    def move_to(self, position):
+        # True when the program stands elsewhere than at the last known position
+        if position is None:
+            return False
+        with self.__lock:
+            moved = self.__position is not None and position != self.__position
+            self.__position = position
+            return moved
+
+class DlvCachedResult(object):
+    def __init__(self, result):
+        self.result = result
+
+class DlvInspectionCache(object):
+    """
+    Results of the stop dependent Delve calls, keyed by the stop epoch, the
+    method and its parameters: goroutine, frame and load config. The least
+    recently used results are evicted above max_size bytes of JSON.
+    """
+    METHODS = ["Stacktrace", "ListLocalVars", "ListFunctionArgs", "Eval"]
+
+    def __init__(self, max_size):
+        self.__max_size = max_size
+        self.__lock = threading.Lock()
+        self.__epoch = 0
+        self.__entries = collections.OrderedDict()
+        self.__size = 0
+
+    def __get_key(self, method, parms):
+        return (method, json.dumps(parms, sort_keys=True))
+
+    def __reset(self, epoch):
+        self.__epoch = epoch
+        self.__entries.clear()
+        self.__size = 0
+
+    def clear(self, epoch):
+        with self.__lock:
+            self.__reset(epoch)
+
+    def get(self, epoch, method, parms):
+        if method not in self.METHODS:
+            return None
+        key = self.__get_key(method, parms)
+        with self.__lock:
+            if epoch != self.__epoch or key not in self.__entries:
+                return None
+            self.__entries.move_to_end(key)
+            return DlvCachedResult(self.__entries[key][0])
+
+    def put(self, epoch, method, parms, result):
+        if method not in self.METHODS:
+            return
+        size = len(json.dumps(result))
+        if size > self.__max_size:
+            return
+        key = self.__get_key(method, parms)
+        with self.__lock:
+            if epoch < self.__epoch:
+                return
+            if epoch > self.__epoch:
+                self.__reset(epoch)
+            if key in self.__entries:
+                self.__size -= self.__entries.pop(key)[1]
+            self.__entries[key] = (result, size)
+            self.__size += size
+            while self.__size > self.__max_size:
+                key, entry = self.__entries.popitem(last=False)
+                self.__size -= entry[1]
+
+class DlvRequestQueue(object):
+    """
+    Queue of the worker threads, the items are request lists or inspection
+    work of the control thread. An inspection request stands for a view, a
+    newer one supersedes the same command waiting in an older item, which
+    is dropped, the watches are merged. Control commands are never dropped,
+    they run in order.
+    """
+    def __init__(self, const, logger):
+        self.__const = const
+        self.__logger = logger
+        self.__items = collections.deque()
+        self.__cond = threading.Condition()
+
+    def __get_kinds(self, item):
+        if type(item) is list:
+            return set(request["cmd"] for request in item if _is_inspection_request(self.__const, request["cmd"]))
+        kinds = set(cmd for cmd, parms in item['inspections'])
+        if item['goroutines']:
+            kinds.add(self.__const.GOROUTINE_COMMAND)
+        if item['watches'] is not None:
+            kinds.add(self.__const.WATCH_COMMAND)
+        return kinds
+
+    def __get_watches(self, item):
+        if type(item) is not list:
+            return item['watches']
+        for request in item:
+            if request["cmd"] == self.__const.WATCH_COMMAND:
+                return request["parms"]["watches"]
+        return None
+
+    def __set_watches(self, item, watches):
+        if type(item) is not list:
+            item['watches'] = watches
+            return
+        for idx, request in enumerate(item):
+            if request["cmd"] == self.__const.WATCH_COMMAND:
+                request = dict(request)
+                request["parms"] = dict(request["parms"])
+                request["parms"]["watches"] = watches
+                item[idx] = request
+
+    def __supersede(self, older, newer, kinds):
+        const = self.__const
+        if const.WATCH_COMMAND in kinds:
+            watches = self.__get_watches(older)
+            if watches is not None:
+                newer_watches = self.__get_watches(newer)
+                watch_ids = [element['watch_id'] for element in newer_watches]
+                self.__set_watches(newer, newer_watches + [element for element in watches if element['watch_id'] not in watch_ids])
+        if type(older) is list:
+            requests = [request for request in older if request["cmd"] not in kinds]
+            if len(requests) == 0:
+                return None
+            return requests
+        older['inspections'] = [(cmd, parms) for cmd, parms in older['inspections'] if cmd not in kinds]
+        if const.GOROUTINE_COMMAND in kinds:
+            older['goroutines'] = False
+        if const.WATCH_COMMAND in kinds:
+            older['watches'] = None
+        # the responses of the control commands are still called back
+        return older
+
+    def put(self, item):
+        with self.__cond:
+            if item is not None:
+                if type(item) is list:
+                    item = list(item)
+                kinds = self.__get_kinds(item)
+                items = collections.deque()
+                for older in self.__items:
+                    if older is not None:
+                        superseded = kinds & self.__get_kinds(older)
+                        if len(superseded) > 0:
+                            self.__logger.debug("Superseded requests dropped: %s" % ", ".join(sorted(superseded)))
+                            older = self.__supersede(older, item, superseded)
+                            if older is None:
+                                continue
+                    items.append(older)
+                self.__items = items
+            self.__items.append(item)
+            self.__cond.notify()
+
+    def get(self):
+        with self.__cond:
+            while len(self.__items) == 0:
+                self.__cond.wait()
+            return self.__items.popleft()
+
+    def qsize(self):
+        with self.__cond:
+            return len(self.__items)
+
+class DlvConnectionPool(object):
+    """
+    Connections to the Delve server, which runs with --accept-multiclient:
+    one for the control commands, which may block until the program stops,
+    the others for inspection, so it never queues behind a continue, and
+    one to interrupt the running program.
+    """
+    def __init__(self, const, logger, host, port, inspection_count=1):
+        self.__const = const
+        self.__logger = logger
+        self.__host = host
+        self.__port = port
+        self.__trace = None
+        if const.TRACE_FILE != '':
+            self.__trace = JsonRpcTcpTraceWriter(const.TRACE_FILE)
+            logger.info("Record Delve requests to file: %s" % const.TRACE_FILE)
+        self.__control = JsonRpcTcpClient(const, logger, self.__trace)
+        self.__inspections = [JsonRpcTcpClient(const, logger, self.__trace) for i in range(max(inspection_count, 1))]
+        self.__interrupt = JsonRpcTcpClient(const, logger, self.__trace)
+        self.__interrupt_lock = threading.Lock()
+
+    @property
+    def control(self):
+        return self.__control
+
+    @property
+    def inspections(self):
+        return self.__inspections
+
+    def cancel_inspection(self, epoch):
+        # the requests of a former stop only, the others are still waited for
+        for connect in self.__inspections:
+            connect._cancel(lambda tag: tag is not None and epoch.is_stale(tag))
+
+    def halt(self):
+        # the running command on the control connection returns the stopped state
+        with self.__interrupt_lock:
+            if not self.__interrupt._is_open():
+                self.reconnect(self.__interrupt)
+            return self.__interrupt.RPCServer.Command({"name": self.__const.HALT_COMMAND})
+
+    def reconnect(self, connect, alive=None):
+        """
+        Opens a dropped connection again, with a growing delay between
+        the attempts. The Delve server keeps the debugged process state.
+        """
+        const = self.__const
+        logger = self.__logger
+        delay = const.RECONNECT_DELAY
+        for attempt in range(const.RECONNECT_ATTEMPTS):
+            if alive is not None and not alive.isSet():
+                break
+            time.sleep(delay)
+            try:
+                if connect._is_open():
+                    connect._close()
+                connect._open(self.__host, self.__port)
+                logger.info("Reconnected to Delve server after %d attempt(s)" % (attempt + 1))
+                return True
+            except:
+                logger.warning("Reconnect attempt %d to Delve server failed: %s" % (attempt + 1, sys.exc_info()[1]))
+            delay = min(delay * 2, const.RECONNECT_MAX_DELAY)
+        logger.error("Cannot reconnect to Delve server")
+        return False
+
+    def open(self):
+        const = self.__const
+        logger = self.__logger
+        logger.debug("Start worker")
+        try:
+            for connect in [self.__control, self.__interrupt] + self.__inspections:
+                connect._open(self.__host, self.__port)
+            return True
+        except:
+            traceback.print_exc(file=(sys.stdout if logger.get_file() == const.STDOUT else open(logger.get_file(),"a")))
+            logger.error("Exception thrown, details in file: %s" % logger.get_file())
+        self.close()
+        return False
+
+    def close(self):
+        const = self.__const
+        logger = self.__logger
+        for connect in [self.__control, self.__interrupt] + self.__inspections:
+            try:
+                if connect._is_open():
+                    connect._close()
+            except:
+                traceback.print_exc(file=(sys.stdout if logger.get_file() == const.STDOUT else open(logger.get_file(),"a")))
+                logger.error("Exception thrown, details in file: %s" % logger.get_file())
+        if self.__trace is not None:
+            self.__trace.close()
+        logger.debug("Stop worker")
 
 class DlvWorker(object):
     def __init__(self, prj, worker_callback = None):
         self.__prj = prj
         self.__worker_callback = worker_callback
         self.__alive = threading.Event()
+        self.__executing = threading.Event()
+        self.__epoch = DlvStopEpoch()
+        self.__cache = None
+        self.__pool = None
         self.__queue = None
+        self.__inspection_queue = None
+        self.__dump = None
         self.__stoped = True
 
     def __start(self):
         self.__stoped = False
-        self.__queue = queue.Queue()
-        t = threading.Thread(name='worker', target=_do_method, args=(self.__alive, self.__queue, self.__prj, self.__worker_callback))
+        self.__queue = DlvRequestQueue(self.__prj.const, self.__prj.logger)
+        self.__inspection_queue = DlvRequestQueue(self.__prj.const, self.__prj.logger)
+        cache_size = self.__prj.const.INSPECTION_CACHE_SIZE
+        self.__cache = DlvInspectionCache(cache_size * 1024 * 1024) if cache_size > 0 else None
+        host, port = self.__prj.get_endpoint()
+        self.__pool = DlvConnectionPool(self.__prj.const, self.__prj.logger, host, port, self.__prj.const.INSPECTION_CONNECTIONS)
+        t = threading.Thread(name='worker', target=_do_control, args=(self.__alive, self.__executing, self.__epoch, self.__cache, self.__queue, self.__inspection_queue, self.__prj, self.__pool, self.__worker_callback))
+        t.start()
+
+    def is_executing(self):
+        return self.__executing.isSet()
+
+    def halt(self):
+        if not self.__alive.isSet() or not self.is_executing():
+            self.__prj.logger.warning("Program is not running, nothing to halt")
+            return
+        t = threading.Thread(name='worker-halt', target=_do_halt, args=(self.__pool, self.__prj))
         t.start()
 
     def stop(self):
@@ -202,6 +1100,18 @@ class DlvWorker(object):
             self.__queue.put(None)
         self.__stoped = True
 
+    def dump_stacks(self, parms):
+        # beside the queues on connections of its own, the views are served meanwhile
+        self.cancel_dump()
+        self.__dump = DlvStackDump(self.__epoch)
+        t = threading.Thread(name='worker-dump', target=_do_dump, args=(self.__dump, self.__epoch, self.__dump.dump_epoch, self.__prj, parms, self.__worker_callback))
+        t.start()
+
+    def cancel_dump(self):
+        if self.__dump is not None:
+            self.__dump.cancel()
+            self.__dump = None
+
     def do(self, cmd, parms=None):
         self.do_batch([{"cmd": cmd, "parms": parms}])
 
@@ -217,4 +1127,17 @@ class DlvWorker(object):
         elif len(requests) == 0:
             logger.error("Call worker with empty request")
             return
-        self.__queue.put(requests)
+        const = self.__prj.const
+        # stamped with the stop they are issued at
+        if any(request["cmd"] in const.RUNTIME_COMMANDS + [const.RESTART_COMMAND] for request in requests):
+            # the program is going to move, pending inspection of this stop is of no use
+            self.__epoch.next()
+            if self.__alive.isSet():
+                self.__pool.cancel_inspection(self.__epoch)
+            self.cancel_dump()
+        requests = [dict(request, epoch=self.__epoch.value) for request in requests]
+        if all(_is_inspection_request(const, request["cmd"]) for request in requests):
+            # nothing to wait for on the control connection
+            self.__inspection_queue.put(requests)
+        else:
+            self.__queue.put(requests)
@@ -0,0 +1,246 @@
+"""
+Receive path of JsonRpcTcpClient against a local server that writes the
+responses split over many sends or packed together in one send.
+
+    python3 -m unittest discover -s tests
+"""
+import json
+import os
+import socket
+import sys
+import threading
+import time
+import types
+import unittest
+
+PACKAGE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# The plugin modules import each other as the GoDebug package
+package = types.ModuleType('GoDebug')
+package.__path__ = [PACKAGE_DIR]
+sys.modules.setdefault('GoDebug', package)
+
+from GoDebug.sdconst import DlvDefaults
+from GoDebug.jsonrpctcp_client import JsonRpcTcpClient
+from GoDebug.jsonrpctcp_client import JsonRpcTcpProtocolError
+from GoDebug.jsonrpctcp_client import JsonRpcTcpStreamDecoder
+
+class TestConst(DlvDefaults):
+    TIMEOUT = 5
+    BUFFER = 16
+    MAX_BUFFER = 65536
+
+class TestLogger(object):
+    def get_file(self):
+        return TestConst.STDOUT
+
+    def debug(self, message):
+        pass
+
+    info = warning = error = critical = debug
+
+class FrameServer(object):
+    """ Answers every request count requests at once, written by the given writer. """
+
+    def __init__(self, count, writer):
+        self.__count = count
+        self.__writer = writer
+        self.__server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.__server.bind(('127.0.0.1', 0))
+        self.__server.listen(1)
+        self.port = self.__server.getsockname()[1]
+        self.__thread = threading.Thread(target=self.__run)
+        self.__thread.daemon = True
+        self.__thread.start()
+
+    def __run(self):
+        conn, addr = self.__server.accept()
+        conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        decoder = json.JSONDecoder()
+        text = ''
+        requests = []
+        while True:
+            try:
+                data = conn.recv(65536)
+            except OSError:
+                break
+            if not data:
+                break
+            text += data.decode('utf-8')
+            while True:
+                text = text.lstrip()
+                try:
+                    request, end = decoder.raw_decode(text)
+                except ValueError:
+                    break
+                text = text[end:]
+                requests.append(request)
+            if len(requests) >= self.__count:
+                # a failing call is never answered, it times out
+                responses = [json.dumps({"id": request["id"], "result": request["params"][0], "error": None}, ensure_ascii=False) + "\n"
+                             for request in requests if not request["method"].endswith(".Fail")]
+                requests = []
+                self.__writer(conn, b''.join([response.encode('utf-8') for response in responses]))
+        conn.close()
+
+    def close(self):
+        self.__server.close()
+        self.__thread.join(1)
+
+def send_fragmented(size):
+    def writer(conn, data):
+        for idx in range(0, len(data), size):
+            conn.sendall(data[idx:idx + size])
+            # each piece in a segment of its own
+            time.sleep(0.001)
+    return writer
+
+def send_coalesced(conn, data):
+    conn.sendall(data)
+
+def send_delayed(conn, data):
+    time.sleep(0.5)
+    conn.sendall(data)
+
+class TestTrace(object):
+    def __init__(self):
+        self.requests = []
+
+    def write(self, start, duration, request, response):
+        self.requests.append(request['params'][0])
+
+def send_unterminated(conn, data):
+    # a peer which does not end its values by newline
+    send_fragmented(7)(conn, data.replace(b'\n', b''))
+
+class JsonRpcTcpReceiveTest(unittest.TestCase):
+    # two, three and four bytes long UTF-8 sequences
+    TEXT = u"réponse — 世界 \U0001F600 " * 20
+
+    def __open(self, count, writer, timeout=None, trace=None):
+        server = FrameServer(count, writer)
+        self.addCleanup(server.close)
+        const = TestConst()
+        if timeout is not None:
+            const.TIMEOUT = timeout
+        client = JsonRpcTcpClient(const, TestLogger(), trace)
+        client._open('127.0.0.1', server.port)
+        self.addCleanup(client._close)
+        return client
+
+    def test_fragmented_response(self):
+        for size in [1, 2, 3, 5, 7]:
+            client = self.__open(1, send_fragmented(size))
+            future = client._call_async("RPCServer.Echo", {"Text": self.TEXT, "Size": size})
+            self.assertEqual(future.result(), {"Text": self.TEXT, "Size": size})
+
+    def test_split_inside_utf8_sequence(self):
+        encoded = json.dumps({"Text": self.TEXT}, ensure_ascii=False).encode('utf-8')
+        # the piece boundaries fall inside the multi-byte sequences
+        self.assertTrue(any(encoded[idx] >= 0xc0 for idx in range(0, len(encoded), 3)))
+        client = self.__open(1, send_fragmented(3))
+        self.assertEqual(client._call_async("RPCServer.Echo", {"Text": self.TEXT}).result(), {"Text": self.TEXT})
+
+    def test_coalesced_responses(self):
+        count = 5
+        client = self.__open(count, send_coalesced)
+        futures = [client._call_async("RPCServer.Echo", {"Text": self.TEXT, "Index": idx}) for idx in range(count)]
+        ids = [future.id for future in futures]
+        self.assertEqual(len(set(ids)), count)
+        # the responses are matched by id, whatever the order they are waited in
+        for idx in reversed(range(count)):
+            self.assertEqual(futures[idx].result(), {"Text": self.TEXT, "Index": idx})
+            self.assertEqual(futures[idx].id, ids[idx])
+
+    def test_coalesced_and_fragmented_responses(self):
+        count = 3
+        client = self.__open(count, send_fragmented(11))
+        futures = [client._call_async("RPCServer.Echo", {"Index": idx, "Text": self.TEXT}) for idx in range(count)]
+        self.assertEqual([future.result() for future in futures], [{"Index": idx, "Text": self.TEXT} for idx in range(count)])
+
+    def test_unterminated_response(self):
+        client = self.__open(1, send_unterminated)
+        text = self.TEXT + u" {[ not closed"
+        self.assertEqual(client._call_async("RPCServer.Echo", {"Text": text}).result(), {"Text": text})
+
+    def test_batch_with_failed_call(self):
+        client = self.__open(3, send_coalesced, 0.5)
+        client._prepare_batch()
+        first = client.RPCServer.Echo({"Index": 0})
+        failed = client.RPCServer.Fail({"Index": 1})
+        last = client.RPCServer.Echo({"Index": 2})
+        responses = client()
+        self.assertEqual(responses.get(first), {"Index": 0})
+        self.assertRaises(JsonRpcTcpProtocolError, responses.get, failed)
+        self.assertEqual(responses.get(last), {"Index": 2})
+
+    def test_cancel_of_tagged_requests(self):
+        trace = TestTrace()
+        client = self.__open(3, send_delayed, trace=trace)
+        stale = client._call_async("RPCServer.Echo", {"Index": 0}, tag=1)
+        current = client._call_async("RPCServer.Echo", {"Index": 1}, tag=2)
+        untagged = client._call_async("RPCServer.Echo", {"Index": 2})
+        timer = threading.Timer(0.1, client._cancel, [lambda tag: tag is not None and tag < 2])
+        timer.start()
+        self.addCleanup(timer.join)
+        # the cancel comes during the wait, the requests it is not about are still answered
+        self.assertEqual(untagged.result(), {"Index": 2})
+        self.assertEqual(current.result(), {"Index": 1})
+        with self.assertRaises(JsonRpcTcpProtocolError) as raised:
+            stale.result()
+        self.assertEqual(raised.exception.code, -32807)
+        self.assertEqual(sorted(request['Index'] for request in trace.requests), [1, 2])
+        self.assertEqual(client._JsonRpcTcpClient__traced, {})
+
+class JsonRpcTcpStreamDecoderTest(unittest.TestCase):
+    def __decode(self, response, size, key="Goroutines"):
+        data = json.dumps(response, ensure_ascii=False).encode('utf-8')
+        decoder = JsonRpcTcpStreamDecoder(key)
+        elements = []
+        for idx in range(0, len(data), size):
+            elements.extend(decoder.feed(data[idx:idx + size], idx + size >= len(data)))
+        self.assertTrue(decoder.done)
+        return elements, decoder.response
+
+    def test_byte_by_byte(self):
+        goroutines = [4500.0, 1e+21, -2, 0, True, None, {"id": 7, "pc": 4198400.5}, [1, [2, 3]], "x"]
+        for size in [1, 2, 3, 7]:
+            elements, response = self.__decode({"id": "x", "result": {"Goroutines": goroutines, "Nextg": 120}, "error": None}, size)
+            self.assertEqual(elements, goroutines)
+            self.assertEqual(response, {"id": "x", "result": {"Nextg": 120}, "error": None})
+
+    def test_number_split_before_fraction(self):
+        decoder = JsonRpcTcpStreamDecoder("Goroutines")
+        self.assertEqual(decoder.feed(b'{"id":"x","result":{"Goroutines":[4500'), [])
+        self.assertEqual(decoder.feed(b'.'), [])
+        self.assertEqual(decoder.feed(b'0'), [])
+        self.assertEqual(decoder.feed(b'],"Nextg":-1'), [4500.0])
+        self.assertEqual(decoder.feed(b'},"error":null}', True), [])
+        self.assertEqual(decoder.response, {"id": "x", "result": {"Nextg": -1}, "error": None})
+
+    def test_split_inside_utf8_sequence(self):
+        goroutines = [{"name": u"réponse — 世界 \U0001F600"}] * 3
+        for size in [1, 2, 3, 5]:
+            elements, response = self.__decode({"id": 1, "result": {"Goroutines": goroutines, "Note": u"世界"}, "error": None}, size)
+            self.assertEqual(elements, goroutines)
+            self.assertEqual(response['result'], {"Note": u"世界"})
+
+    def test_nested_fields_around_the_array(self):
+        result = {"Before": {"a": [1, {"b": "]}"}], "c": {}}, "Goroutines": [{"Locations": [{"pc": 1}], "Groups": []}],
+                  "After": [{"Goroutines": [9]}], "Empty": [], "Nextg": 3}
+        elements, response = self.__decode({"id": 2, "result": result, "error": None}, 4)
+        self.assertEqual(elements, result['Goroutines'])
+        self.assertEqual(response['result'], dict((key, value) for key, value in result.items() if key != "Goroutines"))
+
+    def test_error_response(self):
+        for size in [1, 4, 1000]:
+            elements, response = self.__decode({"id": "x", "result": None, "error": "could not find goroutine 7"}, size)
+            self.assertEqual(elements, [])
+            self.assertEqual(response, {"id": "x", "result": None, "error": "could not find goroutine 7"})
+
+    def test_truncated_response(self):
+        decoder = JsonRpcTcpStreamDecoder("Goroutines")
+        self.assertRaises(JsonRpcTcpProtocolError, decoder.feed, b'{"id":"x","result":{"Goroutines":[1,2', True)
+
+if __name__ == '__main__':
+    unittest.main()
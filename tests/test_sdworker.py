@@ -0,0 +1,168 @@
+"""
+DlvWorker against the fake Delve server of bench/fakedlv.py, served on
+a thread of the test process.
+
+    python3 -m unittest discover -s tests
+"""
+import os
+import sys
+import threading
+import types
+import unittest
+
+PACKAGE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# The plugin modules import each other as the GoDebug package
+package = types.ModuleType('GoDebug')
+package.__path__ = [PACKAGE_DIR]
+sys.modules.setdefault('GoDebug', package)
+sys.path.insert(0, os.path.join(PACKAGE_DIR, 'bench'))
+
+from GoDebug.sdconst import DlvDefaults
+from GoDebug.sdworker import DlvWorker
+from GoDebug.sdfrontend import DlvMemoryFrontend
+from fakedlv import FakeDelve
+
+class TestConst(DlvDefaults):
+    RECONNECT_ATTEMPTS = 0
+    GOROUTINE_PAGE_SIZE = 10
+
+class TestLogger(object):
+    def get_file(self):
+        return TestConst.STDOUT
+
+    def debug(self, message):
+        pass
+
+    info = warning = error = critical = debug
+
+class TestProject(object):
+    def __init__(self, host, port):
+        self.const = TestConst()
+        self.logger = TestLogger()
+        self.frontend = DlvMemoryFrontend(self.const, self.logger)
+        self.__endpoint = (host, port)
+
+    def get_endpoint(self):
+        return self.__endpoint
+
+class DlvWorkerTest(unittest.TestCase):
+    GOROUTINES = 95
+
+    def setUp(self):
+        self.fake = FakeDelve(self.GOROUTINES, depth=5, fanout=2)
+        self.worker = self.__open(self.fake)
+        self.__done = threading.Event()
+        self.__responses = None
+
+    def __open(self, fake):
+        server = fake.listen('127.0.0.1', 0)
+        self.addCleanup(server.close)
+        t = threading.Thread(target=fake.run, args=(server,))
+        t.daemon = True
+        t.start()
+        prj = TestProject('127.0.0.1', server.getsockname()[1])
+        self.addCleanup(prj.frontend.stop)
+        worker = DlvWorker(prj, self.__callback)
+        self.addCleanup(worker.stop)
+        return worker
+
+    def __callback(self, prj, responses):
+        if len(responses) == 1 and responses[0].get('partial', False):
+            return
+        self.__responses = responses
+        self.__done.set()
+
+    def call(self, requests, worker=None):
+        self.__done.clear()
+        (worker or self.worker).do_batch(requests)
+        self.assertTrue(self.__done.wait(10))
+        return self.__responses
+
+    def goroutine_page(self, parms):
+        responses = self.call([{"cmd": TestConst.GOROUTINE_COMMAND, "parms": dict(parms, goroutine_id=1, scroll=True)}])
+        return [response for response in responses if response['cmd'] == TestConst.GOROUTINE_COMMAND][0]
+
+    def test_goroutine_pages_follow_nextg(self):
+        ids = []
+        starts = []
+        start = 0
+        while start >= 0:
+            response = self.goroutine_page({"start": start})
+            self.assertEqual(response['page']['start'], start)
+            starts.append(start)
+            ids.extend([gr['id'] for gr in response['response']['Goroutines']])
+            start = response['response']['Nextg']
+        self.assertEqual(ids, list(range(1, self.GOROUTINES + 1)))
+        # the dead goroutines are skipped, Start is no row position
+        self.assertNotEqual(starts, list(range(0, self.GOROUTINES, TestConst.GOROUTINE_PAGE_SIZE)))
+
+    def test_found_goroutine_page_has_the_pages_before(self):
+        response = self.goroutine_page({"start": 0, "find": "57"})
+        page = response['page']
+        self.assertEqual(page['found'], 57)
+        self.assertIn(57, [gr['id'] for gr in response['response']['Goroutines']])
+        rows = 0
+        start = 0
+        for element in page['pages']:
+            # going back from the found page lands on the pages read before
+            self.assertEqual(element[0], start)
+            previous = self.goroutine_page({"start": element[0]})
+            self.assertEqual(len(previous['response']['Goroutines']), element[1])
+            rows += element[1]
+            start = previous['response']['Nextg']
+        self.assertEqual(start, page['start'])
+        self.assertEqual(rows, 50)
+
+    def test_session_input_drops_the_cached_variables(self):
+        variable = {"cmd": TestConst.VARIABLE_COMMAND, "parms": {"goroutine_id": 1, "frame": 0}}
+        def local_value():
+            responses = self.call([dict(variable)])
+            return responses[0]['response']['Locals'][0]['children'][0]['value']
+        self.call([{"cmd": TestConst.STATE_COMMAND, "parms": None}])
+        before = local_value()
+        # like "set" typed in the session input: memory changes, the position does not
+        self.fake.string_len += 1
+        self.assertEqual(local_value(), before)
+        self.call([{"cmd": TestConst.STATE_COMMAND, "parms": {"input": True}}])
+        self.assertEqual(len(local_value()), len(before) + 1)
+
+    def dump_stacks(self, parms):
+        self.__done.clear()
+        self.worker.dump_stacks(parms)
+        self.assertTrue(self.__done.wait(10))
+        return self.__responses[0]['response']
+
+    def test_dump_reads_one_stack_per_location_by_default(self):
+        self.call([{"cmd": TestConst.STATE_COMMAND, "parms": None}])
+        fast = self.dump_stacks({"filter": ""})
+        exact = self.dump_stacks({"filter": "", "exact": True})
+        self.assertFalse(fast['Exact'])
+        self.assertLess(fast['Read'], fast['Goroutines'])
+        self.assertEqual(exact['Read'], self.GOROUTINES)
+        for response in [fast, exact]:
+            ids = [goroutine_id for bucket in response['Buckets'] for goroutine_id in bucket['goroutines']]
+            self.assertEqual(sorted(ids), list(range(1, self.GOROUTINES + 1)))
+
+    def test_client_grouping_matches_the_server(self):
+        # the client groups like Delve when the server ignores the grouping options
+        fallback = self.__open(FakeDelve(self.GOROUTINES, depth=5, fanout=2, grouping=False))
+        for by in ["user", "go", "start"]:
+            group = {"by": by, "wait_reason": False}
+            request = {"cmd": TestConst.GOROUTINE_COMMAND, "parms": {"group": group}}
+            server = self.call([request])[0]
+            client = self.call([request], fallback)[0]
+            self.assertTrue(server['group']['server'])
+            self.assertFalse(client['group']['server'])
+            groups = server['response']['Groups']
+            self.assertEqual(sorted([(element['Name'], element['Total']) for element in groups]),
+                             sorted([(element['Name'], element['Total']) for element in client['response']['Groups']]))
+            self.assertTrue(all(" in service/worker." in element['Name'] for element in groups))
+            names = [element['Name'] for element in groups[:3]]
+            server = self.call([{"cmd": TestConst.GOROUTINE_COMMAND, "parms": {"group": dict(server['group'], expand=names), "scroll": True}}])[0]
+            client = self.call([{"cmd": TestConst.GOROUTINE_COMMAND, "parms": {"group": dict(client['group'], expand=names), "scroll": True}}], fallback)[0]
+            for name in names:
+                self.assertEqual([gr['id'] for gr in server['response']['Members'][name]], [gr['id'] for gr in client['response']['Members'][name]])
+
+if __name__ == '__main__':
+    unittest.main()